@@ -0,0 +1,31 @@
+"""add_chat_session_changed_at
+
+Revision ID: 0a9e6c3d2b71
+Revises: f3b7a2d94e15
+Create Date: 2026-10-19 16:05:33.471920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a9e6c3d2b71'
+down_revision: Union[str, Sequence[str], None] = 'f3b7a2d94e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('changed_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE chat_sessions SET changed_at = coalesce(updated_at, created_at)")
+    op.create_index('ix_chat_sessions_user_id_changed_at', 'chat_sessions', ['user_id', 'changed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_sessions_user_id_changed_at', table_name='chat_sessions')
+    op.drop_column('chat_sessions', 'changed_at')
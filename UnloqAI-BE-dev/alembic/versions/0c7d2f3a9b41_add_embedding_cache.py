@@ -0,0 +1,35 @@
+"""add_embedding_cache
+
+Revision ID: 0c7d2f3a9b41
+Revises: 5e578b6011ee
+Create Date: 2026-10-19 10:04:17.532904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector # Safe import
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c7d2f3a9b41'
+down_revision: Union[str, Sequence[str], None] = '5e578b6011ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('embedding_cache',
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('embedding', Vector(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('model', 'content_hash')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('embedding_cache')
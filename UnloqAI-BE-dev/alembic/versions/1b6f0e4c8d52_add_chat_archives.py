@@ -0,0 +1,44 @@
+"""add_chat_archives
+
+Revision ID: 1b6f0e4c8d52
+Revises: 0a9e6c3d2b71
+Create Date: 2026-10-19 17:12:08.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b6f0e4c8d52'
+down_revision: Union[str, Sequence[str], None] = '0a9e6c3d2b71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('chat_archives',
+    sa.Column('session_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('codec', sa.String(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('raw_bytes', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['chat_sessions.session_id'], ),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+    op.add_column('chat_sessions', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Payloads are already compressed; skip TOAST's pglz pass over them
+    op.execute("ALTER TABLE chat_archives ALTER COLUMN payload SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'archived_at')
+    op.drop_table('chat_archives')
@@ -0,0 +1,63 @@
+"""add_internal_signal_rollups
+
+Revision ID: 2c8e4a7f1d36
+Revises: 1b6f0e4c8d52
+Create Date: 2026-10-19 18:40:51.377205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c8e4a7f1d36'
+down_revision: Union[str, Sequence[str], None] = '1b6f0e4c8d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUPS = (
+    ('internal_signal_rollup_hourly', 'hour'),
+    ('internal_signal_rollup_daily', 'day'),
+    ('internal_signal_rollup_weekly', 'week'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_internal_signals_kpi_id_timestamp', 'internal_signals', ['kpi_id', 'timestamp'], unique=False)
+    for table, _ in ROLLUPS:
+        op.create_table(table,
+        sa.Column('kpi_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('value_count', sa.Integer(), nullable=False),
+        sa.Column('value_sum', sa.Float(), nullable=False),
+        sa.Column('value_min', sa.Float(), nullable=False),
+        sa.Column('value_max', sa.Float(), nullable=False),
+        sa.Column('value_last', sa.Float(), nullable=False),
+        sa.Column('last_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('kpi_id', 'bucket_start')
+        )
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Backfill from the existing raw points (date_trunc weeks start on Monday,
+    # matching bucket_start in the model)
+    for table, unit in ROLLUPS:
+        op.execute(f"""
+            INSERT INTO {table} (kpi_id, bucket_start, value_count, value_sum, value_min, value_max, value_last, last_at)
+            SELECT kpi_id, date_trunc('{unit}', timestamp), count(*), sum(value), min(value), max(value),
+                   (array_agg(value ORDER BY timestamp DESC))[1], max(timestamp)
+            FROM internal_signals
+            WHERE kpi_id IS NOT NULL AND timestamp IS NOT NULL AND value IS NOT NULL
+            GROUP BY kpi_id, date_trunc('{unit}', timestamp)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _ in reversed(ROLLUPS):
+        op.drop_table(table)
+    op.drop_index('ix_internal_signals_kpi_id_timestamp', table_name='internal_signals')
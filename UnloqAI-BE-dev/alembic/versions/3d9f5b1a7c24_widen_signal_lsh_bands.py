@@ -0,0 +1,35 @@
+"""widen_signal_lsh_bands
+
+Revision ID: 3d9f5b1a7c24
+Revises: 2c8e4a7f1d36
+Create Date: 2026-10-19 20:12:37.518402
+
+SignalIngestService moved from eight 8-bit LSH bands to four 16-bit ones, so
+the stored band rows no longer match what lookups ask for. They are dropped
+together with the fingerprints; `python backfill_fingerprints.py` recomputes
+both, for these rows and for signals that never had a fingerprint.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9f5b1a7c24'
+down_revision: Union[str, Sequence[str], None] = '2c8e4a7f1d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('DELETE FROM signal_lsh_bands')
+    op.execute('UPDATE external_signals SET fingerprint = NULL WHERE fingerprint IS NOT NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Same reset: the backfill rebuilds bands in whichever layout the code expects
+    op.execute('DELETE FROM signal_lsh_bands')
+    op.execute('UPDATE external_signals SET fingerprint = NULL WHERE fingerprint IS NOT NULL')
@@ -0,0 +1,30 @@
+"""add_chat_session_summary
+
+Revision ID: 5e578b6011ee
+Revises: aeb2759264f9
+Create Date: 2026-10-19 09:12:41.208313
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e578b6011ee'
+down_revision: Union[str, Sequence[str], None] = 'aeb2759264f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('summary_message_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_sessions', 'summary_message_count')
+    op.drop_column('chat_sessions', 'summary')
@@ -0,0 +1,35 @@
+"""add_job_checkpoints
+
+Revision ID: a41e6d0c5f27
+Revises: 0c7d2f3a9b41
+Create Date: 2026-10-19 10:48:55.017263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41e6d0c5f27'
+down_revision: Union[str, Sequence[str], None] = '0c7d2f3a9b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_checkpoints',
+    sa.Column('job_name', sa.String(), nullable=False),
+    sa.Column('cursor', sa.String(), nullable=True),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job_checkpoints')
@@ -0,0 +1,47 @@
+"""add_signal_embedding_ann_index
+
+Revision ID: b7d91c4e2a10
+Revises: a41e6d0c5f27
+Create Date: 2026-10-19 11:30:02.664190
+
+HNSW over L2 distance, the distance VectorService.signal_distance queries with.
+The choice is fixed here rather than read from settings so every environment
+ends up with the same schema; switching the distance or the index type needs a
+migration of its own that rebuilds the index (and a matching query change).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d91c4e2a10'
+down_revision: Union[str, Sequence[str], None] = 'a41e6d0c5f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = 'ix_external_signals_embedding_ann'
+
+# Operator class must match the distance used by VectorService.search_signals
+OPCLASS = 'vector_l2_ops'
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON external_signals '
+        f'USING hnsw (embedding {OPCLASS}) '
+        f'WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
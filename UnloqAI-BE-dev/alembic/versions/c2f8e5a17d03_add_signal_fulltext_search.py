@@ -0,0 +1,42 @@
+"""add_signal_fulltext_search
+
+Revision ID: c2f8e5a17d03
+Revises: b7d91c4e2a10
+Create Date: 2026-10-19 12:15:40.918372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8e5a17d03'
+down_revision: Union[str, Sequence[str], None] = 'b7d91c4e2a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Pre-filter index for hybrid search (type / severity / time window)
+    op.create_index('ix_external_signals_type_severity_timestamp', 'external_signals',
+                    ['type', 'severity', 'timestamp'], unique=False)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Kept in sync by Postgres itself; not mapped on the model (see vector_service.SEARCH_TSV)
+    op.execute(
+        "ALTER TABLE external_signals ADD COLUMN search_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('english', coalesce(type, '') || ' ' || coalesce(description, ''))) STORED"
+    )
+    op.create_index('ix_external_signals_search_tsv', 'external_signals', ['search_tsv'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_external_signals_search_tsv', table_name='external_signals', postgresql_using='gin')
+        op.drop_column('external_signals', 'search_tsv')
+    op.drop_index('ix_external_signals_type_severity_timestamp', table_name='external_signals')
@@ -0,0 +1,90 @@
+"""add_signal_halfvec_embedding
+
+Revision ID: d5a3b9e61c84
+Revises: c2f8e5a17d03
+Create Date: 2026-10-19 13:02:26.370115
+
+Adds a float16 copy of external_signals.embedding without rewriting the table:
+the column is added nullable (catalog-only change), filled in committed batches,
+and kept in sync afterwards by a trigger. The halfvec column gets its own HNSW
+index (L2, same parameters as b7d91c4e2a10) next to the float32 one, so
+VECTOR_STORAGE stays a query-time switch: both columns are always indexed and
+every environment ends up with the same schema.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC # Safe import
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a3b9e61c84'
+down_revision: Union[str, Sequence[str], None] = 'c2f8e5a17d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+FULL_INDEX = 'ix_external_signals_embedding_ann'
+HALF_INDEX = 'ix_external_signals_embedding_half_ann'
+
+# Fixed here, not read from settings; must match b7d91c4e2a10 and signal_distance (L2)
+HALF_OPCLASS = 'halfvec_l2_ops'
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('external_signals', sa.Column('embedding_half', HALFVEC(1536), nullable=True))
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION external_signals_sync_embedding_half() RETURNS trigger AS $$
+        BEGIN
+            NEW.embedding_half := NEW.embedding::halfvec(1536);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER external_signals_embedding_half_sync
+        BEFORE INSERT OR UPDATE OF embedding ON external_signals
+        FOR EACH ROW EXECUTE FUNCTION external_signals_sync_embedding_half()
+    """)
+
+    # Backfill existing rows in short committed batches instead of one long table rewrite
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        while True:
+            result = conn.execute(sa.text(
+                "UPDATE external_signals SET embedding_half = embedding::halfvec(1536) "
+                "WHERE signal_id IN (SELECT signal_id FROM external_signals "
+                "WHERE embedding IS NOT NULL AND embedding_half IS NULL LIMIT :n)"
+            ), {"n": BATCH_SIZE})
+            if result.rowcount < BATCH_SIZE:
+                break
+
+        # Built after the backfill, without blocking writes; the float32 index stays
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {HALF_INDEX} ON external_signals "
+            f"USING hnsw (embedding_half {HALF_OPCLASS}) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f"DROP INDEX IF EXISTS {HALF_INDEX}")
+        op.execute("DROP TRIGGER IF EXISTS external_signals_embedding_half_sync ON external_signals")
+        op.execute("DROP FUNCTION IF EXISTS external_signals_sync_embedding_half()")
+        # Earlier builds of this revision dropped the float32 index under VECTOR_STORAGE=half;
+        # put back exactly the one b7d91c4e2a10 creates
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {FULL_INDEX} ON external_signals "
+            f"USING hnsw (embedding vector_l2_ops) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+    op.drop_column('external_signals', 'embedding_half')
@@ -0,0 +1,40 @@
+"""add_signal_dedup
+
+Revision ID: e8c4f1a2b6d9
+Revises: d5a3b9e61c84
+Create Date: 2026-10-19 13:47:51.284406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4f1a2b6d9'
+down_revision: Union[str, Sequence[str], None] = 'd5a3b9e61c84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('external_signals', sa.Column('fingerprint', sa.BigInteger(), nullable=True))
+    op.add_column('external_signals', sa.Column('occurrence_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('external_signals', sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+    op.create_table('signal_lsh_bands',
+    sa.Column('band', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('signal_id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['signal_id'], ['external_signals.signal_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('band', 'bucket', 'signal_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('signal_lsh_bands')
+    op.drop_column('external_signals', 'last_seen_at')
+    op.drop_column('external_signals', 'occurrence_count')
+    op.drop_column('external_signals', 'fingerprint')
@@ -0,0 +1,40 @@
+"""add_chat_indexes_and_counters
+
+Revision ID: f3b7a2d94e15
+Revises: e8c4f1a2b6d9
+Create Date: 2026-10-19 15:21:09.803342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7a2d94e15'
+down_revision: Union[str, Sequence[str], None] = 'e8c4f1a2b6d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chat_sessions', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chat_sessions', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_chat_sessions_user_id_updated_at', 'chat_sessions', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_chat_messages_session_id_created_at', 'chat_messages', ['session_id', 'created_at'], unique=False)
+    # Seed the counters from existing messages
+    op.execute("""
+        UPDATE chat_sessions SET
+            message_count = (SELECT count(*) FROM chat_messages m WHERE m.session_id = chat_sessions.session_id),
+            last_message_at = (SELECT max(m.created_at) FROM chat_messages m WHERE m.session_id = chat_sessions.session_id)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_session_id_created_at', table_name='chat_messages')
+    op.drop_index('ix_chat_sessions_user_id_updated_at', table_name='chat_sessions')
+    op.drop_column('chat_sessions', 'last_message_at')
+    op.drop_column('chat_sessions', 'message_count')
@@ -1,5 +1,6 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, WebSocketException, status
+from starlette.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
@@ -9,6 +10,7 @@ from app.core import security
 from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.shared import User
+from app.services.admission import llm_admission, AdmissionRejected, AdmissionTicket
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
@@ -48,3 +50,77 @@ def get_current_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
+
+
+def _bearer_token(request: HTTPConnection) -> Optional[str]:
+    """
+    The bearer token, if the caller sent one. Browsers cannot set headers on
+    WebSockets, so those may pass ?token= instead.
+    """
+    auth = request.headers.get("authorization", "")
+    token = auth[7:] if auth.lower().startswith("bearer ") else None
+    if token is None and request.scope["type"] == "websocket":
+        token = request.query_params.get("token")
+    return token or None
+
+
+def _token_subject(token: str) -> Optional[str]:
+    """The JWT subject of a valid token (no DB lookup), else None."""
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+    except JWTError:
+        return None
+    return payload.get("sub") or None
+
+
+def get_request_user_key(request: HTTPConnection) -> str:
+    """
+    Cheap caller identity for rate limiting: the JWT subject when a valid bearer
+    token is present, otherwise the client address.
+    """
+    token = _bearer_token(request)
+    subject = _token_subject(token) if token else None
+    if subject:
+        return f"user:{subject}"
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+def get_request_user_id(request: HTTPConnection) -> str:
+    """
+    Owner id for per-user data such as chat sessions: the JWT subject, or the
+    shared demo user when the request carries no token at all. A token that is
+    present but invalid or expired is rejected (401) rather than silently
+    demoted to the demo user.
+    """
+    token = _bearer_token(request)
+    if token is None:
+        return settings.DEFAULT_CHAT_USER
+    subject = _token_subject(token)
+    if subject is None:
+        if request.scope["type"] == "websocket":
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return subject
+
+
+async def admit_llm_request(request: HTTPConnection) -> AdmissionTicket:
+    """
+    Waits for an LLM slot. Responds 429 with Retry-After when the queue is full
+    or the wait exceeds LLM_QUEUE_TIMEOUT_SECONDS.
+    Callers must release the ticket (ticket.wrap(stream) + a background release).
+    """
+    try:
+        return await llm_admission.acquire(get_request_user_key(request))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"LLM capacity exhausted ({e.reason}). Retry shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
@@ -0,0 +1,69 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor encodes the (timestamp, id) of the last row on a page. The next page
+is "rows strictly after it" in the list's sort order, which is an index range
+scan at any depth, unlike OFFSET. List endpoints keep returning a plain JSON
+array and put the cursor for the next page in the X-Next-Cursor header
+(absent on the last page).
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(ts: datetime, row_id) -> str:
+    raw = json.dumps([ts.isoformat() if ts else None, str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(ts) if ts else None), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def before(ts_col, id_col, cursor: str):
+    """Rows after `cursor` in (ts_col DESC, id_col DESC) order."""
+    ts, row_id = decode_cursor(cursor)
+    return or_(ts_col < ts, and_(ts_col == ts, id_col < row_id))
+
+
+def next_cursor(rows: list, limit: int, ts_attr: str, id_attr: str) -> Tuple[list, Optional[str]]:
+    """
+    `rows` was fetched with limit + 1: trims the probe row and returns the
+    cursor pointing past the last row returned (None on the last page).
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, ts_attr), getattr(last, id_attr))
+
+
+def effective_limit(cursor: Optional[str], limit: Optional[int], default: int) -> Optional[int]:
+    """
+    Clients that predate pagination send neither limit nor cursor and still get
+    the whole list (None); paging clients get `default` unless they ask otherwise.
+    """
+    if limit is None and cursor is None:
+        return None
+    return limit or default
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, ts_attr: str, id_attr: str) -> list:
+    """next_cursor() for list endpoints: the cursor goes in the X-Next-Cursor header."""
+    rows, cursor = next_cursor(rows, limit, ts_attr, id_attr)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return rows
@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
-from fastapi.responses import StreamingResponse
-from datetime import datetime
-from typing import List, Optional
+from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import HTTPConnection
+from typing import Awaitable, Callable, List, Optional
 from pydantic import BaseModel
+import asyncio
+import json
+import threading
 import uuid
 
 from app.db.session import get_db
+from app.api.deps import admit_llm_request, get_request_user_id
+from app.api.pagination import before, decode_cursor, effective_limit, next_cursor, set_next_cursor
+from app.core.config import settings
 from app.models.meridian import ChatSession, ChatMessage
 from app.services.oakfield.copilot import CopilotService
+from app.services.chat_store import append_user_message
+from app.services.chat_events import chat_events
+from app.services.chat_writer import chat_writer
+from app.services import chat_archive, chat_sync
+from app.services.conversation_memory import ConversationMemory, summary_refresher
+from app.services.generation_stream import Generation, generations, OffsetExpired
+from app.services.title_worker import title_worker
 
 router = APIRouter()
 
@@ -24,98 +38,253 @@ class SessionResponse(BaseModel):
     title: str
     created_at: str
 
+# --- Helpers ---
+
+def _parse_session_id(session_id: str) -> uuid.UUID:
+    # Validate UUID format to prevent 500
+    try:
+        return uuid.UUID(session_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+
+def _get_owned_session(db: Session, sid: uuid.UUID, user_id: str) -> ChatSession:
+    """Other users' sessions are reported as missing rather than forbidden."""
+    session = db.query(ChatSession).filter(
+        ChatSession.session_id == sid, ChatSession.user_id == user_id
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+def _archived_history(db: Session, sid: uuid.UUID, cursor: Optional[str], limit: Optional[int]) -> list:
+    """Same page as the SQL path, cut from the decompressed archive (plus any hot rows)."""
+    msgs = chat_archive.load_messages(db, sid)
+    msgs += db.query(ChatMessage).filter(ChatMessage.session_id == sid).all()
+    msgs.sort(key=lambda m: (m.created_at, m.id), reverse=True)
+    if cursor:
+        position = decode_cursor(cursor)
+        msgs = [m for m in msgs if (m.created_at, m.id) < position]
+    return msgs if limit is None else msgs[:limit + 1]
+
+def _sessions_page(db: Session, user_id: str, cursor: Optional[str], limit: Optional[int]) -> list:
+    """Newest first; `limit` + 1 rows so the caller can tell whether more follow (None: all)."""
+    query = db.query(ChatSession).filter(ChatSession.user_id == user_id)
+    if cursor:
+        query = query.filter(before(ChatSession.updated_at, ChatSession.session_id, cursor))
+    query = query.order_by(ChatSession.updated_at.desc(), ChatSession.session_id.desc())
+    return (query if limit is None else query.limit(limit + 1)).all()
+
+def _messages_page(db: Session, session: ChatSession, cursor: Optional[str], limit: Optional[int]) -> list:
+    if session.archived_at is not None:
+        return _archived_history(db, session.session_id, cursor, limit)
+    query = db.query(ChatMessage).filter(ChatMessage.session_id == session.session_id)
+    if cursor:
+        query = query.filter(before(ChatMessage.created_at, ChatMessage.id, cursor))
+    query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    return (query if limit is None else query.limit(limit + 1)).all()
+
+def _session_json(s: ChatSession) -> dict:
+    return {"session_id": str(s.session_id), "title": s.title, "created_at": s.created_at.isoformat()}
+
+def _message_json(m) -> dict:
+    return {"id": str(m.id), "role": m.role, "content": m.content, "created_at": m.created_at.isoformat()}
+
+def _prepare_turn(db: Session, sid: uuid.UUID, user_id: str, content: str) -> List[dict]:
+    """Persists the user's message and returns the prompt history for the reply."""
+    # 1-3. Verify ownership, save the user message, bump the session's counters
+    # and timestamps, and read the recent turns: one statement + commit on Postgres.
+    memory = ConversationMemory(db)
+    # The previous reply may still sit in the write-behind queue; land it first so
+    # the history does not end in two user turns that get merged into one
+    chat_writer.flush_session(sid)
+    appended = append_user_message(db, sid, user_id, content, window=memory.window)
+    if appended is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    history = None
+    if appended.session.archived_at is not None:
+        # Back from cold storage: rehydrate so memory, summaries and sync see it again.
+        # Re-read the turns, since a concurrent request may have done the restore.
+        chat_archive.restore(db, sid)
+        history = memory.history_for(appended.session, exclude_id=appended.message_id)
+
+    # 5. Auto-Title Generation (If it's the first message)
+    # Batched on the title worker's own thread so it never blocks the stream.
+    msg_count = appended.message_count
+    if msg_count <= 2: 
+        title_worker.submit(sid, content)
+
+    # 6. Conversation memory: recent turns verbatim + cached summary of older ones.
+    # Summaries are refreshed on a background worker, never on the request path.
+    if history is None:
+        history = memory.history_from(appended.session, appended.recent)
+    if memory.needs_refresh(appended.session, msg_count):
+        summary_refresher.schedule(sid)
+
+    chat_events.publish(user_id, {
+        "type": "session", "event": "activity", "session_id": str(sid),
+        "title": appended.session.title, "message_count": msg_count,
+    })
+    return history
+
+async def _start_turn(
+    db: Session,
+    conn: HTTPConnection,
+    sid: uuid.UUID,
+    user_id: str,
+    content: str,
+    run: Callable[..., Awaitable] = run_in_threadpool,
+) -> Generation:
+    """
+    The "send a message" pipeline shared by the POST endpoint and the WebSocket.
+    `run` executes the blocking DB work off the event loop.
+    """
+    # 0. Admission first: a 429 must leave nothing behind (no orphan user turn,
+    # title job or session event), so a client retry is not a duplicate.
+    ticket = await admit_llm_request(conn)
+    try:
+        history = await run(_prepare_turn, db, sid, user_id, content)
+        # 7. Generate on a background producer (holding the LLM admission slot until
+        # it finishes). A dropped connection does not stop the generation; clients
+        # reattach via GET /sessions/{id}/stream or a WebSocket "resume" frame.
+        return generations.start(
+            sid,
+            lambda gen_db: CopilotService(gen_db).chat_completion(content, history=history),
+            on_release=ticket.release,
+        )
+    except BaseException:
+        ticket.release()
+        raise
+
 # --- Endpoints ---
 
-# 1. List All Chats (Sidebar)
+# 1. List the caller's chats (Sidebar), most recently active first.
+# Keyset-paginated on (updated_at, session_id); the next page's cursor is in X-Next-Cursor.
 @router.get("/sessions", response_model=List[SessionResponse])
-def get_sessions(db: Session = Depends(get_db)):
-    # In real auth, filter by current_user.id
-    sessions = db.query(ChatSession).order_by(ChatSession.updated_at.desc()).all()
-    return [
-        {
-            "session_id": str(s.session_id),
-            "title": s.title,
-            "created_at": s.created_at.isoformat()
-        } 
-        for s in sessions
-    ]
+def get_sessions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.CHAT_MAX_PAGE_SIZE),
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    limit = effective_limit(cursor, limit, settings.CHAT_PAGE_SIZE)
+    sessions = _sessions_page(db, user_id, cursor, limit)
+    if limit is not None:
+        sessions = set_next_cursor(response, sessions, limit, "updated_at", "session_id")
+    return [_session_json(s) for s in sessions]
+
+# 1b. Delta sync for polling clients: only what changed since `cursor`.
+# Send the previous ETag as If-None-Match to get an empty 304 when nothing changed.
+def _not_modified(request: Request, etag: str) -> bool:
+    return etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+
+@router.get("/sync")
+def sync_chats(
+    request: Request,
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        since = chat_sync.parse_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    etag = chat_sync.sync_etag(db, user_id, cursor)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(chat_sync.changes_since(db, user_id, since), headers={"ETag": etag})
+
+@router.get("/sync/probe")
+def probe_chats(
+    request: Request,
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    """Has anything changed? One aggregate query, no rows loaded."""
+    etag = chat_sync.sync_etag(db, user_id)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse({"etag": etag}, headers={"ETag": etag})
 
 # 2. Create New Chat (The "+" Button)
 @router.post("/sessions", response_model=SessionResponse)
-def create_session(req: CreateSessionRequest, db: Session = Depends(get_db)):
-    # Default user for demo
-    new_session = ChatSession(title=req.title, user_id="demo_user")
+def create_session(
+    req: CreateSessionRequest,
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    new_session = ChatSession(title=req.title, user_id=user_id)
     db.add(new_session)
     db.commit()
     db.refresh(new_session)
-    return {
-        "session_id": str(new_session.session_id),
-        "title": new_session.title,
-        "created_at": new_session.created_at.isoformat()
-    }
+    chat_events.publish(user_id, {"type": "session", "event": "created", **_session_json(new_session)})
+    return _session_json(new_session)
 
 # 3. Get Chat History (Load a conversation)
+# Pages are taken newest-first by (created_at, id) so the UI can lazy-load older
+# turns with the X-Next-Cursor value; each page is returned oldest-first for display.
 @router.get("/sessions/{session_id}/messages")
-def get_session_history(session_id: str, db: Session = Depends(get_db)):
-    # Validate UUID format to prevent 500
-    try:
-        sid = uuid.UUID(session_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid session ID")
+def get_session_history(
+    session_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.CHAT_MAX_PAGE_SIZE),
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    sid = _parse_session_id(session_id)
+    session = _get_owned_session(db, sid, user_id)
 
-    msgs = db.query(ChatMessage)\
-             .filter(ChatMessage.session_id == sid)\
-             .order_by(ChatMessage.created_at.asc())\
-             .all()
+    limit = effective_limit(cursor, limit, settings.CHAT_PAGE_SIZE)
+    msgs = _messages_page(db, session, cursor, limit)
+    if limit is not None:
+        msgs = set_next_cursor(response, msgs, limit, "created_at", "id")
     
-    return [
-        {"id": str(m.id), "role": m.role, "content": m.content} 
-        for m in msgs
-    ]
+    return [_message_json(m) for m in reversed(msgs)]
 
 # 4. Send Message & Stream Response (The "Enter" Key)
 @router.post("/sessions/{session_id}/message")
 async def send_message(
     session_id: str, 
     req: MessageRequest, 
-    background_tasks: BackgroundTasks,
+    request: Request,
+    user_id: str = Depends(get_request_user_id),
     db: Session = Depends(get_db)
 ):
-    try:
-        sid = uuid.UUID(session_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid session ID")
-
-    # 1. Verify Session
-    session = db.query(ChatSession).filter(ChatSession.session_id == sid).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    # 2. Save User Message
-    user_msg = ChatMessage(
-        session_id=sid,
-        role="user",
-        content=req.content
+    sid = _parse_session_id(session_id)
+    generation = await _start_turn(db, request, sid, user_id, req.content)
+    return StreamingResponse(
+        generation.read(),
+        media_type="text/plain",
+        headers={"X-Generation-Id": str(generation.generation_id)},
     )
-    db.add(user_msg)
-    
-    # 3. Update Session Timestamp (brings it to top of list)
-    session.updated_at = datetime.utcnow()
-    db.commit()
 
-    # 4. Initialize Service with Session Context
-    service = CopilotService(db)
-    
-    # 5. Auto-Title Generation (If it's the first message)
-    # We do this in background to not block the stream
-    msg_count = db.query(ChatMessage).filter(ChatMessage.session_id == sid).count()
-    if msg_count <= 2: 
-        background_tasks.add_task(service.generate_title, str(sid), req.content)
-
-    # 6. Stream Response
+# 4b. Reattach to a generation after a disconnect. `offset` is the number of
+# characters of the reply already received; 410 means it has been evicted
+# from the buffer and the client should reload the messages instead.
+@router.get("/sessions/{session_id}/stream")
+def resume_stream(
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    sid = _parse_session_id(session_id)
+    _get_owned_session(db, sid, user_id)
+    generation = generations.get(sid)
+    if generation is None:
+        raise HTTPException(status_code=404, detail="No recent generation for this session")
+    try:
+        reader = generation.read(offset)
+    except OffsetExpired:
+        raise HTTPException(status_code=410, detail="Offset no longer buffered; reload the messages")
     return StreamingResponse(
-        service.chat_completion(req.content),
-        media_type="text/plain"
+        reader,
+        media_type="text/plain",
+        headers={
+            "X-Generation-Id": str(generation.generation_id),
+            "X-Generation-Status": "done" if generation.done else "running",
+        },
     )
 
 
@@ -123,31 +292,194 @@ class UpdateSessionRequest(BaseModel):
     title: str
 
 @router.delete("/sessions/{session_id}")
-def delete_session(session_id: str, db: Session = Depends(get_db)):
+def delete_session(session_id: str, user_id: str = Depends(get_request_user_id), db: Session = Depends(get_db)):
     try:
         sid = uuid.UUID(session_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid UUID")
         
-    session = db.query(ChatSession).filter(ChatSession.session_id == sid).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    session = _get_owned_session(db, sid, user_id)
     
     db.delete(session) # Cascades to messages
     db.commit()
+    chat_events.publish(user_id, {"type": "session", "event": "deleted", "session_id": str(sid)})
     return {"status": "deleted", "id": session_id}
 
 @router.patch("/sessions/{session_id}")
-def rename_session(session_id: str, req: UpdateSessionRequest, db: Session = Depends(get_db)):
+def rename_session(
+    session_id: str,
+    req: UpdateSessionRequest,
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
     try:
         sid = uuid.UUID(session_id)
     except:
         raise HTTPException(status_code=400, detail="Invalid UUID")
 
-    session = db.query(ChatSession).filter(ChatSession.session_id == sid).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    session = _get_owned_session(db, sid, user_id)
         
     session.title = req.title
     db.commit()
-    return {"status": "updated", "title": session.title}
\ No newline at end of file
+    chat_events.publish(user_id, {"type": "session", "event": "renamed", "session_id": str(sid), "title": session.title})
+    return {"status": "updated", "title": session.title}
+
+# 5. One multiplexed WebSocket per client: requests, stream chunks and pushed
+# events share the connection. Frames are JSON objects with a "type"; replies
+# echo the request's "id".
+#
+#   client → server                                   server → client
+#   {"type": "sessions", "id", "cursor"?, "limit"?}   {"type": "sessions", "id", "sessions", "next_cursor"}
+#   {"type": "messages", "id", "session_id", ...}     {"type": "messages", "id", "session_id", "messages", "next_cursor"}
+#   {"type": "send", "id", "session_id", "content"}   {"type": "started", "id", "session_id", "generation_id"}
+#   {"type": "resume", "id", "session_id", "offset"}  {"type": "chunk", "session_id", "generation_id", "offset", "data"}...
+#                                                     {"type": "done", "session_id", "generation_id", "length", "error"}
+#   {"type": "ping", "id"}                            {"type": "pong", "id"}
+#
+# Pushed without a request: {"type": "title", ...}, {"type": "session", "event", ...}
+# and {"type": "resync"} (events were dropped; fall back to GET /sync).
+# Failures are {"type": "error", "id", "status", "detail"} with HTTP status codes.
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    user_id: str = Depends(get_request_user_id),
+    db: Session = Depends(get_db),
+):
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    # One Session per connection: DB work is serialised and runs off the event loop
+    db_lock = asyncio.Lock()
+    # Ends the threadpool readers of this socket's streams when it closes
+    closed = threading.Event()
+    streams = set()
+
+    async def send(frame: dict):
+        async with send_lock:
+            await websocket.send_json(frame)
+
+    def in_transaction(fn, *args):
+        try:
+            return fn(*args)
+        finally:
+            # End the read transaction so the pooled connection is returned
+            # between frames; the socket may idle for hours
+            db.rollback()
+
+    async def run_db(fn, *args):
+        async with db_lock:
+            return await run_in_threadpool(in_transaction, fn, *args)
+
+    async def forward_events(events: asyncio.Queue):
+        while True:
+            await send(await events.get())
+
+    async def stream(generation: Generation, reader, offset: int):
+        ids = {"session_id": str(generation.session_id), "generation_id": str(generation.generation_id)}
+        async for chunk in iterate_in_threadpool(reader):
+            await send({"type": "chunk", **ids, "offset": offset, "data": chunk})
+            offset += len(chunk)
+        await send({"type": "done", **ids, "length": offset, "error": generation.error})
+
+    async def turn(rid, sid: uuid.UUID, content: str):
+        # Its own task: waiting for admission must not hold up other frames
+        generation = await _start_turn(db, websocket, sid, user_id, content, run=run_db)
+        await send({"type": "started", "id": rid, "session_id": str(sid), "generation_id": str(generation.generation_id)})
+        await stream(generation, generation.read(cancelled=closed), 0)
+
+    async def report_errors(rid, coro):
+        """A spawned task's failure still reaches the client as an error frame for its request."""
+        try:
+            await coro
+        except HTTPException as e:
+            await send_error(rid, e.status_code, e.detail)
+        except Exception as e:
+            print(f"WebSocket request {rid} failed: {e}")
+            await send_error(rid, 500, "Internal server error")
+
+    async def send_error(rid, status: int, detail):
+        if closed.is_set():
+            return
+        try:
+            await send({"type": "error", "id": rid, "status": status, "detail": detail})
+        except Exception:
+            pass  # The socket went away mid-request; nobody is left to tell
+
+    def spawn(coro, rid=None):
+        task = asyncio.create_task(report_errors(rid, coro))
+        streams.add(task)
+        task.add_done_callback(streams.discard)
+
+    def page_limit(frame: dict) -> int:
+        limit = frame.get("limit")
+        limit = settings.CHAT_PAGE_SIZE if limit is None else int(limit)
+        if limit < 1:
+            raise HTTPException(status_code=400, detail="limit must be at least 1")
+        return min(limit, settings.CHAT_MAX_PAGE_SIZE)
+
+    def sessions_frame(rid, cursor, limit: int) -> dict:
+        rows, cursor = next_cursor(_sessions_page(db, user_id, cursor, limit), limit, "updated_at", "session_id")
+        return {"type": "sessions", "id": rid, "sessions": [_session_json(s) for s in rows], "next_cursor": cursor}
+
+    def messages_frame(rid, sid: uuid.UUID, cursor, limit: int) -> dict:
+        session = _get_owned_session(db, sid, user_id)
+        rows, cursor = next_cursor(_messages_page(db, session, cursor, limit), limit, "created_at", "id")
+        return {"type": "messages", "id": rid, "session_id": str(sid),
+                "messages": [_message_json(m) for m in reversed(rows)], "next_cursor": cursor}
+
+    async def handle(frame: dict) -> Optional[dict]:
+        kind, rid = frame.get("type"), frame.get("id")
+        if kind == "ping":
+            return {"type": "pong", "id": rid}
+        if kind == "sessions":
+            return await run_db(sessions_frame, rid, frame.get("cursor"), page_limit(frame))
+
+        sid = _parse_session_id(str(frame.get("session_id")))
+        if kind == "messages":
+            return await run_db(messages_frame, rid, sid, frame.get("cursor"), page_limit(frame))
+        if kind == "send":
+            spawn(turn(rid, sid, str(frame.get("content") or "")), rid)
+            return None
+        if kind == "resume":
+            await run_db(_get_owned_session, db, sid, user_id)
+            generation = generations.get(sid)
+            if generation is None:
+                raise HTTPException(status_code=404, detail="No recent generation for this session")
+            offset = int(frame.get("offset") or 0)
+            try:
+                reader = generation.read(offset, cancelled=closed)
+            except OffsetExpired:
+                raise HTTPException(status_code=410, detail="Offset no longer buffered; reload the messages")
+            spawn(stream(generation, reader, offset), rid)
+            return None
+        raise HTTPException(status_code=400, detail=f"Unknown frame type: {kind}")
+
+    events = chat_events.subscribe(user_id)
+    spawn(forward_events(events))
+    try:
+        while True:
+            frame = {}
+            try:
+                parsed = json.loads(await websocket.receive_text())
+                if not isinstance(parsed, dict):
+                    raise ValueError("frame must be an object")
+                frame = parsed
+                reply = await handle(frame)
+            except HTTPException as e:
+                reply = {"type": "error", "id": frame.get("id"), "status": e.status_code, "detail": e.detail}
+            except (TypeError, ValueError):
+                reply = {"type": "error", "id": frame.get("id"), "status": 400, "detail": "Malformed frame"}
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                # A failed DB read answers its frame; it does not close the socket
+                print(f"WebSocket request {frame.get('id')} failed: {e}")
+                reply = {"type": "error", "id": frame.get("id"), "status": 500, "detail": "Internal server error"}
+            if reply:
+                await send(reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.set()
+        chat_events.unsubscribe(user_id, events)
+        for task in list(streams):
+            task.cancel()
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Request, Query, Response
 from sqlalchemy.orm import Session
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from app.db.session import get_db
+from app.api.deps import admit_llm_request
+from app.api.pagination import before, effective_limit, set_next_cursor
+from app.core.config import settings
 
 # Correct — seed_meridian lives under services/oakfield
 from app.services.oakfield.seed_meridian import seed_meridian_story
@@ -23,7 +26,10 @@ from app.models.meridian import (
 
 # FIXED — these live under services/oakfield
 from app.services.oakfield.copilot import CopilotService
-from app.services.oakfield.dashboard import DashboardService
+from app.services.oakfield.dashboard import cockpit_cache
+from app.services.vector_service import VectorService
+from app.services.signal_ingest import SignalIngestService
+from app.services.signal_series import kpi_series
 
 # Schemas (assuming schemas/meridian.py exists)
 from app.schemas.meridian import (
@@ -47,18 +53,39 @@ class SimulationRequest(BaseModel):
     event_type: str # 'competitor_launch', 'regulation'
 
 @router.get("/chat/history")
-def get_chat_history(db: Session = Depends(get_db)):
-    msgs = db.query(ChatMessage).order_by(ChatMessage.created_at.asc()).all()
+def get_chat_history(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.CHAT_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    # Without limit or cursor: the whole history, as before pagination.
+    # Otherwise newest page first (older pages via X-Next-Cursor), each page in display order.
+    limit = effective_limit(cursor, limit, settings.CHAT_PAGE_SIZE)
+    query = db.query(ChatMessage)
+    if cursor:
+        query = query.filter(before(ChatMessage.created_at, ChatMessage.id, cursor))
+    query = query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+    msgs = query.all() if limit is None else query.limit(limit + 1).all()
+    if limit is not None:
+        msgs = set_next_cursor(response, msgs, limit, "created_at", "id")
     # Map to Vercel Message format
-    return [{"id": str(m.id), "role": m.role, "content": m.content} for m in msgs]
+    return [{"id": str(m.id), "role": m.role, "content": m.content} for m in reversed(msgs)]
 
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_endpoint(
+    request: ChatRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     print(f"DEBUG: Endpoint /chat hit. Messages: {len(request.messages)}")
     service = CopilotService(db)
-    
+
+    ticket = await admit_llm_request(http_request)
+    background_tasks.add_task(ticket.release)
     return StreamingResponse(
-        service.chat_completion(request.messages),
+        ticket.wrap(service.chat_completion(request.messages)),
         media_type="text/plain"
     )
 
@@ -95,21 +122,72 @@ def get_kpis(db: Session = Depends(get_db)):
         })
     return result
 
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; `...Z` / `+01:00` query values are converted to match."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/kpis/{kpi_id}/series")
+def get_kpi_series(
+    kpi_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(60, ge=1, le=2000),
+    db: Session = Depends(get_db),
+):
+    """
+    KPI history over [start, end) (default: the last 90 days) at the coarsest of
+    raw/hour/day/week that still gives at least `points` values.
+    """
+    try:
+        kid = uuid.UUID(kpi_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid KPI ID")
+    end = _naive_utc(end) if end else datetime.utcnow()
+    start = _naive_utc(start) if start else end - timedelta(days=90)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if db.get(StrategyKPI, kid) is None:
+        raise HTTPException(status_code=404, detail="KPI not found")
+    return kpi_series(db, kid, start, end, points)
+
+def _signal_response(s: ExternalSignal) -> dict:
+    return {
+        "id": str(s.signal_id),
+        "type": "competitor" if "competitor" in s.type else "market",
+        "title": s.type.replace("_", " ").title(),
+        "description": s.description,
+        "timestamp": s.timestamp.strftime("%H:%M %p"),
+        # Dynamic: Use DB column, default to medium if missing
+        "severity": getattr(s, "severity", "medium") 
+    }
+
 @router.get("/signals", response_model=List[SignalResponse])
 def get_signals(db: Session = Depends(get_db)):
     signals = db.query(ExternalSignal).order_by(ExternalSignal.timestamp.desc()).all()
-    result = []
-    for s in signals:
-        result.append({
-            "id": str(s.signal_id),
-            "type": "competitor" if "competitor" in s.type else "market",
-            "title": s.type.replace("_", " ").title(),
-            "description": s.description,
-            "timestamp": s.timestamp.strftime("%H:%M %p"),
-            # Dynamic: Use DB column, default to medium if missing
-            "severity": getattr(s, "severity", "medium") 
-        })
-    return result
+    return [_signal_response(s) for s in signals]
+
+@router.get("/signals/search", response_model=List[SignalResponse])
+def search_signals(
+    q: str,
+    type: Optional[List[str]] = Query(None),
+    severity: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    mode: str = "hybrid", # hybrid | vector
+    limit: int = Query(10, ge=1, le=100),
+    # Recall vs latency for the vector side (HNSW ef_search)
+    ef_search: Optional[int] = Query(None, ge=1, le=settings.HNSW_MAX_EF_SEARCH),
+    db: Session = Depends(get_db),
+):
+    service = VectorService(db)
+    if mode == "vector":
+        signals = service.search_signals(q, limit=limit, ef_search=ef_search)
+    else:
+        signals = service.hybrid_search(
+            q, limit=limit, types=type, severities=severity, since=since, ef_search=ef_search,
+        )
+    return [_signal_response(s) for s in signals]
 
 @router.get("/approvals", response_model=List[RecommendationResponse])
 def get_approvals(db: Session = Depends(get_db)):
@@ -206,16 +284,15 @@ async def upload_strategy(file: UploadFile = File(...), db: Session = Depends(ge
 
 @router.post("/simulation/trigger")
 def trigger_simulation(sim: SimulationRequest, db: Session = Depends(get_db)):
-    # Create fake signal
-    signal = ExternalSignal(
+    # Create fake signal. Every trigger is a new event for the demo, so no dedup.
+    signal, _ = SignalIngestService(db).ingest(
         type=sim.event_type,
         description=f"Simulated Event: {sim.event_type} detected.",
         source_url="http://news.example.com",
-        timestamp=datetime.utcnow()
+        timestamp=datetime.utcnow(),
+        dedup=False,
     )
-    db.add(signal)
-    db.commit() # Commit to get ID
-    
+
     # Create linked recommendation
     rec = StrategyRecommendation(
         trigger_signal_id=signal.signal_id,
@@ -236,9 +313,14 @@ def run_seed(db: Session = Depends(get_db)):
 
 
 @router.get("/dashboard")
-def get_dashboard_composite(db: Session = Depends(get_db)):
+def get_dashboard_composite(request: Request, db: Session = Depends(get_db)):
     """
     Real composite aggregator. Queries the seeded database.
+    Served from a cached snapshot (see cockpit_cache); send the previous ETag as
+    If-None-Match to get an empty 304 when nothing changed.
     """
-    service = DashboardService(db)
-    return service.get_cockpit_data()
\ No newline at end of file
+    snapshot = cockpit_cache.get(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if snapshot.etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
\ No newline at end of file
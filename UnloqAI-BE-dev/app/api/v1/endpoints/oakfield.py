@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 
 from app.db.session import get_db
+from app.api.deps import admit_llm_request
 from app.schemas.oakfield import (
     OakfieldDevelopmentCreate,
     OakfieldDevelopmentUpdate,
@@ -566,16 +567,21 @@ class OakfieldChatRequest(BaseModel):
 @router.post("/strategist/chat")
 async def oakfield_strategist_chat(
     req: OakfieldChatRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
     """
     Streams a structured JSON analysis from the Oakfield Strategist AI.
     Queries only oakfield_* tables. No Meridian dependency.
+    Subject to LLM admission control (429 + Retry-After when saturated).
     """
     from app.services.oakfield.copilot import CopilotService
     service = CopilotService(db)
+    ticket = await admit_llm_request(request)
+    background_tasks.add_task(ticket.release)
     return StreamingResponse(
-        service.chat_completion(req.content),
+        ticket.wrap(service.chat_completion(req.content)),
         media_type="text/plain",
     )
 
@@ -19,9 +19,84 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
-    LLM_PROVIDER: str = "ollama" # gemini | ollama
+    LLM_PROVIDER: str = "ollama" # gemini | ollama | replay
     LLM_MODEL: str = "qwen:0.5b" # Default model
 
+    # Replay provider (LLM_PROVIDER=replay): deterministic offline streaming
+    LLM_REPLAY_FILE: str = "" # JSONL recordings; empty = templated responses
+    LLM_REPLAY_TTFT_MS: float = 0
+    LLM_REPLAY_TOKENS_PER_SEC: float = 0 # 0 = no pacing
+    LLM_REPLAY_ERROR_RATE: float = 0.0
+    LLM_REPLAY_SEED: int = 42
+
+    # Admission control for LLM-backed endpoints
+    LLM_MAX_CONCURRENT: int = 16
+    LLM_MAX_CONCURRENT_PER_USER: int = 2
+    LLM_MAX_QUEUE: int = 64
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 20.0
+    SINGLEFLIGHT_STALL_TIMEOUT_SECONDS: float = 60.0 # Followers stop waiting on a silent leader after this
+
+    # In-process worker threads (chat write-behind queue, title worker) need a long-lived
+    # server: Lambda freezes the process between invocations and does not reliably run
+    # the shutdown drain, so under Mangum they are off and the work happens inline
+    BACKGROUND_WORKERS: bool = not os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+
+    # Write-behind persistence of streamed chat replies
+    CHAT_WRITE_BATCH_SIZE: int = 20
+    CHAT_WRITE_FLUSH_MS: int = 250
+    CHAT_WRITE_MAX_ATTEMPTS: int = 5 # A row whose flush keeps failing is dropped (and counted) after this
+
+    # Generations run detached from the request; clients reattach from a character offset
+    GENERATION_BUFFER_CHUNKS: int = 4096
+    GENERATION_TTL_SECONDS: int = 300
+
+    # Chat sessions: owner for unauthenticated requests, page sizes for keyset pagination
+    DEFAULT_CHAT_USER: str = "demo_user"
+    CHAT_PAGE_SIZE: int = 50
+    CHAT_MAX_PAGE_SIZE: int = 200
+    CHAT_SYNC_OVERLAP_MS: int = 2000 # Delta sync re-sends messages this far back (> write-behind lag)
+    CHAT_SYNC_MAX_SESSIONS: int = 100 # Sessions per sync response; `has_more` asks the client to call again
+
+    # Cold storage for idle sessions' messages (see archive_chats.py)
+    CHAT_ARCHIVE_IDLE_DAYS: int = 90
+    CHAT_ARCHIVE_CODEC: str = "gzip" # gzip | zstd (needs the optional zstandard package; falls back to gzip)
+    CHAT_ARCHIVE_BATCH_SIZE: int = 200
+
+    # Conversation memory: last K turns verbatim + cached rolling summary
+    CHAT_MEMORY_TURNS: int = 4
+    CHAT_MEMORY_MESSAGE_CHARS: int = 2000
+    CHAT_SUMMARY_MAX_CHARS: int = 1500
+    CHAT_SUMMARY_MIN_NEW_MESSAGES: int = 4
+    LLM_SUMMARY_MODEL: str = "" # Cheap model for summaries/titles; empty = provider default
+
+    # Batched session titling
+    TITLE_BATCH_WINDOW_MS: int = 1500
+    TITLE_BATCH_SIZE: int = 8
+
+    # Board cockpit snapshot: rebuilt after writes to its tables, served stale while rebuilding
+    COCKPIT_CACHE_MAX_AGE_SECONDS: float = 60.0 # Upper bound for writes made by other workers
+
+    # Embeddings: persistent (model, sha256) cache + in-process LRU for hot queries
+    EMBEDDING_PROVIDER: str = "" # "" = follow LLM_PROVIDER | local (in-process CPU, offline)
+    EMBEDDING_DIM: int = 1536 # Local embedder output; matches external_signals.embedding
+    EMBEDDING_LRU_SIZE: int = 1024
+    EMBEDDING_BATCH_SIZE: int = 64 # Texts per provider call
+    EMBEDDING_CONCURRENCY: int = 4 # Provider calls in flight during backfill
+    EMBEDDING_BACKFILL_CHUNK_SIZE: int = 512 # Rows per keyset page / commit
+
+    # Signal vector search. The ANN index is fixed by the migrations (HNSW, L2 distance;
+    # b7d91c4e2a10 and d5a3b9e61c84), so only the query-time knobs are settings here
+    HNSW_EF_SEARCH: int = 40 # Default recall knob; per-request override via ef_search
+    HNSW_MAX_EF_SEARCH: int = 400
+    VECTOR_STORAGE: str = "full" # full | half (search the halfvec copy, re-rank at full precision)
+    VECTOR_RERANK_FACTOR: int = 4 # Half-precision candidates per requested result
+    VECTOR_INDEX_DIR: str = "./.vector_index" # NumPy index files when the DB has no pgvector
+
+    # Near-duplicate signal detection at ingestion
+    SIGNAL_DEDUP_MAX_HAMMING: int = 3 # SimHash bits: at or below = duplicate, no embedding needed
+    SIGNAL_DEDUP_GREY_HAMMING: int = 12 # Up to here, confirm with embedding similarity
+    SIGNAL_DEDUP_MIN_COSINE: float = 0.95
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,131 @@
+"""
+In-process metrics registry.
+
+Lightweight histograms and counters kept in memory per worker and exposed
+as JSON at /api/v1/metrics. No external exporter is required; each Lambda
+container / uvicorn worker reports its own view.
+"""
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Default bucket bounds, tuned for millisecond latencies
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+TOKEN_BUCKETS = [16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384]
+RATE_BUCKETS = [1, 5, 10, 20, 40, 60, 80, 100, 150, 250]
+COUNT_BUCKETS = [0, 1, 2, 3, 5, 10, 25, 50, 100]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Quantiles are estimated from bucket upper bounds,
+    which is accurate enough for capacity planning and regression alerts.
+    """
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def _quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": round(self.total, 3),
+                "avg": round(self.total / self.count, 3) if self.count else None,
+                "min": self.min,
+                "max": self.max,
+                "p50": self._quantile(0.50),
+                "p90": self._quantile(0.90),
+                "p99": self._quantile(0.99),
+                "buckets": {
+                    **{str(b): c for b, c in zip(self.buckets, self.counts)},
+                    "+Inf": self.counts[-1],
+                },
+            }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._gauges: Dict[Tuple[str, tuple], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple[str, tuple]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name: str, buckets: List[float] = None, **labels) -> Histogram:
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = Histogram(buckets or LATENCY_BUCKETS_MS)
+                self._histograms[key] = hist
+            return hist
+
+    def observe(self, name: str, value: float, buckets: List[float] = None, **labels) -> None:
+        self.histogram(name, buckets, **labels).observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def snapshot(self) -> dict:
+        """
+        Returns {"histograms": {name: [{labels, ...stats}]}, "counters": ..., "gauges": ...}
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+
+        out = {"histograms": {}, "counters": {}, "gauges": {}}
+        for (name, labels), hist in histograms:
+            out["histograms"].setdefault(name, []).append({"labels": dict(labels), **hist.snapshot()})
+        for (name, labels), value in counters:
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), value in gauges:
+            out["gauges"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = MetricsRegistry()
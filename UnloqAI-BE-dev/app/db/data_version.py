@@ -0,0 +1,85 @@
+"""
+Per-table data versions, bumped automatically on commit.
+
+Any ORM flush or bulk update/delete records which tables were touched; once the
+transaction commits, each touched table's version is incremented. Caches and
+request coalescing key on these versions instead of polling the database.
+Versions are per-process, which matches the per-worker lifetime of the caches
+that consume them.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_versions: Dict[str, int] = defaultdict(int)
+_lock = threading.Lock()
+
+_PENDING_KEY = "_data_version_tables"
+
+
+def bump(*tables: str) -> None:
+    with _lock:
+        for table in tables:
+            _versions[table] += 1
+
+
+def current(table: str) -> int:
+    with _lock:
+        return _versions[table]
+
+
+def token(*prefixes: str) -> str:
+    """
+    Short, stable fingerprint of every table version whose name starts with one
+    of `prefixes` (e.g. token("oakfield_")). Changes whenever any of them is written.
+    """
+    with _lock:
+        items = sorted(
+            (t, v) for t, v in _versions.items()
+            if any(t.startswith(p) for p in prefixes)
+        )
+    return hashlib.sha1(repr(items).encode()).hexdigest()[:16]
+
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _table_names(objs: Iterable) -> set:
+    names = set()
+    for obj in objs:
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            names.add(table.name)
+    return names
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    _pending(session).update(_table_names(chain(session.new, session.dirty, session.deleted)))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    # Bulk insert/update/delete statements bypass the flush, so catch them here
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _pending(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        bump(*tables)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_tables(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
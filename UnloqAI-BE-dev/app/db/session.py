@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
 from typing import Generator
+from app.db import data_version  # noqa: F401  (registers commit-time version bumps)
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 
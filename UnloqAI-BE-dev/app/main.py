@@ -23,6 +23,12 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+@app.on_event("shutdown")
+def drain_write_behind_queues():
+    # Flush streamed chat replies that are still waiting in the write-behind queue
+    from app.services.chat_writer import chat_writer
+    chat_writer.drain()
+
 # Routers
 app.include_router(
     shared.companies_router,
@@ -86,6 +92,12 @@ def debug_info():
         "cors_origins": settings.BACKEND_CORS_ORIGINS,
     }
 
+# METRICS ENDPOINT (in-process histograms for this worker)
+@app.get("/api/v1/metrics")
+def metrics_snapshot():
+    from app.core.metrics import metrics
+    return metrics.snapshot()
+
 # ROUTE LISTING
 @app.get("/api/v1/routes")
 def list_routes():
@@ -1,10 +1,11 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Any, List
-from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Text, JSON, Integer, Index, BigInteger, LargeBinary, case, event, update
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import UUID
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC
 from app.models.base import Base
 
 class StrategyOS(Base):
@@ -51,6 +52,54 @@ class InternalSignal(Base):
     value = Column(Float)
     source_system = Column(String)
 
+    __table_args__ = (
+        Index("ix_internal_signals_kpi_id_timestamp", "kpi_id", "timestamp"),
+    )
+
+
+class _SignalRollup:
+    """
+    Per-KPI aggregate of InternalSignal values over one time bucket, kept
+    current on every insert (see _roll_up_internal_signal). The average is
+    value_sum / value_count so increments stay exact.
+    """
+    kpi_id = Column(UUID(as_uuid=True), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    value_count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    value_last = Column(Float, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+
+class InternalSignalHourly(_SignalRollup, Base):
+    __tablename__ = "internal_signal_rollup_hourly"
+    resolution = "hour"
+    bucket = timedelta(hours=1)
+
+class InternalSignalDaily(_SignalRollup, Base):
+    __tablename__ = "internal_signal_rollup_daily"
+    resolution = "day"
+    bucket = timedelta(days=1)
+
+class InternalSignalWeekly(_SignalRollup, Base):
+    __tablename__ = "internal_signal_rollup_weekly"
+    resolution = "week"
+    bucket = timedelta(weeks=1)
+
+# Finest first
+SIGNAL_ROLLUPS = (InternalSignalHourly, InternalSignalDaily, InternalSignalWeekly)
+
+
+def bucket_start(ts: datetime, rollup) -> datetime:
+    """Start of the bucket containing `ts` (weeks start on Monday, like date_trunc)."""
+    if rollup is InternalSignalHourly:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if rollup is InternalSignalDaily:
+        return day
+    return day - timedelta(days=day.weekday())
+
 class ExternalSignal(Base):
     __tablename__ = "external_signals"
 
@@ -60,8 +109,47 @@ class ExternalSignal(Base):
     source_url = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
     embedding = Column(Vector(1536))
+    # float16 copy for the compact ANN index (VECTOR_STORAGE=half); kept in sync by a DB trigger
+    embedding_half = deferred(Column(HALFVEC(1536), nullable=True))
     # ADDED: Store severity in DB
     severity = Column(String, default="medium")
+    # Postgres also has a generated `search_tsv` column (GIN) for hybrid search; see migration c2f8e5a17d03
+    # Near-duplicate detection (SignalIngestService): 64-bit SimHash of the description,
+    # and how many times feeds have reported this canonical signal
+    fingerprint = Column(BigInteger, nullable=True)
+    occurrence_count = Column(Integer, default=1, server_default="1", nullable=False)
+    last_seen_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_external_signals_type_severity_timestamp", "type", "severity", "timestamp"),
+    )
+
+class SignalLSHBand(Base):
+    """Banded LSH over ExternalSignal.fingerprint: one row per (band, 16-bit bucket)."""
+    __tablename__ = "signal_lsh_bands"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    signal_id = Column(UUID(as_uuid=True), ForeignKey("external_signals.signal_id", ondelete="CASCADE"), primary_key=True)
+
+class EmbeddingCache(Base):
+    """Embeddings keyed by (model, sha256(text)) so unchanged text is never re-embedded."""
+    __tablename__ = "embedding_cache"
+
+    model = Column(String, primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector())
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class JobCheckpoint(Base):
+    """Resume point for long-running batch jobs (e.g. the embedding backfill)."""
+    __tablename__ = "job_checkpoints"
+
+    job_name = Column(String, primary_key=True)
+    cursor = Column(String) # Last key processed (keyset pagination)
+    processed = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class StrategyRecommendation(Base):
     __tablename__ = "strategy_recommendations"
@@ -98,9 +186,27 @@ class ChatSession(Base):
     title = Column(String, default="New Conversation") # "Analysis of Product B"
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Rolling summary of the oldest `summary_message_count` messages (see ConversationMemory)
+    summary = Column(Text, nullable=True)
+    summary_message_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Denormalised counters, bumped on every message insert (see _count_chat_message)
+    message_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_message_at = Column(DateTime, nullable=True)
+    # Any write to the row (new messages, renames, background titles and
+    # summaries) moves this forward; delta sync keys on it. updated_at stays
+    # the sidebar's "user activity" order.
+    changed_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Set while the session's messages live compressed in chat_archives (see chat_archive)
+    archived_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_chat_sessions_user_id_changed_at", "user_id", "changed_at"),
+    )
 
     # Relationship
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
+    archive = relationship("ChatArchive", uselist=False, cascade="all, delete-orphan")
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -112,3 +218,68 @@ class ChatMessage(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     session = relationship("ChatSession", back_populates="messages")
+
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),
+    )
+
+
+class ChatArchive(Base):
+    """Cold storage: all of an idle session's messages as one compressed JSON block."""
+    __tablename__ = "chat_archives"
+
+    session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.session_id"), primary_key=True)
+    codec = Column(String, nullable=False) # "zstd" | "gzip"
+    payload = Column(LargeBinary, nullable=False)
+    message_count = Column(Integer, nullable=False)
+    raw_bytes = Column(Integer, nullable=False) # Uncompressed size, for ratio reporting
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+@event.listens_for(ChatMessage, "after_insert")
+def _count_chat_message(mapper, connection, target):
+    # Atomic increment in the same transaction as the insert; bulk Core inserts
+    # (ChatWriteBehind) update the counters themselves.
+    connection.execute(
+        update(ChatSession.__table__)
+        .where(ChatSession.__table__.c.session_id == target.session_id)
+        .values(
+            message_count=ChatSession.__table__.c.message_count + 1,
+            last_message_at=target.created_at,
+            updated_at=ChatSession.__table__.c.updated_at,
+        )
+    )
+
+
+def _rollup_upsert(dialect_name: str, table, row: dict):
+    """INSERT ... ON CONFLICT DO UPDATE folding one point into an existing bucket."""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(table).values(**row)
+    new = stmt.excluded
+    newer = new.last_at >= table.c.last_at
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.kpi_id, table.c.bucket_start],
+        set_={
+            "value_count": table.c.value_count + 1,
+            "value_sum": table.c.value_sum + new.value_sum,
+            "value_min": case((new.value_min < table.c.value_min, new.value_min), else_=table.c.value_min),
+            "value_max": case((new.value_max > table.c.value_max, new.value_max), else_=table.c.value_max),
+            "value_last": case((newer, new.value_last), else_=table.c.value_last),
+            "last_at": case((newer, new.last_at), else_=table.c.last_at),
+        },
+    )
+
+
+@event.listens_for(InternalSignal, "after_insert")
+def _roll_up_internal_signal(mapper, connection, target):
+    # Folded into every rollup in the same transaction as the insert. Bulk Core
+    # inserts and edits to existing points bypass this; run
+    # signal_series.rebuild_rollups afterwards.
+    if target.kpi_id is None or target.value is None or target.timestamp is None:
+        return
+    for rollup in SIGNAL_ROLLUPS:
+        connection.execute(_rollup_upsert(connection.dialect.name, rollup.__table__, {
+            "kpi_id": target.kpi_id, "bucket_start": bucket_start(target.timestamp, rollup),
+            "value_count": 1, "value_sum": target.value, "value_min": target.value,
+            "value_max": target.value, "value_last": target.value, "last_at": target.timestamp,
+        }))
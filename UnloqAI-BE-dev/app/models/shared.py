@@ -28,7 +28,9 @@ class Decision(Base):
     
     # Relationships to domain specific models
     harper_contract = relationship("HarperContract", back_populates="decision", uselist=False)
-    oakfield_bundles = relationship("DecisionBundle", back_populates="decision")
+    # DecisionBundle was dropped with the oakfield_* model rewrite; the dangling
+    # relationship stopped every mapper from configuring.
+    # oakfield_bundles = relationship("DecisionBundle", back_populates="decision")
 
 class ImpactLedger(Base):
     __tablename__ = "impact_ledger"
@@ -0,0 +1,221 @@
+"""
+Admission control for LLM-backed endpoints.
+
+Caps concurrent generations globally and per user. Requests over the limit wait
+in a bounded queue; when a slot frees up, waiting users are served round-robin
+so one heavy user cannot starve everyone else. A full queue (or a wait longer
+than the queue timeout) is rejected so the API can answer 429 + Retry-After.
+
+acquire() is awaited on the event loop, while release() is usually called from
+the threadpool thread that finished iterating the stream, so all state is
+guarded by a plain threading lock and waiters are woken thread-safely.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque, defaultdict
+from typing import Deque, Dict, Iterable, Generator, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    def __init__(self, user: str, loop: asyncio.AbstractEventLoop):
+        self.user = user
+        self.loop = loop
+        self.future = loop.create_future()
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+
+
+class AdmissionTicket:
+    def __init__(self, controller: "AdmissionController", user: str):
+        self.controller = controller
+        self.user = user
+        self.acquired_at = time.perf_counter()
+        self.released = False
+
+    def release(self) -> None:
+        self.controller.release(self)
+
+    def wrap(self, stream: Iterable[str]) -> Generator[str, None, None]:
+        """Holds the slot for as long as the response stream is being produced."""
+        try:
+            yield from stream
+        finally:
+            self.release()
+
+
+class AdmissionController:
+    def __init__(self, name: str, max_concurrent: int, max_per_user: int, max_queue: int,
+                 queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_user: Dict[str, int] = defaultdict(int)
+        # Users with waiting requests, in round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        self._avg_hold_seconds = 5.0
+
+    # ------------------------------------------------------------------
+    # State helpers (call with self._lock held)
+    # ------------------------------------------------------------------
+
+    def _has_capacity(self, user: str) -> bool:
+        return self._active < self.max_concurrent and self._active_by_user[user] < self.max_per_user
+
+    def _grant(self, user: str) -> None:
+        self._active += 1
+        self._active_by_user[user] += 1
+
+    def _dispatch(self) -> None:
+        """Hands free slots to waiting users, one request per user per pass."""
+        progressed = True
+        while progressed and self._queues and self._active < self.max_concurrent:
+            progressed = False
+            for user in list(self._queues.keys()):
+                if not self._has_capacity(user):
+                    continue
+                queue = self._queues[user]
+                waiter = queue.popleft()
+                self._queued -= 1
+                if queue:
+                    self._queues.move_to_end(user)
+                else:
+                    del self._queues[user]
+                self._grant(user)
+                waiter.granted = True
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                progressed = True
+                if self._active >= self.max_concurrent:
+                    break
+
+    def _remove_waiter(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.user)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[waiter.user]
+
+    def _retry_after(self) -> int:
+        # Rough time for the current queue to drain through the available slots
+        backlog = self._queued + 1
+        return max(1, math.ceil(self._avg_hold_seconds * backlog / max(1, self.max_concurrent)))
+
+    def _publish_gauges(self) -> None:
+        metrics.set_gauge("admission_active", self._active, limiter=self.name)
+        metrics.set_gauge("admission_queue_depth", self._queued, limiter=self.name)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "waiting_users": len(self._queues),
+                "max_concurrent": self.max_concurrent,
+                "max_per_user": self.max_per_user,
+                "max_queue": self.max_queue,
+            }
+
+    def saturated(self) -> bool:
+        """True when new work would have to queue. Used to shed optional LLM work."""
+        with self._lock:
+            return self._active >= self.max_concurrent or self._queued > 0
+
+    def try_acquire(self, user: str) -> Optional[AdmissionTicket]:
+        """
+        Low-priority admission for background LLM work: a slot only when one is
+        free and nobody is queued for it, otherwise None (the caller defers).
+        """
+        with self._lock:
+            if self._queued or not self._has_capacity(user):
+                metrics.inc("admission_deferred_total", limiter=self.name)
+                return None
+            self._grant(user)
+            self._publish_gauges()
+            return AdmissionTicket(self, user)
+
+    async def acquire(self, user: str) -> AdmissionTicket:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_capacity(user) and user not in self._queues:
+                self._grant(user)
+                self._publish_gauges()
+                metrics.observe("admission_wait_ms", 0, limiter=self.name)
+                return AdmissionTicket(self, user)
+            if self._queued >= self.max_queue:
+                metrics.inc("admission_rejected_total", limiter=self.name, reason="queue_full")
+                raise AdmissionRejected("queue_full", self._retry_after())
+            waiter = _Waiter(user, loop)
+            self._queues.setdefault(user, deque()).append(waiter)
+            self._queued += 1
+            self._publish_gauges()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if not waiter.granted:
+                    self._remove_waiter(waiter)
+                    self._publish_gauges()
+                    if isinstance(e, asyncio.CancelledError):
+                        raise
+                    metrics.inc("admission_rejected_total", limiter=self.name, reason="timeout")
+                    raise AdmissionRejected("timeout", self._retry_after())
+            if isinstance(e, asyncio.CancelledError):
+                # Granted in the same instant the caller went away
+                self.release(AdmissionTicket(self, user))
+                raise
+
+        metrics.observe(
+            "admission_wait_ms", (time.perf_counter() - waiter.enqueued_at) * 1000, limiter=self.name
+        )
+        return AdmissionTicket(self, user)
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._active -= 1
+            self._active_by_user[ticket.user] -= 1
+            if self._active_by_user[ticket.user] <= 0:
+                del self._active_by_user[ticket.user]
+            held = time.perf_counter() - ticket.acquired_at
+            self._avg_hold_seconds = 0.8 * self._avg_hold_seconds + 0.2 * held
+            self._dispatch()
+            self._publish_gauges()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+llm_admission = AdmissionController(
+    "llm",
+    max_concurrent=settings.LLM_MAX_CONCURRENT,
+    max_per_user=settings.LLM_MAX_CONCURRENT_PER_USER,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,213 @@
+"""
+Cold storage for idle chat sessions.
+
+Assistant replies are large JSON documents and chat_messages only ever grows.
+Sessions with no activity for CHAT_ARCHIVE_IDLE_DAYS have all their messages
+packed into one chat_archives row (a gzip- or, with the optional zstandard
+package and CHAT_ARCHIVE_CODEC=zstd, zstd-compressed JSON block) and
+deleted from the hot table, which keeps chat_messages and its indexes small
+enough to stay in memory.
+
+Reading an archived session decompresses the block in-process; posting a new
+message to one restores its messages to the hot table first, so the write path
+and conversation memory never need to know about archives.
+"""
+import gzip
+import json
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import data_version
+from app.models.meridian import ChatArchive, ChatMessage, ChatSession
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Quacks like ChatMessage for read paths (pagination, serialisation)
+ArchivedMessage = namedtuple("ArchivedMessage", ["id", "session_id", "role", "content", "created_at"])
+
+
+def _codec() -> str:
+    return "zstd" if settings.CHAT_ARCHIVE_CODEC == "zstd" and HAS_ZSTD else "gzip"
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    codec = _codec()
+    if codec == "zstd":
+        return codec, zstandard.ZstdCompressor(level=10).compress(raw)
+    return codec, gzip.compress(raw, compresslevel=6)
+
+
+def decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "gzip":
+        return gzip.decompress(payload)
+    if codec == "zstd":
+        if not HAS_ZSTD:
+            raise RuntimeError("Archive is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+
+def _encode(messages: List[ChatMessage]) -> bytes:
+    return json.dumps(
+        [[str(m.id), m.role, m.content, m.created_at.isoformat() if m.created_at else None] for m in messages],
+        separators=(",", ":"),
+    ).encode()
+
+
+def load_messages(db: Session, session_id: uuid.UUID) -> List[ArchivedMessage]:
+    """The archived messages of a session, oldest first (empty when not archived)."""
+    archive = db.get(ChatArchive, session_id)
+    if archive is None:
+        return []
+    return _decode(archive)
+
+
+def _decode(archive: ChatArchive) -> List[ArchivedMessage]:
+    session_id = archive.session_id
+    rows = json.loads(decompress(archive.codec, archive.payload))
+    return [
+        ArchivedMessage(uuid.UUID(mid), session_id, role, content,
+                        datetime.fromisoformat(created) if created else None)
+        for mid, role, content, created in rows
+    ]
+
+
+def restore(db: Session, session_id: uuid.UUID) -> List[ArchivedMessage]:
+    """
+    Moves an archived session's messages back into chat_messages and drops the
+    archive row. Returns the restored messages, oldest first; empty when a
+    concurrent request restored the session first. Commits.
+    Counters are untouched: message_count already includes archived messages.
+    """
+    # Row lock: a second restore waits here, then finds the archive gone
+    archive = (
+        db.query(ChatArchive)
+        .filter(ChatArchive.session_id == session_id)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
+    if archive is None:
+        db.rollback()
+        return []
+    messages = _decode(archive)
+    if messages:
+        # Core insert: skips the ORM hook that would count these messages again
+        db.execute(insert(ChatMessage.__table__), [
+            {"id": m.id, "session_id": session_id, "role": m.role, "content": m.content, "created_at": m.created_at}
+            for m in messages
+        ])
+    db.execute(delete(ChatArchive.__table__).where(ChatArchive.__table__.c.session_id == session_id))
+    db.execute(
+        update(ChatSession.__table__)
+        .where(ChatSession.__table__.c.session_id == session_id)
+        .values(archived_at=None)
+    )
+    db.commit()
+    data_version.bump(ChatMessage.__tablename__, ChatArchive.__tablename__, ChatSession.__tablename__)
+    db.expire_all()
+    metrics.inc("chat_archive_restores_total")
+    return messages
+
+
+class ChatArchiver:
+    def __init__(self, db: Session, idle_days: int = None, batch_size: int = None):
+        self.db = db
+        self.idle_days = idle_days if idle_days is not None else settings.CHAT_ARCHIVE_IDLE_DAYS
+        self.batch_size = batch_size or settings.CHAT_ARCHIVE_BATCH_SIZE
+
+    def candidates(self, after: Optional[uuid.UUID]) -> List[uuid.UUID]:
+        cutoff = datetime.utcnow() - timedelta(days=self.idle_days)
+        query = self.db.query(ChatSession.session_id).filter(
+            ChatSession.archived_at.is_(None),
+            ChatSession.message_count > 0,
+            ChatSession.last_message_at < cutoff,
+        )
+        if after is not None:
+            query = query.filter(ChatSession.session_id > after)
+        return [row.session_id for row in query.order_by(ChatSession.session_id).limit(self.batch_size)]
+
+    def archive_session(self, session_id: uuid.UUID) -> Optional[Tuple[int, int]]:
+        """
+        Archives one session in its own transaction. Returns (raw_bytes,
+        compressed_bytes), or None when it became active or was archived meanwhile.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=self.idle_days)
+        # Row lock: a concurrent send_message waits rather than appending to a
+        # session whose messages are being moved
+        session = (
+            self.db.query(ChatSession)
+            .filter(ChatSession.session_id == session_id)
+            .with_for_update()
+            .first()
+        )
+        if session is None or session.archived_at is not None or not session.last_message_at or session.last_message_at >= cutoff:
+            self.db.rollback()
+            return None
+
+        messages = (
+            self.db.query(ChatMessage)
+            .filter(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at, ChatMessage.id)
+            .all()
+        )
+        raw = _encode(messages)
+        codec, payload = compress(raw)
+        self.db.add(ChatArchive(
+            session_id=session_id, codec=codec, payload=payload,
+            message_count=len(messages), raw_bytes=len(raw),
+        ))
+        self.db.execute(delete(ChatMessage.__table__).where(ChatMessage.__table__.c.session_id == session_id))
+        # Explicit changed_at = itself: archiving is not a change clients need to sync
+        self.db.execute(
+            update(ChatSession.__table__)
+            .where(ChatSession.__table__.c.session_id == session_id)
+            .values(archived_at=datetime.utcnow(), changed_at=ChatSession.__table__.c.changed_at)
+        )
+        self.db.commit()
+        return len(raw), len(payload)
+
+    def run(self, max_sessions: Optional[int] = None) -> Dict:
+        """Archives every session idle for longer than `idle_days`. Returns counts and sizes."""
+        started = time.perf_counter()
+        archived = raw_total = stored_total = 0
+        after = None
+        while max_sessions is None or archived < max_sessions:
+            batch = self.candidates(after)
+            if not batch:
+                break
+            for session_id in batch:
+                if max_sessions is not None and archived >= max_sessions:
+                    break
+                sizes = self.archive_session(session_id)
+                if sizes is None:
+                    continue
+                archived += 1
+                raw_total += sizes[0]
+                stored_total += sizes[1]
+            after = batch[-1]
+
+        if archived:
+            data_version.bump(ChatMessage.__tablename__, ChatArchive.__tablename__, ChatSession.__tablename__)
+        metrics.inc("chat_archive_sessions_total", archived, codec=_codec())
+        metrics.inc("chat_archive_bytes_total", raw_total, kind="raw")
+        metrics.inc("chat_archive_bytes_total", stored_total, kind="compressed")
+        return {
+            "sessions": archived,
+            "raw_bytes": raw_total,
+            "compressed_bytes": stored_total,
+            "ratio": round(raw_total / stored_total, 2) if stored_total else None,
+            "elapsed_s": round(time.perf_counter() - started, 2),
+        }
@@ -0,0 +1,68 @@
+"""
+In-process fan-out of chat events to a user's open WebSocket connections.
+
+Publishers (REST endpoints, the WebSocket handler, the title worker thread) call
+publish(user_id, event) from any thread; each subscribed connection gets the
+event on its own asyncio queue, delivered on that connection's event loop.
+Like data_version, the broker is per-process: a connection only sees events
+produced by the worker that serves it.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Set, Tuple
+
+from app.core.metrics import metrics
+
+# Slow consumers drop events rather than grow without bound; clients resync
+# (GET /chat/sync) when they see a "resync" frame.
+MAX_PENDING_EVENTS = 256
+
+
+class ChatEventBroker:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Call from the connection's event loop; pair with unsubscribe()."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        metrics.inc("chat_ws_subscriptions_total")
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            for entry in [e for e in subscribers if e[1] is queue]:
+                subscribers.discard(entry)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def has_subscribers(self, user_id: str = None) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(user_id)) if user_id else bool(self._subscribers)
+
+    def publish(self, user_id: str, event: dict) -> None:
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, event)
+            except RuntimeError:
+                # Loop already closed; the connection is going away
+                pass
+
+
+def _deliver(queue: asyncio.Queue, event: dict) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        metrics.inc("chat_ws_events_dropped_total")
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"type": "resync"})
+
+
+chat_events = ChatEventBroker()
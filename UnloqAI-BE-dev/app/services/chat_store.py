@@ -0,0 +1,111 @@
+"""
+Consolidated write path for an incoming chat message.
+
+Validating the session, inserting the user message, bumping the session's
+counters and reading the recent turns for the prompt used to take half a dozen
+round trips before the stream could start. On Postgres it is now a single
+statement (data-modifying CTEs with RETURNING) plus the commit; elsewhere it is
+one short transaction of three statements.
+"""
+import uuid
+from collections import namedtuple
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.db import data_version
+from app.models.meridian import ChatSession, ChatMessage
+
+# `session` exposes session_id, title, summary, summary_message_count, message_count, archived_at;
+# `recent` holds (role, content) rows, newest first, excluding the new message.
+AppendResult = namedtuple("AppendResult", ["session", "message_id", "message_count", "recent"])
+SessionState = namedtuple("SessionState", ["session_id", "title", "summary", "summary_message_count", "message_count", "archived_at"])
+Turn = namedtuple("Turn", ["role", "content"])
+
+_APPEND_SQL = text("""
+    WITH updated AS (
+        UPDATE chat_sessions
+        SET message_count = message_count + 1, updated_at = :now, last_message_at = :now, changed_at = :now
+        WHERE session_id = CAST(:sid AS uuid) AND user_id = :user_id
+        RETURNING session_id, title, summary, summary_message_count, message_count, archived_at
+    ), inserted AS (
+        INSERT INTO chat_messages (id, session_id, role, content, created_at)
+        SELECT CAST(:mid AS uuid), session_id, 'user', :content, :now FROM updated
+        RETURNING id
+    )
+    SELECT u.session_id, u.title, u.summary, u.summary_message_count, u.message_count, u.archived_at,
+           h.role, h.content
+    FROM updated u
+    LEFT JOIN LATERAL (
+        -- CTEs share one snapshot: the message inserted above is not visible here
+        SELECT role, content, created_at FROM chat_messages
+        WHERE session_id = u.session_id
+        ORDER BY created_at DESC
+        LIMIT :window
+    ) h ON true
+    ORDER BY h.created_at DESC
+""")
+
+
+def append_user_message(db: Session, session_id: uuid.UUID, user_id: str, content: str, window: int) -> Optional[AppendResult]:
+    """
+    Appends a user message to `user_id`'s session and returns the session state
+    plus the `window` most recent earlier turns. Returns None (and writes
+    nothing) when the session does not exist or belongs to someone else. Commits.
+    """
+    now = datetime.utcnow()
+    message_id = uuid.uuid4()
+    if db.bind.dialect.name == "postgresql":
+        result = _append_postgres(db, session_id, user_id, content, window, now, message_id)
+    else:
+        result = _append_generic(db, session_id, user_id, content, window, now, message_id)
+    if result is None:
+        db.rollback()
+        return None
+    db.commit()
+    # Raw SQL is invisible to the ORM hooks that track writes
+    data_version.bump(ChatSession.__tablename__, ChatMessage.__tablename__)
+    return result
+
+
+def _append_postgres(db, session_id, user_id, content, window, now, message_id) -> Optional[AppendResult]:
+    rows = db.execute(_APPEND_SQL, {
+        "sid": str(session_id), "user_id": user_id, "mid": str(message_id),
+        "content": content, "now": now, "window": window,
+    }).all()
+    if not rows:
+        return None
+    first = rows[0]
+    state = SessionState(first.session_id, first.title, first.summary, first.summary_message_count,
+                         first.message_count, first.archived_at)
+    recent = [Turn(r.role, r.content) for r in rows if r.role is not None]
+    return AppendResult(state, message_id, state.message_count, recent)
+
+
+def _append_generic(db, session_id, user_id, content, window, now, message_id) -> Optional[AppendResult]:
+    table = ChatSession.__table__
+    row = db.execute(
+        update(table)
+        .where(table.c.session_id == session_id, table.c.user_id == user_id)
+        .values(message_count=table.c.message_count + 1, updated_at=now, last_message_at=now, changed_at=now)
+        .returning(table.c.session_id, table.c.title, table.c.summary,
+                   table.c.summary_message_count, table.c.message_count, table.c.archived_at)
+    ).first()
+    if row is None:
+        return None
+    state = SessionState(*row)
+    messages = ChatMessage.__table__
+    recent: List[Turn] = [
+        Turn(r.role, r.content) for r in db.execute(
+            select(messages.c.role, messages.c.content)
+            .where(messages.c.session_id == session_id)
+            .order_by(messages.c.created_at.desc())
+            .limit(window)
+        )
+    ]
+    db.execute(insert(messages).values(
+        id=message_id, session_id=session_id, role="user", content=content, created_at=now,
+    ))
+    return AppendResult(state, message_id, state.message_count, recent)
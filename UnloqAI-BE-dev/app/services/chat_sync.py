@@ -0,0 +1,155 @@
+"""
+Delta sync for polling chat clients.
+
+A client keeps the `cursor` from its last sync and asks only for what changed
+after it: sessions whose changed_at moved past the cursor, and their messages
+created since. The ETag is derived from one aggregate over the user's sessions
+((user_id, changed_at) index), so an unchanged poll is answered 304 without
+loading or serialising a single row.
+
+Responses are bounded. The first sync (no cursor) lists sessions only; their
+messages load through the paginated history endpoint. A response carries at
+most CHAT_SYNC_MAX_SESSIONS sessions and sets `has_more` when the client should
+call again straight away with the returned cursor. Each session carries at most
+CHAT_PAGE_SIZE of its newest changed messages, plus a `messages_cursor` for
+GET /sessions/{id}/messages when older ones were left out.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.api.pagination import encode_cursor
+from app.core.config import settings
+from app.models.meridian import ChatSession, ChatMessage
+from app.services import chat_archive
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[datetime]:
+    if not cursor:
+        return None
+    try:
+        return datetime.fromisoformat(cursor)
+    except ValueError:
+        raise ValueError("Invalid sync cursor")
+
+
+def sync_etag(db: Session, user_id: str, cursor: Optional[str] = None) -> str:
+    """
+    Strong validator for the user's chat state (as seen from `cursor`).
+    Changes on any session insert, delete or write.
+    """
+    count, latest = db.query(func.count(ChatSession.session_id), func.max(ChatSession.changed_at)).filter(
+        ChatSession.user_id == user_id
+    ).one()
+    raw = f"{user_id}|{cursor or ''}|{count}|{latest.isoformat() if latest else ''}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+def _changed_sessions(db: Session, user_id: str, since: Optional[datetime]) -> Tuple[List[ChatSession], bool]:
+    """
+    Up to CHAT_SYNC_MAX_SESSIONS sessions changed after `since`, oldest change
+    first, and whether more follow. A page never ends inside a run of equal
+    changed_at values, so a cursor at its last timestamp skips nothing.
+    """
+    limit = settings.CHAT_SYNC_MAX_SESSIONS
+    query = db.query(ChatSession).filter(ChatSession.user_id == user_id)
+    if since is not None:
+        query = query.filter(ChatSession.changed_at > since)
+    sessions = query.order_by(ChatSession.changed_at.asc(), ChatSession.session_id.asc()).limit(limit + 1).all()
+    if len(sessions) <= limit:
+        return sessions, False
+    sessions = sessions[:limit]
+    boundary = sessions[-1].changed_at
+    seen = {s.session_id for s in sessions}
+    sessions += [
+        s for s in query.filter(ChatSession.changed_at == boundary).order_by(ChatSession.session_id.asc())
+        if s.session_id not in seen
+    ]
+    return sessions, True
+
+
+def _recent_messages(db: Session, sessions: List[ChatSession], after: datetime) -> Dict:
+    """Per session: messages created after `after`, newest CHAT_PAGE_SIZE + 1 first."""
+    per_session = settings.CHAT_PAGE_SIZE + 1
+    by_session = defaultdict(list)
+    hot = [s.session_id for s in sessions]
+    if hot:
+        rank = func.row_number().over(
+            partition_by=ChatMessage.session_id,
+            order_by=(ChatMessage.created_at.desc(), ChatMessage.id.desc()),
+        ).label("rank")
+        ranked = (
+            select(ChatMessage.id, rank)
+            .where(ChatMessage.session_id.in_(hot), ChatMessage.created_at > after)
+            .subquery()
+        )
+        rows = (
+            db.query(ChatMessage)
+            .join(ranked, ChatMessage.id == ranked.c.id)
+            .filter(ranked.c.rank <= per_session)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        )
+        for m in rows:
+            by_session[m.session_id].append(m)
+    for s in sessions:
+        if s.archived_at is not None:
+            # Cold sessions keep their messages in chat_archives (only reached by long-offline clients)
+            archived = [m for m in chat_archive.load_messages(db, s.session_id) if m.created_at and m.created_at > after]
+            merged = sorted(archived + by_session[s.session_id], key=lambda m: (m.created_at, m.id), reverse=True)
+            by_session[s.session_id] = merged[:per_session]
+    return by_session
+
+
+def changes_since(db: Session, user_id: str, since: Optional[datetime]) -> Dict:
+    """
+    Sessions changed after `since` (all sessions when None) with their new
+    messages, the ids of every live session (so clients can drop deleted ones)
+    and the cursor for the next call. See the module docstring for the bounds.
+
+    Messages are re-sent from CHAT_SYNC_OVERLAP_MS before `since`: write-behind
+    replies are committed slightly after their created_at, and clients merge by id.
+    """
+    sessions, has_more = _changed_sessions(db, user_id, since)
+
+    messages, older = [], {}
+    if since is not None and sessions:
+        overlap = since - timedelta(milliseconds=settings.CHAT_SYNC_OVERLAP_MS)
+        for sid, recent in _recent_messages(db, sessions, overlap).items():
+            if len(recent) > settings.CHAT_PAGE_SIZE:
+                recent = recent[:settings.CHAT_PAGE_SIZE]
+                older[sid] = encode_cursor(recent[-1].created_at, recent[-1].id)
+            messages += recent
+        messages.sort(key=lambda m: (m.created_at, m.id))
+
+    live_ids = [sid for (sid,) in db.query(ChatSession.session_id).filter(ChatSession.user_id == user_id)]
+    latest = max((s.changed_at for s in sessions if s.changed_at), default=since)
+    return {
+        "cursor": latest.isoformat() if latest else None,
+        "has_more": has_more,
+        "sessions": [
+            {
+                "session_id": str(s.session_id),
+                "title": s.title,
+                "created_at": s.created_at.isoformat(),
+                "updated_at": s.updated_at.isoformat() if s.updated_at else None,
+                "message_count": s.message_count,
+                "messages_cursor": older.get(s.session_id),
+            }
+            for s in sessions
+        ],
+        "messages": [
+            {
+                "id": str(m.id),
+                "session_id": str(m.session_id),
+                "role": m.role,
+                "content": m.content,
+                "created_at": m.created_at.isoformat(),
+            }
+            for m in messages
+        ],
+        "session_ids": [str(sid) for sid in live_ids],
+    }
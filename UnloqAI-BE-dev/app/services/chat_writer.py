@@ -0,0 +1,263 @@
+"""
+Write-behind persistence for chat messages.
+
+Streamed assistant replies are handed to a background writer instead of being
+saved on the request path. The writer batches rows and flushes every
+CHAT_WRITE_BATCH_SIZE messages or CHAT_WRITE_FLUSH_MS milliseconds, whichever
+comes first. drain() flushes everything still queued and is called on app shutdown.
+
+The worker thread needs a long-lived server. With BACKGROUND_WORKERS off (the
+default under Lambda, where the process is frozen between invocations) enqueue()
+writes the row on the calling thread before returning.
+
+flush_session() writes one session's queued rows on the calling thread, so a
+follow-up question's history includes the reply it is following up on.
+
+Rows for sessions deleted while they sat in the queue are dropped on their own;
+the rest of the batch is still written. A flush that fails outright is put
+back on the queue and retried, up to CHAT_WRITE_MAX_ATTEMPTS per row. Drops
+are counted in chat_write_dropped_total.
+"""
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics, COUNT_BUCKETS
+from app.db.session import SessionLocal
+from app.models.meridian import ChatSession, ChatMessage
+
+# Queued by drain() to wake the worker so it flushes its partial batch and exits
+_STOP = object()
+
+
+class ChatWriteBehind:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = None,
+        flush_interval_ms: int = None,
+        max_attempts: int = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.CHAT_WRITE_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.CHAT_WRITE_FLUSH_MS) / 1000.0
+        self.max_attempts = max_attempts or settings.CHAT_WRITE_MAX_ATTEMPTS
+        # Failed flush attempts per queued message id; guarded by _flush_lock
+        self._attempts: Dict[uuid.UUID, int] = {}
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        # Rows no flush has claimed yet (by id), and rows not yet written per session.
+        # A row is claimed once, so the worker and flush_session() never both insert it.
+        self._unclaimed: Dict[uuid.UUID, dict] = {}
+        self._unwritten: Dict[uuid.UUID, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # Started lazily so importing the module (tests, Lambda cold start) is free
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, session_id, role: str, content: str, created_at: datetime = None) -> uuid.UUID:
+        """Queues a message for persistence and returns its pre-assigned id."""
+        message_id = uuid.uuid4()
+        row = {
+            "id": message_id,
+            "session_id": session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id)),
+            "role": role,
+            "content": content,
+            "created_at": created_at or datetime.utcnow(),
+        }
+        with self._lock:
+            self._unclaimed[message_id] = row
+            self._unwritten[row["session_id"]] = self._unwritten.get(row["session_id"], 0) + 1
+        self._queue.put(row)
+        metrics.set_gauge("chat_write_queue_depth", self._queue.qsize())
+        if settings.BACKGROUND_WORKERS:
+            self._ensure_started()
+        else:
+            self._flush_queued()
+        return message_id
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush_session(self, session_id) -> None:
+        """
+        Writes `session_id`'s queued rows now, on the calling thread. Waits for a
+        flush already in progress, so on return every row queued before the call
+        is committed (or was dropped).
+        """
+        sid = session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))
+        if not self._unwritten.get(sid):
+            return
+        with self._flush_lock:
+            with self._lock:
+                rows = [row for row in self._unclaimed.values() if row["session_id"] == sid]
+            if rows:
+                self._flush(rows)
+
+    def _claim(self, batch: List[dict]) -> List[dict]:
+        """Keeps the rows no other flush has taken yet."""
+        with self._lock:
+            return [row for row in batch if self._unclaimed.pop(row["id"], None) is not None]
+
+    def _settle(self, rows: List[dict]) -> None:
+        """Rows written or dropped: nothing left to flush for them."""
+        with self._lock:
+            for row in rows:
+                sid = row["session_id"]
+                left = self._unwritten.get(sid, 0) - 1
+                if left > 0:
+                    self._unwritten[sid] = left
+                else:
+                    self._unwritten.pop(sid, None)
+
+    def _collect_batch(self):
+        """Returns (batch, stopping)."""
+        batch: List[dict] = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            if deadline is None:
+                # The flush window opens with the first message of the batch
+                deadline = time.monotonic() + self.flush_interval
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            batch, stopping = self._collect_batch()
+            if batch and not self._flush(batch) and not stopping:
+                # Back off before the requeued rows come round again
+                time.sleep(self.flush_interval)
+            if stopping:
+                return
+
+    def _flush(self, batch: List[dict]) -> bool:
+        """Writes a batch. Returns False when it failed and was requeued."""
+        with self._flush_lock:
+            batch = self._claim(batch)
+            if not batch:
+                # Already written by flush_session()
+                return True
+            return self._write(batch)
+
+    def _write(self, batch: List[dict]) -> bool:
+        started = time.perf_counter()
+        db = None
+        try:
+            db = self.session_factory()
+            # Sessions deleted while their messages were queued would fail the whole insert
+            sids = {row["session_id"] for row in batch}
+            live = set(db.execute(select(ChatSession.session_id).where(ChatSession.session_id.in_(sids))).scalars())
+            orphans = [row for row in batch if row["session_id"] not in live]
+            if orphans:
+                metrics.inc("chat_write_dropped_total", len(orphans), reason="session_deleted")
+                self._settle(orphans)
+                batch = [row for row in batch if row["session_id"] in live]
+            if batch:
+                db.execute(insert(ChatMessage), batch)
+                latest, counts = {}, {}
+                for row in batch:
+                    sid = row["session_id"]
+                    latest[sid] = max(latest.get(sid, row["created_at"]), row["created_at"])
+                    counts[sid] = counts.get(sid, 0) + 1
+                for sid, ts in latest.items():
+                    db.execute(
+                        update(ChatSession)
+                        .where(ChatSession.session_id == sid)
+                        .values(
+                            updated_at=ts,
+                            last_message_at=ts,
+                            message_count=ChatSession.message_count + counts[sid],
+                        )
+                    )
+                db.commit()
+        except Exception:
+            if db is not None:
+                db.rollback()
+            self._requeue(batch)
+            return False
+        finally:
+            if db is not None:
+                db.close()
+        for row in batch:
+            self._attempts.pop(row["id"], None)
+        self._settle(batch)
+        metrics.inc("chat_writes_total", len(batch))
+        metrics.observe("chat_write_batch_size", len(batch), buckets=COUNT_BUCKETS)
+        metrics.observe("chat_write_flush_ms", (time.perf_counter() - started) * 1000)
+        metrics.set_gauge("chat_write_queue_depth", self._queue.qsize())
+        return True
+
+    def _requeue(self, batch: List[dict]) -> None:
+        metrics.inc("chat_write_failures_total", len(batch))
+        dropped = []
+        for row in batch:
+            attempts = self._attempts.get(row["id"], 0) + 1
+            if attempts >= self.max_attempts:
+                self._attempts.pop(row["id"], None)
+                dropped.append(row)
+                continue
+            self._attempts[row["id"]] = attempts
+            with self._lock:
+                self._unclaimed[row["id"]] = row
+            self._queue.put(row)
+        if dropped:
+            self._settle(dropped)
+            metrics.inc("chat_write_dropped_total", len(dropped), reason="retries_exhausted")
+        metrics.set_gauge("chat_write_queue_depth", self._queue.qsize())
+
+    def drain(self, timeout: float = 10.0) -> int:
+        """
+        Stops the worker and synchronously flushes everything still queued.
+        Returns the number of queued messages written (or dropped) here.
+        """
+        if self._thread and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=timeout)
+        return self._flush_queued()
+
+    def _flush_queued(self) -> int:
+        """Flushes the queue on the calling thread, batch by batch, until it is empty."""
+        flushed = 0
+        # Failed batches requeue themselves; max_attempts bounds this loop
+        while True:
+            batch: List[dict] = []
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                # Skips rows flush_session() has already taken
+                if item is not _STOP and item["id"] in self._unclaimed:
+                    batch.append(item)
+            if not batch:
+                return flushed
+            if self._flush(batch):
+                flushed += len(batch)
+
+
+chat_writer = ChatWriteBehind()
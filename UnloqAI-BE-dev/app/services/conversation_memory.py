@@ -0,0 +1,185 @@
+"""
+Bounded per-session conversation memory.
+
+Each prompt carries the last CHAT_MEMORY_TURNS turns verbatim plus a rolling
+summary of everything older. The summary is cached on ChatSession and refreshed
+by a cheap model on a background worker, so prompt size stays flat no matter
+how long a conversation runs and no summarisation happens on the request path.
+Summaries are low priority: they only take an LLM admission slot nobody is
+waiting for, and are deferred to the next message while the service is busy.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.core.metrics import metrics
+from app.models.meridian import ChatSession, ChatMessage
+from app.services.admission import llm_admission
+from app.services.llm_service import get_llm_service
+
+# Admission key for background summaries, so they count against the global cap
+SUMMARY_USER = "system:summary"
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = text or ""
+    return text if len(text) <= limit else text[:limit] + " …[truncated]"
+
+
+def _normalise_turns(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Providers expect alternating user/assistant turns starting with the user:
+    drop a leading assistant reply and merge consecutive same-role messages.
+    """
+    turns: List[Dict[str, str]] = []
+    for m in messages:
+        if not turns and m["role"] != "user":
+            continue
+        if turns and turns[-1]["role"] == m["role"]:
+            turns[-1]["content"] += "\n\n" + m["content"]
+        else:
+            turns.append(dict(m))
+    return turns
+
+
+class ConversationMemory:
+    def __init__(self, db: Session):
+        self.db = db
+        self.window = settings.CHAT_MEMORY_TURNS * 2
+
+    def history_for(self, session: ChatSession, exclude_id=None) -> List[Dict[str, str]]:
+        """
+        Prompt-ready history for `session`: the cached summary (if any) as a
+        system message, then the most recent turns, oldest first.
+        `exclude_id` skips the message currently being answered.
+        """
+        query = self.db.query(ChatMessage).filter(ChatMessage.session_id == session.session_id)
+        if exclude_id is not None:
+            query = query.filter(ChatMessage.id != exclude_id)
+        recent = query.order_by(ChatMessage.created_at.desc()).limit(self.window).all()
+        return self.history_from(session, recent)
+
+    def history_from(self, session, recent) -> List[Dict[str, str]]:
+        """
+        Builds the prompt history from already-fetched rows: `recent` is the
+        latest messages (anything with .role/.content), newest first, and
+        `session` anything with .summary.
+        """
+        turns = _normalise_turns([
+            {"role": m.role, "content": _truncate(m.content, settings.CHAT_MEMORY_MESSAGE_CHARS)}
+            for m in reversed(list(recent))
+        ])
+        if session.summary:
+            turns.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{session.summary}",
+            })
+        return turns
+
+    def needs_refresh(self, session: ChatSession, message_count: int) -> bool:
+        """True once enough messages have aged out of the verbatim window."""
+        unsummarised = message_count - self.window - (session.summary_message_count or 0)
+        return unsummarised >= settings.CHAT_SUMMARY_MIN_NEW_MESSAGES
+
+
+class SummaryRefresher:
+    """
+    Single background worker that folds aged-out turns into ChatSession.summary.
+    One refresh per session at a time; duplicate requests are dropped.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, session_id) -> bool:
+        sid = session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))
+        with self._lock:
+            if sid in self._pending:
+                return False
+            self._pending.add(sid)
+        self._executor.submit(self._run, sid)
+        return True
+
+    def _run(self, sid: uuid.UUID) -> None:
+        try:
+            self.refresh(sid)
+        except Exception as e:
+            print(f"Summary refresh failed for {sid}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(sid)
+
+    def refresh(self, session_id) -> Optional[str]:
+        """Summarises every message older than the verbatim window. Returns the new summary."""
+        sid = session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id))
+        window = settings.CHAT_MEMORY_TURNS * 2
+        db = self.session_factory()
+        try:
+            session = db.query(ChatSession).filter(ChatSession.session_id == sid).first()
+            if not session:
+                return None
+            covered = session.summary_message_count or 0
+            total = session.message_count
+            upto = total - window
+            if upto <= covered:
+                return session.summary
+
+            aged_out = (
+                db.query(ChatMessage)
+                .filter(ChatMessage.session_id == sid)
+                .order_by(ChatMessage.created_at.asc())
+                .offset(covered)
+                .limit(upto - covered)
+                .all()
+            )
+            transcript = "\n".join(
+                f"{m.role.upper()}: {_truncate(m.content, settings.CHAT_MEMORY_MESSAGE_CHARS)}"
+                for m in aged_out
+            )
+            ticket = llm_admission.try_acquire(SUMMARY_USER)
+            if ticket is None:
+                # Busy: interactive requests come first; the next message reschedules us
+                metrics.inc("chat_summary_deferred_total")
+                return session.summary
+            try:
+                summary = self._summarise(session.summary, transcript)
+            finally:
+                ticket.release()
+            if not summary:
+                return session.summary
+
+            session.summary = summary
+            session.summary_message_count = upto
+            db.commit()
+            return summary
+        finally:
+            db.close()
+
+    def _summarise(self, previous: Optional[str], transcript: str) -> str:
+        limit = settings.CHAT_SUMMARY_MAX_CHARS
+        prompt = (
+            "Update the running summary of a conversation between an executive and a strategy analyst.\n"
+            "Keep every figure, entity, decision and open question. Plain text, no JSON, "
+            f"under {limit} characters.\n\n"
+            f"CURRENT SUMMARY:\n{previous or '(none)'}\n\n"
+            f"NEW TURNS:\n{transcript}\n\n"
+            "UPDATED SUMMARY:"
+        )
+        messages = [
+            {"role": "system", "content": "You write terse, factual conversation summaries."},
+            {"role": "user", "content": prompt},
+        ]
+        llm = get_llm_service()
+        text = "".join(llm.stream_chat(messages, model_name=settings.LLM_SUMMARY_MODEL or None))
+        return _truncate(text.strip(), limit)
+
+
+summary_refresher = SummaryRefresher()
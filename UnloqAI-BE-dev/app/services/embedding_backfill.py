@@ -0,0 +1,115 @@
+"""
+Chunked, concurrent, resumable embedding backfill for ExternalSignal.
+
+Rows are paged with keyset iteration on signal_id (no OFFSET scans), each page
+is embedded through VectorService.embed_many (cache-aware, provider batch APIs,
+bounded concurrency) and written back with a single executemany UPDATE. The
+page and its checkpoint commit together, so a crash loses at most one page and
+the next run resumes after the last committed key.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics, RATE_BUCKETS
+from app.models.meridian import ExternalSignal, JobCheckpoint
+from app.services.vector_index import apply_committed
+from app.services.vector_service import VectorService
+
+JOB_NAME = "external_signal_embeddings"
+
+
+class EmbeddingBackfill:
+    def __init__(
+        self,
+        db: Session,
+        chunk_size: int = None,
+        concurrency: int = None,
+        job_name: str = JOB_NAME,
+    ):
+        self.db = db
+        self.chunk_size = chunk_size or settings.EMBEDDING_BACKFILL_CHUNK_SIZE
+        self.concurrency = concurrency or settings.EMBEDDING_CONCURRENCY
+        self.job_name = job_name
+        self.vectors = VectorService(db)
+
+    def _checkpoint(self) -> JobCheckpoint:
+        checkpoint = self.db.get(JobCheckpoint, self.job_name)
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(job_name=self.job_name, cursor=None, processed=0, failed=0)
+            self.db.add(checkpoint)
+            self.db.commit()
+        return checkpoint
+
+    def _fits(self, vector: list) -> bool:
+        """Empty (failed) or wrong-dimension vectors would abort the whole page's UPDATE."""
+        dim = ExternalSignal.__table__.c.embedding.type.dim
+        return bool(vector) and (dim is None or len(vector) == dim)
+
+    def run(self, restart: bool = False, max_chunks: Optional[int] = None) -> Dict:
+        """
+        Embeds every signal without an embedding, resuming from the last checkpoint.
+        `restart` ignores the checkpoint (e.g. to retry rows that failed earlier).
+        Returns counts and throughput for this run.
+        """
+        checkpoint = self._checkpoint()
+        if restart:
+            checkpoint.cursor = None
+            self.db.commit()
+
+        table = ExternalSignal.__table__
+        write = (
+            update(table)
+            .where(table.c.signal_id == bindparam("sid"))
+            .values(embedding=bindparam("vec", type_=table.c.embedding.type))
+        )
+
+        stats = {"embedded": 0, "failed": 0, "chunks": 0}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed") as pool:
+            while max_chunks is None or stats["chunks"] < max_chunks:
+                query = self.db.query(ExternalSignal.signal_id, ExternalSignal.description).filter(
+                    ExternalSignal.embedding == None  # noqa: E711
+                )
+                if checkpoint.cursor:
+                    query = query.filter(ExternalSignal.signal_id > uuid.UUID(checkpoint.cursor))
+                rows = query.order_by(ExternalSignal.signal_id).limit(self.chunk_size).all()
+                if not rows:
+                    # Finished: the next run starts from the beginning again
+                    checkpoint.cursor = None
+                    self.db.commit()
+                    break
+
+                chunk_started = time.perf_counter()
+                vectors = self.vectors.embed_many([r.description or "" for r in rows], executor=pool)
+                params = [{"sid": r.signal_id, "vec": v} for r, v in zip(rows, vectors) if self._fits(v)]
+                if params:
+                    self.db.execute(write, params)
+
+                failed = len(rows) - len(params)
+                checkpoint.cursor = str(rows[-1].signal_id)
+                checkpoint.processed += len(params)
+                checkpoint.failed += failed
+                self.db.commit()
+                # Core UPDATEs bypass the ORM hooks that normally keep the index current
+                apply_committed(self.db, {p["sid"]: p["vec"] for p in params})
+
+                stats["embedded"] += len(params)
+                stats["failed"] += failed
+                stats["chunks"] += 1
+                rate = len(rows) / max(time.perf_counter() - chunk_started, 1e-6)
+                metrics.inc("embedding_backfill_rows_total", len(params), status="ok")
+                metrics.inc("embedding_backfill_rows_total", failed, status="failed")
+                metrics.observe("embedding_backfill_rows_per_sec", rate, buckets=RATE_BUCKETS)
+                print(f"[{self.job_name}] chunk {stats['chunks']}: {len(params)} embedded, "
+                      f"{failed} failed, {rate:.1f} rows/s (total {checkpoint.processed})")
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_s"] = round(elapsed, 2)
+        stats["rows_per_sec"] = round((stats["embedded"] + stats["failed"]) / elapsed, 1) if elapsed else 0.0
+        return stats
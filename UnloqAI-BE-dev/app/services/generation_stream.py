@@ -0,0 +1,182 @@
+"""
+Chat generations that outlive the HTTP connection.
+
+send_message starts each copilot generation on a background producer thread
+that writes chunks into a per-message ring buffer and persists the finished
+reply itself. The response is just a reader over that buffer, so a dropped
+connection no longer throws the LLM call away: the client reattaches with
+GET /chat/sessions/{id}/stream?offset=N, where N is the number of characters
+it already has, and continues from there.
+
+Buffers are kept for GENERATION_TTL_SECONDS after the generation finishes;
+after that the persisted message is the source of truth.
+"""
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, Generator, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import SessionLocal
+from app.services.chat_writer import chat_writer
+
+
+class OffsetExpired(Exception):
+    """The requested offset has already been evicted from the ring buffer."""
+
+
+class Generation:
+    def __init__(self, session_id: uuid.UUID, capacity: int):
+        self.generation_id = uuid.uuid4()
+        self.session_id = session_id
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        # (start offset, chunk); offsets count characters of the full reply
+        self._chunks: Deque[Tuple[int, str]] = deque(maxlen=capacity)
+        self._length = 0
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def length(self) -> int:
+        return self._length
+
+    def append(self, chunk: str) -> None:
+        with self._cond:
+            self._chunks.append((self._length, chunk))
+            self._length += len(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error: str = None) -> None:
+        with self._cond:
+            self.error = error
+            self.finished_at = time.monotonic()
+            self._cond.notify_all()
+
+    def _since(self, offset: int) -> list:
+        """Chunks covering [offset, length), trimmed to start at `offset`. Call with the lock held."""
+        if offset >= self._length:
+            return []
+        first_start = self._chunks[0][0] if self._chunks else self._length
+        if offset < first_start:
+            raise OffsetExpired(offset)
+        out = []
+        for start, chunk in self._chunks:
+            end = start + len(chunk)
+            if end <= offset:
+                continue
+            out.append(chunk[max(0, offset - start):])
+        return out
+
+    def read(
+        self, offset: int = 0, poll_seconds: float = 1.0, cancelled: threading.Event = None,
+    ) -> Generator[str, None, None]:
+        """
+        Returns a reader that yields the reply from `offset` onwards, blocking for
+        new chunks until the generation finishes. Raises OffsetExpired right
+        away if `offset` is no longer buffered. Setting `cancelled` ends the
+        reader within `poll_seconds`, even while it waits for chunks, so an
+        abandoned reader does not hold a threadpool thread until the end of
+        the generation.
+        """
+        with self._cond:
+            pending = self._since(offset)
+        return self._follow(offset, pending, poll_seconds, cancelled)
+
+    def _follow(self, offset: int, pending: list, poll_seconds: float, cancelled) -> Generator[str, None, None]:
+        while True:
+            for chunk in pending:
+                offset += len(chunk)
+                yield chunk
+            with self._cond:
+                while offset >= self._length and not self.done:
+                    if cancelled is not None and cancelled.is_set():
+                        return
+                    self._cond.wait(poll_seconds)
+                if offset >= self._length:
+                    return
+                pending = self._since(offset)
+
+
+class GenerationRegistry:
+    """Latest generation per chat session, produced on daemon threads."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        capacity: int = None,
+        ttl_seconds: int = None,
+    ):
+        self.session_factory = session_factory
+        self.capacity = capacity or settings.GENERATION_BUFFER_CHUNKS
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.GENERATION_TTL_SECONDS
+        self._by_session: Dict[uuid.UUID, Generation] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self) -> None:
+        # Call with self._lock held
+        now = time.monotonic()
+        for sid, gen in list(self._by_session.items()):
+            if gen.done and now - gen.finished_at > self.ttl_seconds:
+                del self._by_session[sid]
+
+    def get(self, session_id: uuid.UUID) -> Optional[Generation]:
+        with self._lock:
+            self._purge()
+            return self._by_session.get(session_id)
+
+    def start(
+        self,
+        session_id: uuid.UUID,
+        produce: Callable[[Session], Iterable[str]],
+        on_release: Callable[[], None] = None,
+    ) -> Generation:
+        """
+        Runs `produce(db)` to completion on a background thread with its own DB
+        session, buffering every chunk and queueing the full reply for
+        persistence. `on_release` (e.g. an LLM admission ticket's release) runs
+        when production ends, however it ends.
+        """
+        generation = Generation(session_id, self.capacity)
+        with self._lock:
+            self._purge()
+            self._by_session[session_id] = generation
+        threading.Thread(
+            target=self._produce, args=(generation, produce, on_release),
+            name=f"chat-generation-{session_id}", daemon=True,
+        ).start()
+        metrics.inc("chat_generations_total")
+        return generation
+
+    def _produce(self, generation: Generation, produce, on_release) -> None:
+        db = self.session_factory()
+        parts = []
+        error = None
+        try:
+            for chunk in produce(db):
+                if chunk:
+                    parts.append(chunk)
+                    generation.append(chunk)
+            if parts:
+                # Queued before finish() so readers that see the end can rely on it
+                chat_writer.enqueue(generation.session_id, "assistant", "".join(parts))
+        except Exception as e:
+            error = str(e)
+            metrics.inc("chat_generation_errors_total")
+        finally:
+            db.close()
+            if on_release:
+                on_release()
+            generation.finish(error)
+            metrics.observe("chat_generation_seconds", generation.finished_at - generation.started_at)
+
+
+generations = GenerationRegistry()
@@ -1,8 +1,13 @@
 import os
 import json
+import time
+import random
+import hashlib
+import re
 import requests
-from typing import List, Dict, Generator, Any
+from typing import List, Dict, Generator, Any, Callable, Optional
 from app.core.config import settings
+from app.core.metrics import metrics, TOKEN_BUCKETS, RATE_BUCKETS, COUNT_BUCKETS
 
 try:
     import boto3
@@ -22,6 +27,84 @@ try:
 except ImportError:
     HAS_OPENAI = False
 
+class LLMCallMetrics:
+    """
+    Per-call instrumentation record filled in while a stream is consumed.
+    Providers write exact token counts into `usage` when their API reports them;
+    otherwise counts are estimated from character length (~4 chars/token).
+    """
+
+    def __init__(self, messages: List[Dict[str, str]]):
+        self.provider: Optional[str] = None
+        self.model: Optional[str] = None
+        self.prompt_chars = sum(len(m.get("content") or "") for m in messages)
+        self.output_chars = 0
+        self.usage: Dict[str, int] = {}
+        self.fallback_hops = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.usage.get("prompt_tokens") or max(1, self.prompt_chars // 4)
+
+    @property
+    def output_tokens(self) -> int:
+        return self.usage.get("output_tokens") or self.output_chars // 4
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.finished_at or time.perf_counter()
+        return (end - self.started_at) * 1000
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        # Generation rate excludes time-to-first-token so slow queues don't mask slow decoding
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        gen_seconds = self.finished_at - self.first_token_at
+        if gen_seconds <= 0:
+            return None
+        return self.output_tokens / gen_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "status": self.status,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "ttft_ms": round(self.ttft_ms, 1) if self.ttft_ms is not None else None,
+            "tokens_per_sec": round(self.tokens_per_sec, 1) if self.tokens_per_sec is not None else None,
+            "duration_ms": round(self.duration_ms, 1),
+            "fallback_hops": self.fallback_hops,
+            "error": self.error,
+        }
+
+
+def record_llm_call(call: LLMCallMetrics) -> None:
+    """Feeds a finished call into the in-process histograms served at /api/v1/metrics."""
+    labels = {"provider": call.provider or "none", "model": call.model or "unknown"}
+    metrics.inc("llm_calls_total", status=call.status, **labels)
+    metrics.observe("llm_duration_ms", call.duration_ms, **labels)
+    metrics.observe("llm_prompt_tokens", call.prompt_tokens, buckets=TOKEN_BUCKETS, **labels)
+    metrics.observe("llm_output_tokens", call.output_tokens, buckets=TOKEN_BUCKETS, **labels)
+    metrics.observe("llm_fallback_hops", call.fallback_hops, buckets=COUNT_BUCKETS, **labels)
+    if call.ttft_ms is not None:
+        metrics.observe("llm_ttft_ms", call.ttft_ms, **labels)
+    if call.tokens_per_sec is not None:
+        metrics.observe("llm_tokens_per_sec", call.tokens_per_sec, buckets=RATE_BUCKETS, **labels)
+
+
 class LLMService:
     def __init__(self, provider: str = None):
         self.provider = provider or settings.LLM_PROVIDER
@@ -82,56 +165,122 @@ class LLMService:
         self.ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.ollama_model = settings.LLM_MODEL
 
+        # --- Replay Setup (offline load/latency testing) ---
+        self.replay_recordings = self._load_replay_recordings(settings.LLM_REPLAY_FILE)
+
     def stream_chat(self, messages: List[Dict[str, str]], model_name: str = None) -> Generator[str, None, None]:
         """
         Stream chat response compatible with Vercel AI SDK.
         messages format: [{"role": "user", "content": "hello"}]
         """
-    def stream_chat(self, messages: List[Dict[str, str]], model_name: str = None) -> Generator[str, None, None]:
+    def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        model_name: str = None,
+        on_metrics: Optional[Callable[[LLMCallMetrics], None]] = None,
+    ) -> Generator[str, None, None]:
         """
         Stream chat response with fallback: Bedrock -> Gemini -> OpenAI.
-        Ollama is used if explicitly selected as provider.
+        Ollama and Replay are used if explicitly selected as provider.
+
+        Every call is instrumented (TTFT, tokens, tokens/sec, duration, fallback hops)
+        and recorded to the metrics registry. `on_metrics` receives the finished
+        LLMCallMetrics once the stream ends.
         """
-        if self.provider == "ollama":
-            yield from self._stream_ollama(messages, model_name)
-            return
+        call = LLMCallMetrics(messages)
+        try:
+            if self.provider == "ollama":
+                yield from self._measured(
+                    call, "ollama", model_name or self.ollama_model,
+                    self._stream_ollama(messages, model_name, usage=call.usage),
+                )
+                return
+
+            if self.provider == "replay":
+                yield from self._measured(
+                    call, "replay", model_name or "replay",
+                    self._stream_replay(messages, model_name, usage=call.usage),
+                )
+                return
+
+            # Fallback Strategy:
+            # 1. Try Bedrock
+            try:
+                # We iterate to ensure the stream actually starts; if it fails immediately, we catch it.
+                # Generators are lazy, so we must start consuming to catch the error here, 
+                # BUT we want to yield the items.
+                # However, if we put `yield from` in a try/except block, exceptions raised DURING iteration 
+                # will be caught. If `_stream_bedrock` fails mid-stream, we might have already sent partial data.
+                # The prompt implies "if bedrock don't work", likely meaning initial connection/availability.
+                # For simplicity and safety, we allow fallback on any error, but practically, 
+                # switching providers mid-sentence is bad UX (but better than crash).
+                # The safest approach for "mid-stream" failure is hard, but let's assume strict failover.
 
-        # Fallback Strategy:
-        # 1. Try Bedrock
+                yield from self._measured(
+                    call, "bedrock", self._bedrock_model_id(model_name),
+                    self._stream_bedrock(messages, model_name, usage=call.usage),
+                )
+                return
+            except Exception as e:
+                call.fallback_hops += 1
+                call.status = "error"
+                call.error = str(e)
+                print(f"Bedrock failed: {e}. Falling back to Gemini...")
+
+            # # 2. Try Gemini
+            # try:
+            #     yield from self._stream_gemini(messages, model_name)
+            #     return
+            # except Exception as e:
+            #     print(f"Gemini failed: {e}. Falling back to OpenAI...")
+
+            # # 3. Try OpenAI
+            # try:
+            #     yield from self._stream_openai(messages, model_name)
+            #     return
+            # except Exception as e:
+            #     yield json.dumps({
+            #         "type": "error", 
+            #         "blocks": [{"type": "summary", "text": f"All providers failed. Last Error: {str(e)}"}]
+            #     })
+        except GeneratorExit:
+            call.status = "cancelled"
+            raise
+        finally:
+            call.finished_at = time.perf_counter()
+            record_llm_call(call)
+            if on_metrics:
+                try:
+                    on_metrics(call)
+                except Exception as e:
+                    print(f"LLM metrics callback failed: {e}")
+
+    def _measured(self, call: LLMCallMetrics, provider: str, model: str, stream) -> Generator[str, None, None]:
+        """
+        Passes a provider stream through while recording first-token time and output size.
+        Errors, including ones raised mid-stream, are recorded on `call` and re-raised
+        so stream_chat can fall back.
+        """
+        call.provider = provider
+        call.model = model
+        call.status = "ok"
+        call.error = None
         try:
-            # We iterate to ensure the stream actually starts; if it fails immediately, we catch it.
-            # Generators are lazy, so we must start consuming to catch the error here, 
-            # BUT we want to yield the items.
-            # However, if we put `yield from` in a try/except block, exceptions raised DURING iteration 
-            # will be caught. If `_stream_bedrock` fails mid-stream, we might have already sent partial data.
-            # The prompt implies "if bedrock don't work", likely meaning initial connection/availability.
-            # For simplicity and safety, we allow fallback on any error, but practically, 
-            # switching providers mid-sentence is bad UX (but better than crash).
-            # The safest approach for "mid-stream" failure is hard, but let's assume strict failover.
-            
-            yield from self._stream_bedrock(messages, model_name)
-            return
+            for chunk in stream:
+                if chunk and call.first_token_at is None:
+                    call.first_token_at = time.perf_counter()
+                call.output_chars += len(chunk or "")
+                yield chunk
         except Exception as e:
-            print(f"Bedrock failed: {e}. Falling back to Gemini...")
-
-        # # 2. Try Gemini
-        # try:
-        #     yield from self._stream_gemini(messages, model_name)
-        #     return
-        # except Exception as e:
-        #     print(f"Gemini failed: {e}. Falling back to OpenAI...")
-            
-        # # 3. Try OpenAI
-        # try:
-        #     yield from self._stream_openai(messages, model_name)
-        #     return
-        # except Exception as e:
-        #     yield json.dumps({
-        #         "type": "error", 
-        #         "blocks": [{"type": "summary", "text": f"All providers failed. Last Error: {str(e)}"}]
-        #     })
-
-    def _stream_bedrock(self, messages: List[Dict[str, str]], model_name: str = None):
+            call.status = "error"
+            call.error = str(e)
+            raise
+
+    def _bedrock_model_id(self, model_name: str = None) -> str:
+        # Use configured model from settings if available, otherwise fallback to Sonnet 3.5
+        return model_name or settings.LLM_MODEL or "anthropic.claude-3-5-sonnet-20240620-v1:0"
+
+    def _stream_bedrock(self, messages: List[Dict[str, str]], model_name: str = None, usage: dict = None):
         """
         Uses Claude 3.5 Sonnet (or Haiku) via Bedrock.
         """
@@ -139,10 +288,7 @@ class LLMService:
             # Raise error to trigger fallback
             raise ValueError("AWS Configuration Missing or boto3 not installed.")
 
-        # Model ID for Claude 3.5 Sonnet
-        # Model ID for Claude 3.5 Sonnet (default backup)
-        # Use configured model from settings if available, otherwise fallback to Sonnet 3.5
-        model_id = model_name or settings.LLM_MODEL or "anthropic.claude-3-5-sonnet-20240620-v1:0"
+        model_id = self._bedrock_model_id(model_name)
 
         # Format Messages for Claude (System prompt is separate)
         system_prompts = []
@@ -179,13 +325,23 @@ class LLMService:
                         chunk_data = json.loads(chunk.get('bytes').decode())
                         if chunk_data.get('type') == 'content_block_delta':
                             yield chunk_data['delta'].get('text', '')
+                        elif usage is not None:
+                            # Exact token usage arrives on message_start / message_delta
+                            if chunk_data.get('type') == 'message_start':
+                                msg_usage = chunk_data.get('message', {}).get('usage', {})
+                                if 'input_tokens' in msg_usage:
+                                    usage['prompt_tokens'] = msg_usage['input_tokens']
+                            elif chunk_data.get('type') == 'message_delta':
+                                delta_usage = chunk_data.get('usage', {})
+                                if 'output_tokens' in delta_usage:
+                                    usage['output_tokens'] = delta_usage['output_tokens']
                             
         except Exception as e:
             # Re-raise error to trigger fallback
             print(f"Bedrock Error Detailed: {e}")
             raise e
 
-    def _stream_ollama(self, messages: List[Dict[str, str]], model_name: str = None):
+    def _stream_ollama(self, messages: List[Dict[str, str]], model_name: str = None, usage: dict = None):
         """
         Specialized Ollama streamer that enforces JSON structure for the Dashboard.
         """
@@ -222,6 +378,11 @@ class LLMService:
                             if "message" in body and "content" in body["message"]:
                                 yield body["message"]["content"]
                             if body.get("done"):
+                                if usage is not None:
+                                    if body.get("prompt_eval_count"):
+                                        usage["prompt_tokens"] = body["prompt_eval_count"]
+                                    if body.get("eval_count"):
+                                        usage["output_tokens"] = body["eval_count"]
                                 break
                         except json.JSONDecodeError:
                             continue
@@ -235,6 +396,85 @@ class LLMService:
             })
             yield error_json
 
+    # ------------------------------------------------------------------
+    # Replay provider
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _load_replay_recordings(path: str) -> List[dict]:
+        """
+        Recordings are JSONL, one per line:
+            {"match": "product b", "response": "{...}"}
+        `match` is an optional case-insensitive substring of the last user message.
+        """
+        if not path:
+            return []
+        recordings = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        recordings.append(json.loads(line))
+        except Exception as e:
+            print(f"Failed to load replay recordings from {path}: {e}")
+        return recordings
+
+    @staticmethod
+    def _last_user_message(messages: List[Dict[str, str]]) -> str:
+        return next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+    def _replay_response(self, messages: List[Dict[str, str]]) -> str:
+        last_user = self._last_user_message(messages)
+        lower = last_user.lower()
+
+        for rec in self.replay_recordings:
+            if rec.get("match") and rec["match"].lower() in lower:
+                return rec["response"]
+
+        unmatched = [rec for rec in self.replay_recordings if not rec.get("match")]
+        if unmatched:
+            # Same prompt -> same recording, across runs and workers
+            digest = int(hashlib.sha256(last_user.encode()).hexdigest(), 16)
+            return unmatched[digest % len(unmatched)]["response"]
+
+        # Templated default in the BlockRenderer schema
+        quoted = re.search(r'USER QUERY:\s*"(.*?)"', last_user, re.DOTALL)
+        question = (quoted.group(1) if quoted else last_user).strip()[:120]
+        return json.dumps({
+            "type": "analysis_response",
+            "title": "Replay Response",
+            "blocks": [
+                {"type": "summary", "text": f"Replayed analysis for: {question}"},
+                {"type": "metrics", "items": [{"label": "Replay", "value": "1", "change": "0%"}]},
+            ],
+        })
+
+    def _stream_replay(self, messages: List[Dict[str, str]], model_name: str = None, usage: dict = None):
+        """
+        Deterministic local provider. Streams recorded or templated responses with
+        configurable time-to-first-token, tokens/sec and error injection, so the full
+        copilot/chat/streaming stack can be load-tested without Bedrock.
+        """
+        response = self._replay_response(messages)
+        # Whitespace-delimited words stand in for tokens
+        tokens = re.findall(r"\S+\s*", response) or [response]
+        if usage is not None:
+            usage["output_tokens"] = len(tokens)
+
+        if settings.LLM_REPLAY_TTFT_MS > 0:
+            time.sleep(settings.LLM_REPLAY_TTFT_MS / 1000.0)
+        # Seeded per prompt, so which requests fail doesn't depend on thread scheduling
+        rng = random.Random(f"{settings.LLM_REPLAY_SEED}:{self._last_user_message(messages)}")
+        if settings.LLM_REPLAY_ERROR_RATE > 0 and rng.random() < settings.LLM_REPLAY_ERROR_RATE:
+            raise RuntimeError("Replay provider injected error")
+
+        delay = 1.0 / settings.LLM_REPLAY_TOKENS_PER_SEC if settings.LLM_REPLAY_TOKENS_PER_SEC > 0 else 0
+        for i, token in enumerate(tokens):
+            if delay and i:
+                time.sleep(delay)
+            yield token
+
     def _stream_openai(self, messages: List[Dict[str, str]], model_name: str = None):
         if not self.openai_client:
              raise ValueError("OpenAI Client not initialized. Check API Key.")
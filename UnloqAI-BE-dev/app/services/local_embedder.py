@@ -0,0 +1,65 @@
+"""
+In-process CPU embedder: no network, no model download.
+
+Texts are embedded by signed feature hashing of word unigrams, word bigrams and
+character trigrams straight into the configured dimension, with sublinear term
+weighting and L2 normalisation. Lexically similar texts land close together,
+results are deterministic across processes, and a short text embeds in well
+under a millisecond, which makes it the embedder for tests, air-gapped installs
+and offline vector search.
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+MODEL_NAME = "hashing-v1"
+
+
+@lru_cache(maxsize=65536)
+def _slot(feature: str, dim: int) -> Tuple[int, float]:
+    digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return digest % dim, (1.0 if (digest >> 63) & 1 else -1.0)
+
+
+def _features(text: str) -> Counter:
+    words = re.findall(r"\w+", (text or "").lower())
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.update(f"#c{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    @property
+    def model_name(self) -> str:
+        return f"{MODEL_NAME}:{self.dim}"
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 matrix of unit vectors; empty texts give zero rows."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in _features(text).items():
+                index, sign = _slot(feature, self.dim)
+                out[row, index] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+    def embed(self, text: str) -> List[float]:
+        """Unit vector for `text`; [] when it has no features (empty or punctuation only)."""
+        return to_embedding(self.embed_batch([text])[0])
+
+
+def to_embedding(row: np.ndarray) -> List[float]:
+    """A zero row has no direction (cosine is undefined): report it as no embedding."""
+    return row.tolist() if row.any() else []
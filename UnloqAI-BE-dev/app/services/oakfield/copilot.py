@@ -5,13 +5,15 @@ Operates exclusively on oakfield_* tables via OakfieldTools.
 No dependency on Meridian models, services, or schema.
 """
 import json
-from typing import Generator
+from typing import Dict, Generator, List, Optional
 
 from sqlalchemy.orm import Session
 
 # from app.services.llm_service import llm_service
 from app.services.oakfield.tools import OakfieldTools
 from app.services.llm_service import get_llm_service
+from app.services.singleflight import StreamSingleflight
+from app.db import data_version
 
 
 # Intent keywords mapped to tool methods — used for dynamic dispatch
@@ -35,6 +37,9 @@ _INTENT_MAP = {
     "beds": "house_types",
 }
 
+# Identical concurrent questions against the same data share one LLM generation
+_copilot_flights = StreamSingleflight("oakfield_copilot")
+
 
 class CopilotService:
     def __init__(self, db: Session):
@@ -111,12 +116,29 @@ class CopilotService:
     # Main streaming entry point
     # ------------------------------------------------------------------
 
-    def chat_completion(self, user_query: str) -> Generator[str, None, None]:
+    def chat_completion(
+        self, user_query: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> Generator[str, None, None]:
         """
         Streams a structured JSON response from the LLM, with Oakfield data
         injected as context. The response schema matches the frontend
         BlockRenderer expectations.
+
+        `history` is the bounded conversation memory (summary + recent turns)
+        from ConversationMemory.history_for.
+
+        Concurrent requests for the same normalised query, conversation history
+        and oakfield_* data version are coalesced into a single generation.
         """
+        version = data_version.token("oakfield_")
+        if history:
+            version += "|" + json.dumps(history, sort_keys=True)
+        key = _copilot_flights.make_key(user_query, version)
+        yield from _copilot_flights.stream(key, lambda: self._stream_completion(user_query, history))
+
+    def _stream_completion(
+        self, user_query: str, history: Optional[List[Dict[str, str]]] = None
+    ) -> Generator[str, None, None]:
         # 1. Fetch context from DB (oakfield_* tables only)
         context = self._build_context(user_query)
 
@@ -189,6 +211,7 @@ RESPONSE SCHEMA (JSON):
 
         messages = [
             {"role": "system", "content": "You are a JSON-only Oakfield homebuilder analyst."},
+            *(history or []),
             {"role": "user", "content": system_prompt},
         ]
 
@@ -1,9 +1,11 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import case, desc, func
+from app.core.config import settings
 from app.models.meridian import (
     StrategyKPI, InternalSignal, ExternalSignal, 
     StrategyRecommendation, ImpactLedgerStrategy, StrategyObjective
 )
+from app.services.snapshot_cache import SnapshotCache
 from datetime import datetime
 import re
 
@@ -15,7 +17,9 @@ class DashboardService:
         """
         Aggregates data from 5 tables into the 'Board Cockpit' schema.
         Now completely dynamic with no hardcoded mocks.
+        Built from a fixed six queries however many KPIs, signals and ledger rows exist.
         """
+        kpis = self.db.query(StrategyKPI).all()
         return {
             "company": {
                 "company_id": "MERIDIAN",
@@ -23,8 +27,8 @@ class DashboardService:
                 "mode": "live_demo",
                 "data_updated_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M")
             },
-            "headline_cards": self._build_headline_cards(),
-            "top_issues": self._build_top_issues(),
+            "headline_cards": self._build_headline_cards(kpis),
+            "top_issues": self._build_top_issues(kpis),
             "decision_inbox_preview": self._build_inbox_preview(),
             "ledger_summary": self._build_ledger_summary()
         }
@@ -62,16 +66,39 @@ class DashboardService:
         else:
             return f"£{value:.0f}"
 
-    def _build_headline_cards(self):
+    def _sparklines(self, kpi_ids, points: int = 12):
+        """Last `points` values per KPI, oldest first, in one windowed query."""
+        if not kpi_ids:
+            return {}
+        ranked = self.db.query(
+            InternalSignal.kpi_id,
+            InternalSignal.timestamp,
+            InternalSignal.value,
+            func.row_number().over(
+                partition_by=InternalSignal.kpi_id,
+                order_by=desc(InternalSignal.timestamp),
+            ).label("rn"),
+        ).filter(InternalSignal.kpi_id.in_(kpi_ids)).subquery()
+        rows = self.db.query(ranked.c.kpi_id, ranked.c.value).filter(
+            ranked.c.rn <= points
+        ).order_by(ranked.c.kpi_id, ranked.c.timestamp).all()
+
+        series = {kpi_id: [] for kpi_id in kpi_ids}
+        for kpi_id, value in rows:
+            series[kpi_id].append(float(value))
+        return series
+
+    def _build_headline_cards(self, kpis):
         """
         Fetches KPIs and their last 12 data points for sparklines.
         """
         cards = []
         
-        # 1. Objectives Card
-        off_track_count = self.db.query(StrategyObjective).filter(StrategyObjective.status == 'off_track').count()
-        at_risk_count = self.db.query(StrategyObjective).filter(StrategyObjective.status == 'at_risk').count()
-        on_track_count = self.db.query(StrategyObjective).filter(StrategyObjective.status == 'on_track').count()
+        # 1. Objectives Card (one conditional aggregate instead of a COUNT per status)
+        off_track_count, at_risk_count, on_track_count = self.db.query(
+            *(func.count(case((StrategyObjective.status == status, 1)))
+              for status in ('off_track', 'at_risk', 'on_track'))
+        ).one()
         
         cards.append({
             "card_id": "objectives_glance",
@@ -84,19 +111,16 @@ class DashboardService:
 
         # 2. KPI Cards (Revenue, Product B, NPS)
         target_kpis = ["Product B Monthly Sales", "Win Rate Segment X", "NPS Segment Z"]
+        # Case-insensitive substring match (the old ILIKE '%name%') over the preloaded KPIs
+        matched = [
+            next((k for k in kpis if k.name and kpi_name.lower() in k.name.lower()), None)
+            for kpi_name in target_kpis
+        ]
+        matched = [k for k in matched if k is not None]
+        sparklines = self._sparklines([k.kpi_id for k in matched])
         
-        for kpi_name in target_kpis:
-            kpi = self.db.query(StrategyKPI).filter(StrategyKPI.name.ilike(f"%{kpi_name}%")).first()
-            if not kpi:
-                continue
-
-            # Fetch Sparkline Data (Last 12 entries)
-            history = self.db.query(InternalSignal).filter(
-                InternalSignal.kpi_id == kpi.kpi_id
-            ).order_by(desc(InternalSignal.timestamp)).limit(12).all()
-            
-            history = sorted(history, key=lambda x: x.timestamp)
-            points = [float(h.value) for h in history]
+        for kpi in matched:
+            points = sparklines[kpi.kpi_id]
             
             status = "off_track" if kpi.current_value < kpi.target_value else "on_track"
             if "Win Rate" in kpi.name and kpi.current_value < 40: status = "at_risk"
@@ -122,16 +146,23 @@ class DashboardService:
             
         return cards
 
-    def _build_top_issues(self):
+    def _build_top_issues(self, kpis):
         """
         Identifies 'Off Track' KPIs and formats them as Issues.
         """
         issues = []
-        failing_kpis = self.db.query(StrategyKPI).filter(StrategyKPI.current_value < StrategyKPI.target_value).all()
+        failing_kpis = [
+            k for k in kpis
+            if k.current_value is not None and k.target_value is not None and k.current_value < k.target_value
+        ]
+        if not failing_kpis:
+            return issues
+
+        # The latest external signal is the same driver for every issue: fetch it once
+        recent_signal = self.db.query(ExternalSignal.description).order_by(desc(ExternalSignal.timestamp)).first()
+        driver = recent_signal.description if recent_signal else "Internal efficiency drop detected."
         
         for kpi in failing_kpis:
-            recent_signal = self.db.query(ExternalSignal).order_by(desc(ExternalSignal.timestamp)).first()
-            driver = recent_signal.description if recent_signal else "Internal efficiency drop detected."
             
             status = "off_track"
             if "Win Rate" in kpi.name: status = "at_risk"
@@ -169,7 +200,9 @@ class DashboardService:
         Real-time aggregation of the Impact Ledger.
         Sums up the 'expected_roi' and 'actual_roi' columns by parsing the strings.
         """
-        entries = self.db.query(ImpactLedgerStrategy).all()
+        entries = self.db.query(ImpactLedgerStrategy).options(
+            joinedload(ImpactLedgerStrategy.recommendation)
+        ).all()
         total_expected = 0.0
         total_actual = 0.0
         total_in_progress = 0.0
@@ -205,4 +238,17 @@ class DashboardService:
                 "in_progress_value": self._format_currency(total_in_progress)
             },
             "rows": rows
-        }
\ No newline at end of file
+        }
+
+
+# Shared by every exec's landing page; approvals, simulations, seeds and signal
+# ingestion all commit through the ORM, which bumps these tables' data versions.
+cockpit_cache = SnapshotCache(
+    "cockpit",
+    tables=[model.__tablename__ for model in (
+        StrategyObjective, StrategyKPI, InternalSignal, ExternalSignal,
+        StrategyRecommendation, ImpactLedgerStrategy,
+    )],
+    build=lambda db: DashboardService(db).get_cockpit_data(),
+    max_age_seconds=settings.COCKPIT_CACHE_MAX_AGE_SECONDS,
+)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models.meridian import StrategyOS, StrategyObjective, StrategyKPI, InternalSignal, ExternalSignal, StrategyRecommendation, ImpactLedgerStrategy
+from app.services.signal_ingest import index_signal
 from datetime import datetime, timedelta
 import uuid
 
@@ -67,7 +68,8 @@ def seed_meridian_story(db: Session):
         severity="high", # Enforced schema
         timestamp=datetime.utcnow() - timedelta(days=15)
     )
-    db.add(ext_sig)
+    # Fingerprinted like ingested signals, so feed repeats of this story merge into it
+    index_signal(db, ext_sig)
 
     # 5. Recommendation (The Action)
     rec = StrategyRecommendation(
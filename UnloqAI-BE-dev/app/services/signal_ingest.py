@@ -0,0 +1,226 @@
+"""
+Ingestion-time near-duplicate detection for external signals.
+
+Feeds repeat the same competitor news with small wording changes. Each incoming
+description gets a 64-bit SimHash; its four 16-bit bands are looked up in
+signal_lsh_bands, so only signals sharing at least one band are compared. Any
+pair within 3 differing bits (SIGNAL_DEDUP_MAX_HAMMING) is guaranteed to share
+one; wider bands keep the candidate lists short, at the price of finding only
+some of the borderline pairs. Close fingerprints merge straight away;
+borderline ones are confirmed with embedding similarity, the only step that
+calls the embedding provider. A duplicate bumps the canonical signal's
+occurrence_count instead of adding a row. Descriptions with no words to hash
+(empty, punctuation only) get no fingerprint and are never matched.
+
+Signals stored by other paths (seeding, rows predating dedup) get their
+fingerprint and bands from index_signal() / backfill_fingerprints().
+"""
+import hashlib
+import math
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.meridian import ExternalSignal, SignalLSHBand
+from app.services.vector_service import VectorService
+
+BANDS = 4
+BAND_BITS = 16
+_MASK64 = (1 << 64) - 1
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9£$%]+", (text or "").lower())
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash over word unigrams and bigrams (unsigned). None for text with
+    no features, which would otherwise hash to 0 and match every other such text.
+    """
+    tokens = _tokens(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not features:
+        return None
+    weights = [0] * 64
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK64).count("1")
+
+
+def band_keys(fingerprint: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, (fingerprint >> (band * BAND_BITS)) & mask) for band in range(BANDS)]
+
+
+def to_signed(fingerprint: int) -> int:
+    """BIGINT is signed; store the unsigned 64-bit hash in two's complement."""
+    return fingerprint - (1 << 64) if fingerprint >= (1 << 63) else fingerprint
+
+
+def to_unsigned(value: int) -> int:
+    return value & _MASK64
+
+
+def _cosine(a: list, b: list) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def index_signal(db: Session, signal: ExternalSignal) -> None:
+    """Sets the fingerprint of a new signal and adds its LSH bands. Flushes; the caller commits."""
+    fingerprint = simhash(signal.description)
+    signal.fingerprint = to_signed(fingerprint) if fingerprint is not None else None
+    db.add(signal)
+    db.flush()
+    if fingerprint is None:
+        return
+    db.add_all(
+        SignalLSHBand(band=band, bucket=bucket, signal_id=signal.signal_id)
+        for band, bucket in band_keys(fingerprint)
+    )
+
+
+def backfill_fingerprints(db: Session, batch_size: int = 1000) -> int:
+    """
+    Fingerprints and bands every signal that has no fingerprint yet, one
+    committed batch at a time, so it can be stopped and rerun. Returns the number
+    fingerprinted; featureless descriptions are passed over and stay unfingerprinted.
+    """
+    done = 0
+    cursor = None
+    while True:
+        query = db.query(ExternalSignal.signal_id, ExternalSignal.description).filter(
+            ExternalSignal.fingerprint.is_(None)
+        )
+        if cursor is not None:
+            query = query.filter(ExternalSignal.signal_id > cursor)
+        rows = query.order_by(ExternalSignal.signal_id).limit(batch_size).all()
+        if not rows:
+            return done
+        cursor = rows[-1].signal_id
+        fingerprinted = 0
+        for row in rows:
+            fingerprint = simhash(row.description)
+            if fingerprint is None:
+                continue
+            fingerprinted += 1
+            db.execute(
+                update(ExternalSignal)
+                .where(ExternalSignal.signal_id == row.signal_id)
+                .values(fingerprint=to_signed(fingerprint))
+            )
+            db.add_all(
+                SignalLSHBand(band=band, bucket=bucket, signal_id=row.signal_id)
+                for band, bucket in band_keys(fingerprint)
+            )
+        db.commit()
+        done += fingerprinted
+        metrics.inc("signal_fingerprint_backfill_total", fingerprinted)
+
+
+class SignalIngestService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def ingest(
+        self,
+        type: str,
+        description: str,
+        source_url: str = None,
+        severity: str = "medium",
+        timestamp: datetime = None,
+        dedup: bool = True,
+    ) -> Tuple[ExternalSignal, bool]:
+        """
+        Stores a signal unless it near-duplicates an existing one of the same type.
+        Returns (canonical signal, was_duplicate). Commits. With `dedup` off the
+        signal is always stored (and still fingerprinted for later ingests).
+        """
+        timestamp = timestamp or datetime.utcnow()
+        fingerprint = simhash(description)
+
+        canonical = None
+        if dedup and fingerprint is not None:
+            canonical = self.find_duplicate(type, description, fingerprint)
+        if canonical is not None:
+            # Atomic increment: concurrent ingests of the same story never lose a count
+            self.db.execute(
+                update(ExternalSignal)
+                .where(ExternalSignal.signal_id == canonical.signal_id)
+                .values(occurrence_count=ExternalSignal.occurrence_count + 1, last_seen_at=timestamp)
+            )
+            self.db.commit()
+            self.db.refresh(canonical)
+            metrics.inc("signal_ingest_total", result="duplicate")
+            return canonical, True
+
+        signal = ExternalSignal(
+            type=type,
+            description=description,
+            source_url=source_url,
+            severity=severity,
+            timestamp=timestamp,
+            last_seen_at=timestamp,
+            occurrence_count=1,
+        )
+        index_signal(self.db, signal)
+        self.db.commit()
+        metrics.inc("signal_ingest_total", result="new")
+        return signal, False
+
+    def find_duplicate(self, type: str, description: str, fingerprint: int) -> Optional[ExternalSignal]:
+        # Fingerprints only: candidates are compared by Hamming distance before any row is loaded
+        candidates = (
+            self.db.query(ExternalSignal.signal_id, ExternalSignal.fingerprint)
+            .join(SignalLSHBand, SignalLSHBand.signal_id == ExternalSignal.signal_id)
+            .filter(
+                tuple_(SignalLSHBand.band, SignalLSHBand.bucket).in_(band_keys(fingerprint)),
+                ExternalSignal.type == type,
+            )
+            .distinct()
+            .all()
+        )
+        if not candidates:
+            return None
+
+        scored = sorted(
+            ((hamming(fingerprint, to_unsigned(c.fingerprint or 0)), c.signal_id) for c in candidates),
+            key=lambda pair: pair[0],
+        )
+        distance, best = scored[0]
+        if distance <= settings.SIGNAL_DEDUP_MAX_HAMMING:
+            return self.db.get(ExternalSignal, best)
+
+        grey = [sid for d, sid in scored if d <= settings.SIGNAL_DEDUP_GREY_HAMMING]
+        if not grey:
+            return None
+        embeddings: Dict = dict(
+            self.db.query(ExternalSignal.signal_id, ExternalSignal.embedding)
+            .filter(ExternalSignal.signal_id.in_(grey), ExternalSignal.embedding.isnot(None))
+            .all()
+        )
+        if not embeddings:
+            return None
+        # Only borderline candidates pay for an embedding (cached by content hash)
+        vector = VectorService(self.db).generate_embedding(description)
+        if not vector:
+            return None
+        metrics.inc("signal_ingest_embedding_checks_total")
+        similarity, closest = max(
+            ((_cosine(vector, list(embedding)), sid) for sid, embedding in embeddings.items()),
+            key=lambda pair: pair[0],
+        )
+        return self.db.get(ExternalSignal, closest) if similarity >= settings.SIGNAL_DEDUP_MIN_COSINE else None
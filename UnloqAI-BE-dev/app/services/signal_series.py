@@ -0,0 +1,145 @@
+"""
+Range queries over InternalSignal at the coarsest useful resolution.
+
+Raw points are only read for short ranges; anything longer is served from the
+hourly, daily or weekly rollups, which the InternalSignal insert hook keeps
+current. A request for `points` values over [start, end) gets the coarsest
+resolution that still yields at least that many buckets, so reading a year of
+minute-level ERP data costs ~52 weekly rows instead of ~500k raw ones. Raw rows
+are never read for ranges longer than MAX_RAW_SPAN: such requests get the
+hourly rollup, even when it has fewer buckets than asked for.
+"""
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.models.meridian import InternalSignal, SIGNAL_ROLLUPS, bucket_start
+
+RAW = "raw"
+# At minute-level ingest, a day of raw points is ~1.4k rows
+MAX_RAW_SPAN = timedelta(days=1)
+
+
+def choose_rollup(start: datetime, end: datetime, points: int):
+    """Coarsest rollup model with at least `points` buckets in range; None means raw."""
+    span = end - start
+    for rollup in reversed(SIGNAL_ROLLUPS):
+        if span / rollup.bucket >= points:
+            return rollup
+    return None if span <= MAX_RAW_SPAN else SIGNAL_ROLLUPS[0]
+
+
+def kpi_series(db: Session, kpi_id: uuid.UUID, start: datetime, end: datetime, points: int) -> Dict:
+    """Points for one KPI over [start, end), oldest first, each with avg/min/max/last/count."""
+    rollup = choose_rollup(start, end, points)
+    if rollup is None:
+        rows = (
+            db.query(InternalSignal.timestamp, InternalSignal.value)
+            .filter(
+                InternalSignal.kpi_id == kpi_id,
+                InternalSignal.timestamp >= start,
+                InternalSignal.timestamp < end,
+                InternalSignal.value.isnot(None),
+            )
+            .order_by(InternalSignal.timestamp)
+            .all()
+        )
+        series = [
+            {"t": ts.isoformat(), "avg": v, "min": v, "max": v, "last": v, "count": 1}
+            for ts, v in rows
+        ]
+    else:
+        rows = (
+            db.query(rollup)
+            .filter(
+                rollup.kpi_id == kpi_id,
+                # The bucket holding `start` is included whole
+                rollup.bucket_start >= bucket_start(start, rollup),
+                rollup.bucket_start < end,
+            )
+            .order_by(rollup.bucket_start)
+            .all()
+        )
+        series = [
+            {
+                "t": r.bucket_start.isoformat(),
+                "avg": r.value_sum / r.value_count,
+                "min": r.value_min,
+                "max": r.value_max,
+                "last": r.value_last,
+                "count": r.value_count,
+            }
+            for r in rows
+        ]
+
+    resolution = rollup.resolution if rollup is not None else RAW
+    metrics.inc("signal_series_queries_total", resolution=resolution)
+    return {
+        "kpi_id": str(kpi_id),
+        "resolution": resolution,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": series,
+    }
+
+
+def rebuild_rollups(db: Session, kpi_id: Optional[uuid.UUID] = None, batch_size: int = 5000) -> int:
+    """
+    Recomputes every rollup (or one KPI's) from the raw points, e.g. after a
+    bulk load or corrections to existing points. Streams the raw table in
+    (kpi_id, timestamp) order and writes each KPI's buckets as it completes.
+    Returns the raw points read. Commits.
+    """
+    for rollup in SIGNAL_ROLLUPS:
+        stmt = delete(rollup.__table__)
+        if kpi_id is not None:
+            stmt = stmt.where(rollup.__table__.c.kpi_id == kpi_id)
+        db.execute(stmt)
+
+    query = db.query(InternalSignal.kpi_id, InternalSignal.timestamp, InternalSignal.value).filter(
+        InternalSignal.kpi_id.isnot(None),
+        InternalSignal.timestamp.isnot(None),
+        InternalSignal.value.isnot(None),
+    )
+    if kpi_id is not None:
+        query = query.filter(InternalSignal.kpi_id == kpi_id)
+
+    buckets: Dict[type, "OrderedDict[datetime, dict]"] = {rollup: OrderedDict() for rollup in SIGNAL_ROLLUPS}
+
+    def write():
+        for rollup, acc in buckets.items():
+            rows: List[dict] = list(acc.values())
+            for i in range(0, len(rows), batch_size):
+                db.execute(insert(rollup.__table__), rows[i:i + batch_size])
+            acc.clear()
+
+    read = 0
+    current = None
+    for kid, ts, value in query.order_by(InternalSignal.kpi_id, InternalSignal.timestamp).yield_per(batch_size):
+        if kid != current:
+            write()
+            current = kid
+        read += 1
+        for rollup, acc in buckets.items():
+            start = bucket_start(ts, rollup)
+            row = acc.get(start)
+            if row is None:
+                acc[start] = {
+                    "kpi_id": kid, "bucket_start": start, "value_count": 1, "value_sum": value,
+                    "value_min": value, "value_max": value, "value_last": value, "last_at": ts,
+                }
+                continue
+            row["value_count"] += 1
+            row["value_sum"] += value
+            row["value_min"] = min(row["value_min"], value)
+            row["value_max"] = max(row["value_max"], value)
+            # Points arrive in timestamp order within a KPI
+            row["value_last"], row["last_at"] = value, ts
+    write()
+    db.commit()
+    return read
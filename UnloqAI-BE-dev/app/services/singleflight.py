@@ -0,0 +1,152 @@
+"""
+Singleflight coalescing for streamed LLM responses.
+
+The first caller for a key drives the underlying stream; concurrent callers with
+the same key subscribe to a shared buffer that replays every chunk produced so
+far and then follows the live stream. Once the stream finishes the key is
+released, so later requests start a fresh generation.
+
+Followers never wait unboundedly: if the leader produces nothing for
+`stall_timeout` seconds (e.g. its generator was abandoned without being
+closed), a follower that has not yielded anything yet runs the call itself;
+one that has already streamed part of the reply fails with TimeoutError
+rather than splice two different generations together.
+
+Streams are consumed from Starlette's threadpool, so coordination is thread-based.
+"""
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Iterator, Generator, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self.cond = threading.Condition()
+
+    def publish(self, chunk: str) -> None:
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error: BaseException = None) -> None:
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+
+class StreamSingleflight:
+    def __init__(self, name: str, stall_timeout: float = None):
+        self.name = name
+        self.stall_timeout = stall_timeout or settings.SINGLEFLIGHT_STALL_TIMEOUT_SECONDS
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, data_version: str = "") -> str:
+        """Normalises case and whitespace so trivially different phrasings coalesce."""
+        normalized = " ".join(str(query).lower().split())
+        return hashlib.sha256(f"{data_version}|{normalized}".encode()).hexdigest()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def stream(self, key: str, factory: Callable[[], Iterator[str]]) -> Generator[str, None, None]:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                with flight.cond:
+                    flight.followers += 1
+
+        if leader:
+            metrics.inc("singleflight_leader_total", flight=self.name)
+            yield from self._lead(key, flight, factory)
+        else:
+            metrics.inc("singleflight_coalesced_total", flight=self.name)
+            yield from self._follow(key, flight, factory)
+
+    def _release(self, key: str, flight: _Flight, error: BaseException = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(error)
+
+    def _lead(self, key: str, flight: _Flight, factory) -> Generator[str, None, None]:
+        source = factory()
+        error = None
+        try:
+            for chunk in source:
+                flight.publish(chunk)
+                yield chunk
+        except GeneratorExit:
+            # The leading client went away. If others are waiting on this
+            # generation, finish it for them rather than wasting the LLM call.
+            with flight.cond:
+                followed = flight.followers > 0
+            if followed:
+                try:
+                    for chunk in source:
+                        flight.publish(chunk)
+                except Exception as e:
+                    error = e
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(key, flight, error)
+            close = getattr(source, "close", None)
+            if close:
+                close()
+
+    def _follow(self, key: str, flight: _Flight, factory) -> Generator[str, None, None]:
+        offset = 0
+        stalled = False
+        try:
+            while True:
+                with flight.cond:
+                    deadline = time.monotonic() + self.stall_timeout
+                    while offset >= len(flight.chunks) and not flight.done:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            stalled = True
+                            break
+                        flight.cond.wait(remaining)
+                    pending = flight.chunks[offset:]
+                    done = flight.done
+                    error = flight.error
+                if stalled:
+                    break
+                for chunk in pending:
+                    yield chunk
+                offset += len(pending)
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            with flight.cond:
+                flight.followers -= 1
+
+        metrics.inc("singleflight_stalled_total", flight=self.name)
+        if offset:
+            raise TimeoutError(f"{self.name}: shared generation stalled after {offset} chunks")
+        # Nothing delivered yet: generate directly, and stop new callers joining
+        # the stuck flight (other followers time out and fall back on their own)
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        yield from factory()
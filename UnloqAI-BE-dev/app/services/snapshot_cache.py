@@ -0,0 +1,116 @@
+"""
+Pre-serialised snapshots of expensive read models, invalidated by data versions.
+
+A snapshot is current while none of the tables it was built from has committed
+a write since (see app.db.data_version) and it is younger than `max_age`; the
+age bound covers writes made by other worker processes, whose versions this
+process never sees.
+
+A write in this process makes the next read rebuild synchronously, so callers
+always see their own writes; concurrent readers wait for that one build rather
+than starting their own. A snapshot that has merely outlived `max_age` is
+still served while a single background refresh rebuilds it
+(stale-while-revalidate).
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.db import data_version
+from app.db.session import SessionLocal
+
+
+class Snapshot:
+    def __init__(self, body: bytes, version: tuple):
+        self.body = body
+        self.version = version
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.built_at = time.monotonic()
+
+
+class SnapshotCache:
+    def __init__(
+        self,
+        name: str,
+        tables: Sequence[str],
+        build: Callable[[Session], dict],
+        max_age_seconds: float,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.name = name
+        self.tables = tuple(tables)
+        self.build = build
+        self.max_age = max_age_seconds
+        self.session_factory = session_factory
+        self._snapshot: Optional[Snapshot] = None
+        self._refreshing = False
+        self._cond = threading.Condition()
+
+    def _version(self) -> tuple:
+        return tuple(data_version.current(t) for t in self.tables)
+
+    def _is_current(self, snapshot: Snapshot) -> bool:
+        return snapshot.version == self._version() and time.monotonic() - snapshot.built_at < self.max_age
+
+    def get(self, db: Session) -> Snapshot:
+        """The latest snapshot; builds with `db` when there is none or this process wrote since."""
+        waited = False
+        with self._cond:
+            while True:
+                snapshot = self._snapshot
+                if snapshot is not None and snapshot.version == self._version():
+                    if time.monotonic() - snapshot.built_at < self.max_age:
+                        metrics.inc("snapshot_cache_total", cache=self.name, result="coalesced" if waited else "hit")
+                        return snapshot
+                    # Only aged out: serve it while one background refresh catches up
+                    if not self._refreshing:
+                        self._refreshing = True
+                        threading.Thread(target=self._refresh, name=f"{self.name}-refresh", daemon=True).start()
+                    metrics.inc("snapshot_cache_total", cache=self.name, result="stale")
+                    return snapshot
+                if not self._refreshing:
+                    self._refreshing = True
+                    break
+                # A build is running: share it, then check it covers the latest writes
+                waited = True
+                self._cond.wait()
+
+        metrics.inc("snapshot_cache_total", cache=self.name, result="miss")
+        return self._rebuild(db)
+
+    def invalidate(self) -> None:
+        with self._cond:
+            self._snapshot = None
+
+    def _refresh(self) -> None:
+        db = self.session_factory()
+        try:
+            self._rebuild(db)
+        except Exception as e:
+            print(f"{self.name} snapshot refresh failed: {e}")
+        finally:
+            db.close()
+
+    def _rebuild(self, db: Session) -> Snapshot:
+        # Version first: writes landing mid-build leave the result already stale
+        version = self._version()
+        started = time.perf_counter()
+        try:
+            body = json.dumps(self.build(db), default=str, separators=(",", ":")).encode()
+        except Exception:
+            with self._cond:
+                self._refreshing = False
+                self._cond.notify_all()
+            raise
+        snapshot = Snapshot(body, version)
+        metrics.observe("snapshot_build_seconds", time.perf_counter() - started, cache=self.name)
+        with self._cond:
+            self._snapshot = snapshot
+            self._refreshing = False
+            self._cond.notify_all()
+        return snapshot
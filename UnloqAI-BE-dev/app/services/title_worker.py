@@ -0,0 +1,197 @@
+"""
+Batched background title generation for new chat sessions.
+
+New sessions are collected for a short window and titled together: one small
+model prompt covers the whole batch, or, when LLM capacity is saturated (or the
+call fails), a local extractive heuristic is used instead. Titles are written
+back in a single executemany UPDATE, and only onto sessions that still carry a
+default title so manual renames always win.
+
+The worker runs on its own dedicated thread, so titling never occupies the
+threadpool that serves interactive streams. That thread needs a long-lived
+server: with BACKGROUND_WORKERS off (the default under Lambda) submit() writes
+the heuristic title inline instead, keeping the model call off the request path.
+"""
+import json
+import queue
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics, COUNT_BUCKETS
+from app.db.session import SessionLocal
+from app.models.meridian import ChatSession
+from app.services.admission import llm_admission
+from app.services.chat_events import chat_events
+from app.services.llm_service import get_llm_service
+
+DEFAULT_TITLES = ("New Chat", "New Conversation")
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "do", "does", "did",
+    "what", "why", "how", "when", "where", "which", "who", "whom", "can", "could",
+    "would", "should", "will", "shall", "may", "might", "please", "me", "my", "i",
+    "we", "our", "us", "you", "your", "tell", "show", "give", "about", "of", "for",
+    "to", "in", "on", "at", "and", "or", "it", "its", "this", "that", "there", "with",
+    "hi", "hello", "hey", "just",
+}
+
+
+def heuristic_title(text: str, max_words: int = 6, max_chars: int = 50) -> str:
+    """Extractive fallback: the first few meaningful words of the message, title-cased."""
+    words = re.findall(r"[A-Za-z0-9£$%&'\-\.]+", text or "")
+    keep = [w.strip(".") for w in words if w.lower().strip(".") not in _STOPWORDS]
+    keep = [w for w in keep if w][:max_words]
+    if not keep:
+        return "New Chat"
+    title = " ".join(w if w.isupper() or any(c.isdigit() for c in w) else w.capitalize() for w in keep)
+    return title[:max_chars].rstrip()
+
+
+class TitleWorker:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        window_ms: int = None,
+        max_batch: int = None,
+    ):
+        self.session_factory = session_factory
+        self.window = (window_ms or settings.TITLE_BATCH_WINDOW_MS) / 1000.0
+        self.max_batch = max_batch or settings.TITLE_BATCH_SIZE
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, session_id, first_message: str) -> None:
+        item = {
+            "session_id": session_id if isinstance(session_id, uuid.UUID) else uuid.UUID(str(session_id)),
+            "text": first_message,
+        }
+        if not settings.BACKGROUND_WORKERS:
+            self.title_batch([item], use_llm=False)
+            return
+        self._queue.put(item)
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="chat-title-worker", daemon=True)
+            self._thread.start()
+
+    def _collect_batch(self) -> List[dict]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            try:
+                self.title_batch(batch)
+            except Exception as e:
+                print(f"Title generation failed for batch of {len(batch)}: {e}")
+
+    # ------------------------------------------------------------------
+    # Titling
+    # ------------------------------------------------------------------
+
+    def title_batch(self, batch: List[dict], use_llm: bool = True) -> Dict[uuid.UUID, str]:
+        # Keep the first message per session if it was submitted twice
+        unique: Dict[uuid.UUID, str] = {}
+        for item in batch:
+            unique.setdefault(item["session_id"], item["text"])
+
+        titles: Dict[uuid.UUID, str] = {}
+        mode = "heuristic"
+        if use_llm and not llm_admission.saturated():
+            try:
+                titles = self._llm_titles(unique)
+                mode = "llm"
+            except Exception as e:
+                print(f"LLM titling failed, using heuristic: {e}")
+        for sid, text in unique.items():
+            if not titles.get(sid):
+                titles[sid] = heuristic_title(text)
+
+        self._write(titles)
+        metrics.inc("title_batches_total", mode=mode)
+        metrics.observe("title_batch_size", len(unique), buckets=COUNT_BUCKETS)
+        return titles
+
+    def _llm_titles(self, unique: Dict[uuid.UUID, str]) -> Dict[uuid.UUID, str]:
+        ids = list(unique.keys())
+        numbered = "\n".join(
+            f'{i + 1}. {unique[sid][:300]}' for i, sid in enumerate(ids)
+        )
+        prompt = (
+            "Write a short title (max 6 words, no quotes or trailing punctuation) for each "
+            "chat opening message below.\n"
+            'Reply with ONLY a JSON object mapping the number to the title, e.g. {"1": "Product B Sales Decline"}.\n\n'
+            f"{numbered}"
+        )
+        messages = [
+            {"role": "system", "content": "You label conversations. JSON only."},
+            {"role": "user", "content": prompt},
+        ]
+        raw = "".join(get_llm_service().stream_chat(messages, model_name=settings.LLM_SUMMARY_MODEL or None))
+        match = re.search(r"\{.*\}", raw, re.DOTALL)
+        parsed = json.loads(match.group()) if match else {}
+
+        titles = {}
+        for i, sid in enumerate(ids):
+            title = str(parsed.get(str(i + 1), "")).strip().strip('"').rstrip(".")
+            if title:
+                titles[sid] = title[:60]
+        return titles
+
+    def _write(self, titles: Dict[uuid.UUID, str]) -> None:
+        if not titles:
+            return
+        table = ChatSession.__table__
+        stmt = (
+            update(table)
+            .where(table.c.session_id == bindparam("sid"))
+            .where(or_(*(table.c.title == t for t in DEFAULT_TITLES)))
+            # Titling is not user activity; keep the sidebar order untouched
+            .values(title=bindparam("new_title"), updated_at=table.c.updated_at)
+        )
+        db = self.session_factory()
+        try:
+            db.execute(stmt, [{"sid": sid, "new_title": title} for sid, title in titles.items()])
+            db.commit()
+            if chat_events.has_subscribers():
+                self._publish(db, titles)
+        finally:
+            db.close()
+
+    def _publish(self, db: Session, titles: Dict[uuid.UUID, str]) -> None:
+        """Pushes titles that actually landed (not overridden by a rename) to open WebSockets."""
+        table = ChatSession.__table__
+        rows = db.execute(
+            select(table.c.session_id, table.c.user_id, table.c.title)
+            .where(table.c.session_id.in_(list(titles)))
+        )
+        for sid, user_id, title in rows:
+            if title == titles[sid]:
+                chat_events.publish(user_id, {"type": "title", "session_id": str(sid), "title": title})
+
+
+title_worker = TitleWorker()
@@ -0,0 +1,422 @@
+"""
+In-process vector index for databases without pgvector (SQLite dev, tests,
+single-box installs).
+
+Embeddings live in one contiguous float32 matrix backed by a memory-mapped file
+(`<path>.f32`) with the row ids in a second one (`<path>.ids`) and the row count
+in `<path>.json`, so a restart maps the files instead of re-reading every
+embedding, and an insert only writes the rows it touches. Search is an exact
+scan as a single matrix-vector product followed by `argpartition` top-k, which
+is fast enough for the tens of thousands of signals a single box holds.
+Committed inserts/updates of ExternalSignal embeddings are applied
+incrementally; the index is rebuilt from the database only when the files are
+missing or out of step with it.
+
+The files have a single writer: the first process to open them takes an
+exclusive lock (`<path>.lock`). Other workers keep a private in-memory copy,
+built from the database on first use, and never touch the files.
+
+Every process appends the ids of the embeddings it commits to a shared change
+log (`<path>.log`, one id per line). sync() checks the log's size on each
+search and re-reads only the rows other processes changed since, so every
+worker's copy (and the writer's files) follows the database. The writer
+compacts the log once it grows past LOG_COMPACT_BYTES; readers notice the new
+file and rebuild from the database.
+"""
+import json
+import os
+import threading
+import uuid
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.meridian import ExternalSignal
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    # No advisory locks (Windows): assume one process, as on a dev box
+    HAS_FCNTL = False
+
+_PENDING_KEY = "_vector_index_updates"
+
+# Signal ids are UUIDs in their 36-character text form
+ID_BYTES = 36
+
+LOG_COMPACT_BYTES = 4 << 20
+
+
+class NumpyVectorIndex:
+    def __init__(self, path: str, distance: str = "l2"):
+        self.path = path
+        self.distance = distance
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._rows = {}
+        self._matrix = None  # capacity >= len(self._ids); np.memmap when persistent
+        self._id_slots = None  # ids by row, same capacity
+        self._sq_norms = None  # squared row norms, same capacity
+        self._loaded = False
+        self._persistent = False
+        self._lock_handle = None
+        self._log_position = None  # (inode, offset) of the change log read so far
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @property
+    def _data_file(self) -> str:
+        return f"{self.path}.f32"
+
+    @property
+    def _ids_file(self) -> str:
+        return f"{self.path}.ids"
+
+    @property
+    def _meta_file(self) -> str:
+        return f"{self.path}.json"
+
+    @property
+    def _lock_file(self) -> str:
+        return f"{self.path}.lock"
+
+    @property
+    def _log_file(self) -> str:
+        return f"{self.path}.log"
+
+    def _claim(self) -> None:
+        """Decides once whether this instance owns the files. Call with self._lock held."""
+        if self._loaded:
+            return
+        self._loaded = True
+        self._persistent = self._acquire_writer()
+        if not self._persistent:
+            print(f"Vector index {self.path} is owned by another process; keeping an in-memory copy")
+
+    def _acquire_writer(self) -> bool:
+        if not HAS_FCNTL:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        handle = open(self._lock_file, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_handle = handle
+        return True
+
+    def close(self) -> None:
+        """Flushes and unmaps the files and gives up the writer lock."""
+        with self._lock:
+            if self._persistent and self._matrix is not None:
+                self._matrix.flush()
+                self._id_slots.flush()
+            self._ids, self._rows, self.dim = [], {}, None
+            self._matrix = self._id_slots = self._sq_norms = None
+            if self._lock_handle is not None:
+                self._lock_handle.close()
+                self._lock_handle = None
+            self._loaded = self._persistent = False
+            self._log_position = None
+
+    def load(self) -> bool:
+        """Maps the persisted index, if any. Returns False when there is nothing usable on disk."""
+        with self._lock:
+            self._claim()
+            files = (self._meta_file, self._data_file, self._ids_file)
+            if not self._persistent or not all(os.path.exists(f) for f in files):
+                return False
+            with open(self._meta_file) as f:
+                meta = json.load(f)
+            dim, count = meta.get("dim"), meta.get("count")
+            if not dim or count is None:
+                return False
+            capacity = os.path.getsize(self._data_file) // (4 * dim)
+            if capacity < count or os.path.getsize(self._ids_file) // ID_BYTES < capacity:
+                return False
+            self.dim = dim
+            self._matrix = np.memmap(self._data_file, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self._id_slots = np.memmap(self._ids_file, dtype=f"S{ID_BYTES}", mode="r+", shape=(capacity,))
+            self._ids = [sid.decode() for sid in self._id_slots[:count]]
+            self._rows = {sid: i for i, sid in enumerate(self._ids)}
+            rows = self._matrix[:count]
+            self._sq_norms = np.zeros(capacity, dtype=np.float32)
+            self._sq_norms[:count] = np.einsum("ij,ij->i", rows, rows)
+            return True
+
+    def _persist(self) -> None:
+        """Flushes touched pages and the row count; O(1) in the index size."""
+        if not self._persistent or self._matrix is None:
+            return
+        self._matrix.flush()
+        self._id_slots.flush()
+        tmp = f"{self._meta_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "count": len(self._ids)}, f)
+        os.replace(tmp, self._meta_file)
+
+    def _allocate(self, capacity: int) -> None:
+        """Grows (or creates) the storage; existing rows are copied once per doubling."""
+        count = len(self._ids)
+        old = (np.array(self._matrix[:count]), np.array(self._id_slots[:count]), self._sq_norms[:count]) \
+            if self._matrix is not None and count else None
+        self._matrix = self._id_slots = None
+        if self._persistent:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            matrix = np.memmap(self._data_file, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+            id_slots = np.memmap(self._ids_file, dtype=f"S{ID_BYTES}", mode="w+", shape=(capacity,))
+        else:
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            id_slots = np.zeros(capacity, dtype=f"S{ID_BYTES}")
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        if old is not None:
+            matrix[:count], id_slots[:count], sq_norms[:count] = old
+        self._matrix, self._id_slots, self._sq_norms = matrix, id_slots, sq_norms
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def add(self, items: Iterable[Tuple[object, Sequence[float]]]) -> int:
+        """Inserts or replaces (id, vector) pairs. Vectors of a different dimension are skipped."""
+        items = [(str(sid), vec) for sid, vec in items if vec is not None and len(vec)]
+        if not items:
+            return 0
+        with self._lock:
+            self._ensure_loaded()
+            if self.dim is None:
+                self.dim = len(items[0][1])
+            items = [(sid, vec) for sid, vec in items if len(vec) == self.dim and len(sid) <= ID_BYTES]
+            if not items:
+                return 0
+            new = [sid for sid, _ in items if sid not in self._rows]
+            needed = len(self._ids) + len(set(new))
+            capacity = self._matrix.shape[0] if self._matrix is not None else 0
+            if needed > capacity:
+                self._allocate(max(needed, capacity * 2, 1024))
+
+            touched = []
+            for sid, vec in items:
+                row = self._rows.get(sid)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(sid)
+                    self._rows[sid] = row
+                    self._id_slots[row] = sid.encode()
+                self._matrix[row] = np.asarray(vec, dtype=np.float32)
+                touched.append(row)
+            rows = self._matrix[touched]
+            self._sq_norms[touched] = np.einsum("ij,ij->i", rows, rows)
+            self._persist()
+            return len(items)
+
+    def remove(self, ids: Iterable[object]) -> None:
+        """Deletes by moving the last row into the hole, keeping the matrix contiguous."""
+        with self._lock:
+            self._ensure_loaded()
+            for sid in map(str, ids):
+                row = self._rows.pop(sid, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._id_slots[row] = self._id_slots[last]
+                    self._sq_norms[row] = self._sq_norms[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                self._ids.pop()
+            self._persist()
+
+    def rebuild(self, db: Session, batch_size: int = 2000) -> int:
+        """Reloads every stored embedding from the database (keyset pages, no OFFSET)."""
+        with self._lock:
+            self._claim()
+            self._ids, self._rows, self.dim = [], {}, None
+            self._matrix = self._id_slots = self._sq_norms = None
+            if self._persistent:
+                for f in (self._data_file, self._ids_file, self._meta_file):
+                    if os.path.exists(f):
+                        os.remove(f)
+            cursor = None
+            while True:
+                query = db.query(ExternalSignal.signal_id, ExternalSignal.embedding).filter(
+                    ExternalSignal.embedding != None  # noqa: E711
+                )
+                if cursor is not None:
+                    query = query.filter(ExternalSignal.signal_id > cursor)
+                rows = query.order_by(ExternalSignal.signal_id).limit(batch_size).all()
+                if not rows:
+                    break
+                self.add((r.signal_id, r.embedding) for r in rows)
+                cursor = rows[-1].signal_id
+            return len(self._ids)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def sync(self, db: Session) -> None:
+        """
+        Loads from disk on first use and rebuilds if the file no longer matches
+        the database; afterwards applies what other processes have committed.
+        """
+        with self._lock:
+            if self._loaded and self._log_position is not None:
+                self._catch_up(db)
+                return
+            # Read before the database, so changes committed meanwhile are re-applied, not missed
+            self._log_position = self._log_end()
+            self.load()
+            stored = db.query(ExternalSignal).filter(ExternalSignal.embedding != None).count()  # noqa: E711
+            if stored != len(self._ids):
+                self.rebuild(db)
+
+    # ------------------------------------------------------------------
+    # Change log shared by every process using these files
+    # ------------------------------------------------------------------
+
+    def _log_end(self) -> Tuple[int, int]:
+        try:
+            st = os.stat(self._log_file)
+        except FileNotFoundError:
+            return (0, 0)
+        return (st.st_ino, st.st_size)
+
+    def publish(self, ids: Iterable[object]) -> None:
+        """Records committed embedding changes for the other processes' next sync()."""
+        data = "".join(f"{sid}\n" for sid in ids).encode()
+        if not data:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # O_APPEND: concurrent appends from several processes never overwrite each other
+        fd = os.open(self._log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def _catch_up(self, db: Session, batch_size: int = 500) -> None:
+        """Re-reads the rows named in the log since the last sync. Call with self._lock held."""
+        inode, size = self._log_end()
+        seen_inode, offset = self._log_position
+        if inode != seen_inode or size < offset:
+            # Compacted (or removed): entries may be gone, so start over from the database
+            self._log_position = (inode, size)
+            self.rebuild(db)
+            return
+        if size == offset:
+            return
+        with open(self._log_file, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        # An append still in progress shows up as a line without its newline
+        complete = chunk.rfind(b"\n") + 1
+        self._log_position = (inode, offset + complete)
+        ids = list(dict.fromkeys(line.decode() for line in chunk[:complete].split()))
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            rows = db.query(ExternalSignal.signal_id, ExternalSignal.embedding).filter(
+                ExternalSignal.signal_id.in_([uuid.UUID(sid) for sid in batch])
+            ).all()
+            found = {str(r.signal_id): r.embedding for r in rows if r.embedding is not None}
+            self.remove(sid for sid in batch if sid not in found)
+            self.add(found.items())
+        metrics.inc("vector_index_log_rows_applied_total", len(ids))
+        if self._persistent and self._log_position[1] > LOG_COMPACT_BYTES:
+            # Everything logged so far is in the files: start a fresh log
+            tmp = f"{self._log_file}.tmp"
+            open(tmp, "wb").close()
+            os.replace(tmp, self._log_file)
+            self._log_position = self._log_end()
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, vector: Sequence[float], k: int) -> List[Tuple[str, float]]:
+        """Exact top-k as (signal_id, distance), nearest first."""
+        with self._lock:
+            self._ensure_loaded()
+            n = len(self._ids)
+            if not n or k <= 0 or self.dim != len(vector):
+                return []
+            q = np.asarray(vector, dtype=np.float32)
+            dots = self._matrix[:n] @ q
+            if self.distance == "cosine":
+                denom = np.sqrt(self._sq_norms[:n]) * float(np.linalg.norm(q))
+                dist = 1.0 - dots / np.maximum(denom, 1e-12)
+            else:
+                # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2
+                dist = np.sqrt(np.maximum(self._sq_norms[:n] - 2 * dots + float(q @ q), 0.0))
+            k = min(k, n)
+            top = np.argpartition(dist, k - 1)[:k] if k < n else np.arange(n)
+            top = top[np.argsort(dist[top])]
+            return [(self._ids[i], float(dist[i])) for i in top]
+
+
+signal_index = NumpyVectorIndex(os.path.join(settings.VECTOR_INDEX_DIR, "external_signals"))
+
+
+def uses_local_index(db: Session) -> bool:
+    """The in-process index serves every database without pgvector."""
+    return HAS_NUMPY and db.bind.dialect.name != "postgresql"
+
+
+# ----------------------------------------------------------------------
+# Incremental maintenance: apply committed ORM writes to the index
+# ----------------------------------------------------------------------
+
+@event.listens_for(Session, "after_flush")
+def _collect_signal_embeddings(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, ExternalSignal) and obj.embedding is not None:
+            session.info.setdefault(_PENDING_KEY, {})[obj.signal_id] = obj.embedding
+    for obj in session.deleted:
+        if isinstance(obj, ExternalSignal):
+            session.info.setdefault(_PENDING_KEY, {})[obj.signal_id] = None
+
+
+def apply_committed(db: Session, updates: dict) -> None:
+    """
+    Applies committed embedding writes ({signal_id: vector, or None when deleted})
+    to this process's index and logs them for the other processes.
+    """
+    if not updates or not uses_local_index(db):
+        return
+    try:
+        if signal_index._loaded:
+            # Not loaded yet: the first search loads/rebuilds from the database anyway
+            signal_index.remove(sid for sid, vec in updates.items() if vec is None)
+            signal_index.add((sid, vec) for sid, vec in updates.items() if vec is not None)
+        signal_index.publish(updates.keys())
+    except Exception as e:
+        print(f"Vector index update failed: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_signal_embeddings(session):
+    apply_committed(session, session.info.pop(_PENDING_KEY, None))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_signal_embeddings(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
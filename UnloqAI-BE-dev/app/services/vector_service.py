@@ -1,22 +1,191 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.models.meridian import ExternalSignal
-from app.services.llm_service import llm_service
+from sqlalchemy import func, literal, literal_column, select, text, union_all
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.meridian import ExternalSignal, EmbeddingCache
+from app.services.llm_service import get_llm_service
+from app.services.vector_index import signal_index, uses_local_index
+try:
+    from app.services.local_embedder import HashingEmbedder, to_embedding
+    HAS_LOCAL_EMBEDDER = True
+except ImportError:  # numpy missing
+    HAS_LOCAL_EMBEDDER = False
+from collections import OrderedDict
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Dict, List, Optional
+import hashlib
+import re
+import uuid
 import json
+import threading
+
+GEMINI_EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+class EmbeddingLRU:
+    """Thread-safe in-process LRU for hot query strings, keyed by (model, sha256)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+query_embedding_cache = EmbeddingLRU(settings.EMBEDDING_LRU_SIZE)
+
+_local_embedder = None
+
+
+def local_embedder():
+    global _local_embedder
+    if _local_embedder is None or _local_embedder.dim != settings.EMBEDDING_DIM:
+        _local_embedder = HashingEmbedder(settings.EMBEDDING_DIM)
+    return _local_embedder
+
+
+def content_hash(text_content: str) -> str:
+    return hashlib.sha256((text_content or "").encode("utf-8")).hexdigest()
+
+
+def indexed_embedding():
+    """The column carrying the ANN index: the float16 copy under VECTOR_STORAGE=half."""
+    return ExternalSignal.embedding_half if settings.VECTOR_STORAGE == "half" else ExternalSignal.embedding
+
+
+def signal_distance(query_vector: list, column=None):
+    """L2 distance: the operator class the signal ANN indexes are built with."""
+    column = column if column is not None else ExternalSignal.embedding
+    return column.l2_distance(query_vector)
+
+
+def signal_filters(types: List[str] = None, severities: List[str] = None, since: datetime = None) -> list:
+    """Pre-filters shared by every signal search mode."""
+    conditions = []
+    if types:
+        conditions.append(ExternalSignal.type.in_(types))
+    if severities:
+        conditions.append(ExternalSignal.severity.in_(severities))
+    if since:
+        conditions.append(ExternalSignal.timestamp >= since)
+    return conditions
+
+
+def reciprocal_rank_fusion(rankings: List[List], k: int = 60) -> List:
+    """Merges ranked id lists: score(id) = sum(1 / (k + rank)), rank starting at 1."""
+    scores: Dict = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
+
+
+# Generated tsvector column + GIN index, created by migration c2f8e5a17d03 (Postgres only)
+SEARCH_TSV = literal_column("external_signals.search_tsv")
+
 
 class VectorService:
     def __init__(self, db: Session):
         self.db = db
+        self.llm = get_llm_service()
+
+    @property
+    def provider(self) -> str:
+        return settings.EMBEDDING_PROVIDER or self.llm.provider
+
+    @property
+    def is_local(self) -> bool:
+        return self.provider == "local" and HAS_LOCAL_EMBEDDER
+
+    def embedding_model(self) -> str:
+        """Cache namespace: embeddings from different models are never mixed."""
+        if self.is_local:
+            return f"local:{local_embedder().model_name}"
+        if self.provider == "gemini":
+            return f"gemini:{GEMINI_EMBEDDING_MODEL}"
+        return f"{self.provider}:{self.llm.ollama_model}"
 
     def generate_embedding(self, text_content: str) -> list:
         """
-        Generates embeddings using Gemini or Ollama.
+        Returns the embedding for `text_content`, checking the in-process LRU, then
+        the embedding_cache table, before calling the provider. Only non-empty
+        embeddings are cached, so provider failures are retried next time.
+        """
+        if self.is_local:
+            # Computing is cheaper than any cache lookup
+            return local_embedder().embed(text_content)
+
+        key = (self.embedding_model(), content_hash(text_content))
+        cached = query_embedding_cache.get(key)
+        if cached is not None:
+            metrics.inc("embedding_cache_total", result="memory_hit")
+            return cached
+
+        row = self.db.get(EmbeddingCache, key)
+        if row is not None and row.embedding is not None:
+            vector = list(row.embedding)
+            query_embedding_cache.put(key, vector)
+            metrics.inc("embedding_cache_total", result="db_hit")
+            return vector
+
+        metrics.inc("embedding_cache_total", result="miss")
+        vector = self._embed(text_content)
+        if vector:
+            vector = list(vector)
+            query_embedding_cache.put(key, vector)
+            self._store(key, vector)
+        return vector
+
+    def _store(self, key, vector: list) -> None:
+        model, digest = key
+        self._write_cache([EmbeddingCache(model=model, content_hash=digest, embedding=vector)])
+
+    def _write_cache(self, rows: List[EmbeddingCache]) -> None:
+        """
+        Persists cache rows in a session of their own, so caching never commits
+        or rolls back whatever the caller has pending on self.db.
+        """
+        db = Session(bind=self.db.get_bind())
+        try:
+            db.add_all(rows)
+            db.commit()
+        except Exception as e:
+            # Another worker cached the same text first; ours is identical
+            db.rollback()
+            print(f"Embedding cache write skipped: {e}")
+        finally:
+            db.close()
+
+    def _embed(self, text_content: str) -> list:
+        """
+        Generates embeddings using Gemini, Ollama or the local CPU embedder.
         """
+        llm_service = self.llm
+        if self.is_local:
+            return local_embedder().embed(text_content)
         # 1. Try Gemini
-        if llm_service.provider == "gemini" and llm_service.gemini_client:
+        if self.provider == "gemini" and llm_service.gemini_client:
             try:
                 result = llm_service.gemini_client.models.embed_content(
-                    model="models/text-embedding-004",
+                    model=GEMINI_EMBEDDING_MODEL,
                     contents=text_content
                 )
                 return result.embeddings[0].values
@@ -25,7 +194,7 @@ class VectorService:
                 return []
         
         # 2. Try Ollama (Local)
-        elif llm_service.provider == "ollama":
+        elif self.provider == "ollama":
             import requests
             try:
                 # Use the same model as the chat, or a specific embedding model if configured
@@ -48,34 +217,258 @@ class VectorService:
 
         return []
 
-    def search_signals(self, query: str, limit: int = 5):
+    def embed_many(self, texts: List[str], executor: Optional[Executor] = None) -> List[list]:
+        """
+        Embeds `texts` in order. Cached texts (LRU, then one embedding_cache lookup)
+        cost nothing; the rest are de-duplicated and sent to the provider in
+        EMBEDDING_BATCH_SIZE batches, concurrently when an `executor` is given.
+        Failed embeddings come back as [].
+        """
+        if self.is_local:
+            return [to_embedding(row) for row in local_embedder().embed_batch(texts)]
+
+        model = self.embedding_model()
+        digests = [content_hash(t) for t in texts]
+        found: Dict[str, list] = {}
+
+        for digest in set(digests):
+            cached = query_embedding_cache.get((model, digest))
+            if cached is not None:
+                found[digest] = cached
+        lookup = [d for d in set(digests) if d not in found]
+        if lookup:
+            rows = self.db.query(EmbeddingCache).filter(
+                EmbeddingCache.model == model,
+                EmbeddingCache.content_hash.in_(lookup),
+            ).all()
+            for row in rows:
+                if row.embedding is not None:
+                    found[row.content_hash] = list(row.embedding)
+
+        pending: Dict[str, str] = {}
+        for digest, text_content in zip(digests, texts):
+            if digest not in found:
+                pending.setdefault(digest, text_content)
+        metrics.inc("embedding_cache_total", len(set(digests)) - len(pending), result="batch_hit")
+        metrics.inc("embedding_cache_total", len(pending), result="miss")
+
+        if pending:
+            keys = list(pending.keys())
+            size = max(1, settings.EMBEDDING_BATCH_SIZE)
+            batches = [keys[i:i + size] for i in range(0, len(keys), size)]
+            run = lambda batch: self._embed_batch([pending[d] for d in batch])
+            outputs = executor.map(run, batches) if executor else map(run, batches)
+
+            fresh = []
+            for batch, vectors in zip(batches, outputs):
+                for digest, vector in zip(batch, vectors):
+                    if vector:
+                        found[digest] = list(vector)
+                        fresh.append(EmbeddingCache(model=model, content_hash=digest, embedding=list(vector)))
+            if fresh:
+                self._write_cache(fresh)
+
+        for digest, vector in found.items():
+            query_embedding_cache.put((model, digest), vector)
+        return [found.get(d, []) for d in digests]
+
+    def _embed_batch(self, texts: List[str]) -> List[list]:
+        """
+        One provider call for many texts where the provider supports it
+        (Gemini embed_content, Ollama /api/embed, local); otherwise one call per text.
+        """
+        llm_service = self.llm
+        if self.is_local:
+            return [to_embedding(row) for row in local_embedder().embed_batch(texts)]
+        if self.provider == "gemini" and llm_service.gemini_client:
+            try:
+                result = llm_service.gemini_client.models.embed_content(
+                    model=GEMINI_EMBEDDING_MODEL,
+                    contents=texts
+                )
+                return [e.values for e in result.embeddings]
+            except Exception as e:
+                print(f"Gemini Batch Embedding Error: {e}")
+                return [[] for _ in texts]
+
+        elif self.provider == "ollama":
+            import requests
+            try:
+                url = f"{llm_service.ollama_base_url}/api/embed"
+                payload = {"model": llm_service.ollama_model, "input": texts}
+                res = requests.post(url, json=payload, timeout=60)
+                if res.status_code == 200:
+                    embeddings = res.json().get("embeddings", [])
+                    if len(embeddings) == len(texts):
+                        return embeddings
+                # Older Ollama builds only expose the single-prompt endpoint
+            except Exception as e:
+                print(f"Ollama Batch Embedding Error: {e}")
+
+        return [self._embed(t) for t in texts]
+
+    def search_signals(self, query: str, limit: int = 5, ef_search: int = None):
         """
         Semantic search over External Signals using pgvector.
+        Uses the HNSW index on external_signals.embedding; `ef_search` trades
+        latency for recall per request.
         """
-        # SQLite Fallback for Tests
-        if self.db.bind.dialect.name == "sqlite":
-            # Just return recent signals for context
-            return self.db.query(ExternalSignal).limit(limit).all()
+        if self.db.bind.dialect.name != "postgresql":
+            return self._search_local(query, limit)
 
         query_vector = self.generate_embedding(query)
         if not query_vector:
             return []
 
-        # L2 Distance search operator (<->)
+        self._tune_ann(ef_search)
+        if settings.VECTOR_STORAGE == "half":
+            return self._search_half(query_vector, limit)
         signals = self.db.query(ExternalSignal).order_by(
-            ExternalSignal.embedding.l2_distance(query_vector)
+            signal_distance(query_vector)
         ).limit(limit).all()
         
         return signals
 
+    def _search_half(self, query_vector: list, limit: int):
+        """
+        Walks the compact halfvec index for VECTOR_RERANK_FACTOR x `limit`
+        candidates, then re-ranks those few rows by full-precision distance,
+        in the same statement, to win back the recall lost to float16.
+        """
+        candidates = (
+            select(ExternalSignal.signal_id)
+            .where(ExternalSignal.embedding_half != None)  # noqa: E711
+            .order_by(signal_distance(query_vector, ExternalSignal.embedding_half))
+            .limit(limit * max(1, settings.VECTOR_RERANK_FACTOR))
+            .subquery("half_candidates")
+        )
+        return (
+            self.db.query(ExternalSignal)
+            .join(candidates, ExternalSignal.signal_id == candidates.c.signal_id)
+            .order_by(signal_distance(query_vector))
+            .limit(limit)
+            .all()
+        )
+
+    def hybrid_search(
+        self,
+        query: str,
+        limit: int = 10,
+        types: List[str] = None,
+        severities: List[str] = None,
+        since: datetime = None,
+        candidates: int = 50,
+        rrf_k: int = 60,
+        ef_search: int = None,
+    ) -> List[ExternalSignal]:
+        """
+        Keyword (tsvector) + vector search merged by reciprocal rank fusion.
+        Exact competitor names and product codes surface through the keyword
+        list even when the embedding misses them. Filters on type, severity and
+        time window apply inside both candidate lists, before ranking.
+        `ef_search` tunes the vector list as in search_signals.
+        """
+        conditions = signal_filters(types, severities, since)
+        query_vector = self.generate_embedding(query)
+
+        if self.db.bind.dialect.name != "postgresql":
+            return self._hybrid_local(query, query_vector, conditions, limit, candidates, rrf_k)
+
+        self._tune_ann(ef_search)
+        fused = self.hybrid_statement(query, query_vector, conditions, limit, candidates, rrf_k).subquery()
+        rows = (
+            self.db.query(ExternalSignal)
+            .join(fused, ExternalSignal.signal_id == fused.c.signal_id)
+            .order_by(fused.c.score.desc())
+            .all()
+        )
+        return rows
+
+    def hybrid_statement(self, query: str, query_vector: list, conditions: list, limit: int, candidates: int, rrf_k: int):
+        """Both candidate lists and the fusion as one statement, so hybrid search is a single round trip."""
+        tsquery = func.websearch_to_tsquery("english", query)
+        keyword_rank = func.ts_rank_cd(SEARCH_TSV, tsquery)
+        keyword = (
+            select(
+                ExternalSignal.signal_id,
+                func.row_number().over(order_by=keyword_rank.desc()).label("rank"),
+            )
+            .where(SEARCH_TSV.op("@@")(tsquery), *conditions)
+            .order_by(keyword_rank.desc())
+            .limit(candidates)
+            .cte("keyword_hits")
+        )
+        ranked = [select(keyword.c.signal_id, (literal(1.0) / (rrf_k + keyword.c.rank)).label("score"))]
+
+        if query_vector:
+            column = indexed_embedding()
+            distance = signal_distance(query_vector, column)
+            semantic = (
+                select(
+                    ExternalSignal.signal_id,
+                    func.row_number().over(order_by=distance).label("rank"),
+                )
+                .where(column != None, *conditions)  # noqa: E711
+                .order_by(distance)
+                .limit(candidates)
+                .cte("vector_hits")
+            )
+            ranked.append(select(semantic.c.signal_id, (literal(1.0) / (rrf_k + semantic.c.rank)).label("score")))
+
+        scored = union_all(*ranked).subquery("scored")
+        return (
+            select(scored.c.signal_id, func.sum(scored.c.score).label("score"))
+            .group_by(scored.c.signal_id)
+            .order_by(func.sum(scored.c.score).desc())
+            .limit(limit)
+        )
+
+    def _hybrid_local(self, query: str, query_vector: list, conditions: list, limit: int, candidates: int, rrf_k: int):
+        """Same fusion without Postgres: term-overlap keyword ranking plus the NumPy index."""
+        rows = self.db.query(ExternalSignal).filter(*conditions).all()
+        by_id = {str(s.signal_id): s for s in rows}
+
+        terms = set(re.findall(r"\w+", query.lower()))
+        overlap = {
+            sid: len(terms & set(re.findall(r"\w+", (s.description or "").lower())))
+            for sid, s in by_id.items()
+        }
+        keyword = sorted((sid for sid, n in overlap.items() if n), key=lambda sid: -overlap[sid])[:candidates]
+
+        semantic = []
+        if query_vector and uses_local_index(self.db):
+            signal_index.sync(self.db)
+            # Exact scan over the whole index, then filter: same cost as a filtered scan
+            semantic = [sid for sid, _ in signal_index.search(query_vector, len(signal_index)) if sid in by_id]
+            semantic = semantic[:candidates]
+
+        return [by_id[sid] for sid in reciprocal_rank_fusion([keyword, semantic], rrf_k)[:limit]]
+
+    def _search_local(self, query: str, limit: int):
+        """No pgvector: rank with the in-process NumPy index (see vector_index)."""
+        query_vector = self.generate_embedding(query) if uses_local_index(self.db) else []
+        if query_vector:
+            signal_index.sync(self.db)
+            hits = signal_index.search(query_vector, limit)
+            if hits:
+                ids = [uuid.UUID(sid) for sid, _ in hits]
+                by_id = {s.signal_id: s for s in self.db.query(ExternalSignal).filter(ExternalSignal.signal_id.in_(ids))}
+                return [by_id[i] for i in ids if i in by_id]
+        # Nothing embedded yet (or no embedding provider): recent signals for context
+        return self.db.query(ExternalSignal).order_by(ExternalSignal.timestamp.desc()).limit(limit).all()
+
+    def _tune_ann(self, ef_search: int = None) -> None:
+        """
+        SET LOCAL scopes the knob to the current transaction, so a pooled
+        connection never leaks one request's recall setting into the next.
+        """
+        self.db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search or settings.HNSW_EF_SEARCH)}"))
+
     def backfill_embeddings(self):
         """
-        One-time helper to generate embeddings for existing seeded data.
+        Embeds every ExternalSignal that has no embedding yet.
+        Chunked, concurrent and resumable; see EmbeddingBackfill.
         """
-        signals = self.db.query(ExternalSignal).filter(ExternalSignal.embedding == None).all()
-        count = 0
-        for sig in signals:
-            sig.embedding = self.generate_embedding(sig.description)
-            count += 1
-        self.db.commit()
-        return count
\ No newline at end of file
+        from app.services.embedding_backfill import EmbeddingBackfill
+        stats = EmbeddingBackfill(self.db).run()
+        return stats["embedded"]
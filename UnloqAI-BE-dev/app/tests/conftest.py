@@ -1,15 +1,24 @@
+import os
+import tempfile
 import pytest
 from typing import Generator
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from unittest.mock import MagicMock
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC
+
+# Tests never reach a real LLM unless a provider is explicitly configured
+os.environ.setdefault("LLM_PROVIDER", "replay")
+# Keep the NumPy vector index files (and their change log) out of the working tree
+os.environ.setdefault("VECTOR_INDEX_DIR", tempfile.mkdtemp(prefix="vector_index_"))
 
 from app.main import app
 from app.db.session import get_db
 from app.models.base import Base
-from app.services.llm_service import llm_service
+from app.services.llm_service import get_llm_service
+
+llm_service = get_llm_service()
 
 # --- FIX FOR SQLITE COMPATIBILITY ---
 from sqlalchemy.dialects.sqlite.base import SQLiteDialect
@@ -27,6 +36,10 @@ def compile_uuid(type_, compiler, **kw):
 @compiles(Vector, "sqlite")
 def compile_vector(type_, compiler, **kw):
     return "JSON"
+
+@compiles(HALFVEC, "sqlite")
+def compile_halfvec(type_, compiler, **kw):
+    return "JSON"
 # ------------------------------------
 
 from sqlalchemy.pool import StaticPool
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from app.core.security import create_access_token
+from app.models.meridian import ChatArchive, ChatMessage, ChatSession
+from app.services import chat_archive
+from app.services.chat_archive import ChatArchiver
+from app.services.chat_store import append_user_message
+
+
+def _session_with_messages(db_session, user_id, last_active, count=5):
+    session = ChatSession(title="Old", user_id=user_id)
+    db_session.add(session)
+    db_session.commit()
+    for i in range(count):
+        db_session.add(ChatMessage(session_id=session.session_id, role="user" if i % 2 == 0 else "assistant",
+                                   content=f'{{"answer": "m{i}", "details": "{"x" * 500}"}}',
+                                   created_at=last_active - timedelta(minutes=count - 1 - i)))
+    db_session.commit()
+    return session.session_id
+
+
+def test_idle_sessions_move_to_compressed_archive(db_session):
+    idle = _session_with_messages(db_session, "erin", datetime.utcnow() - timedelta(days=120))
+    active = _session_with_messages(db_session, "erin", datetime.utcnow() - timedelta(days=1))
+
+    stats = ChatArchiver(db_session, idle_days=90).run()
+
+    assert stats["sessions"] == 1
+    assert stats["compressed_bytes"] < stats["raw_bytes"]
+    assert db_session.query(ChatMessage).filter(ChatMessage.session_id == idle).count() == 0
+    assert db_session.query(ChatMessage).filter(ChatMessage.session_id == active).count() == 5
+    archive = db_session.get(ChatArchive, idle)
+    assert archive.message_count == 5 and archive.codec in ("zstd", "gzip")
+    session = db_session.get(ChatSession, idle)
+    assert session.archived_at is not None and session.message_count == 5
+
+    # Already archived: a second run is a no-op
+    assert ChatArchiver(db_session, idle_days=90).run()["sessions"] == 0
+
+
+def test_archived_history_is_served_transparently(client, db_session):
+    sid = _session_with_messages(db_session, "erin", datetime.utcnow() - timedelta(days=120), count=7)
+    ChatArchiver(db_session, idle_days=90).run()
+    url = f"/api/v1/chat/sessions/{sid}/messages"
+    headers = {"Authorization": f"Bearer {create_access_token('erin')}"}
+
+    newest = client.get(url, params={"limit": 3}, headers=headers)
+    assert [m["content"][12:14] for m in newest.json()] == ["m4", "m5", "m6"]
+    older = client.get(url, params={"limit": 3, "cursor": newest.headers["X-Next-Cursor"]}, headers=headers)
+    assert [m["content"][12:14] for m in older.json()] == ["m1", "m2", "m3"]
+    oldest = client.get(url, params={"limit": 3, "cursor": older.headers["X-Next-Cursor"]}, headers=headers)
+    assert [m["content"][12:14] for m in oldest.json()] == ["m0"]
+    assert "X-Next-Cursor" not in oldest.headers
+
+
+def test_writing_to_archived_session_restores_it(db_session):
+    sid = _session_with_messages(db_session, "erin", datetime.utcnow() - timedelta(days=120))
+    ChatArchiver(db_session, idle_days=90).run()
+
+    appended = append_user_message(db_session, sid, "erin", "back again", window=4)
+    assert appended.session.archived_at is not None and appended.recent == []
+    restored = chat_archive.restore(db_session, sid)
+
+    assert len(restored) == 5
+    assert db_session.get(ChatArchive, sid) is None
+    session = db_session.get(ChatSession, sid)
+    assert session.archived_at is None
+    assert session.message_count == 6  # restored rows are not counted twice
+    assert db_session.query(ChatMessage).filter(ChatMessage.session_id == sid).count() == 6
+    # A second (concurrent) restore finds the archive gone and inserts nothing
+    assert chat_archive.restore(db_session, sid) == []
+    assert db_session.query(ChatMessage).filter(ChatMessage.session_id == sid).count() == 6
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+from app.core.security import create_access_token
+from app.models.meridian import ChatSession, ChatMessage
+
+
+def _auth(user_id):
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+def test_sessions_are_per_user_and_keyset_paginated(client, db_session):
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(5):
+        db_session.add(ChatSession(title=f"Alice {i}", user_id="alice", updated_at=base + timedelta(minutes=i)))
+    db_session.add(ChatSession(title="Bob's chat", user_id="bob", updated_at=base))
+    db_session.commit()
+
+    first = client.get("/api/v1/chat/sessions", params={"limit": 2}, headers=_auth("alice"))
+    assert [s["title"] for s in first.json()] == ["Alice 4", "Alice 3"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    titles = []
+    while cursor:
+        page = client.get("/api/v1/chat/sessions", params={"limit": 2, "cursor": cursor}, headers=_auth("alice"))
+        titles += [s["title"] for s in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+    assert titles == ["Alice 2", "Alice 1", "Alice 0"]
+
+    bob = client.get("/api/v1/chat/sessions", headers=_auth("bob")).json()
+    assert [s["title"] for s in bob] == ["Bob's chat"]
+    assert client.get("/api/v1/chat/sessions", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_messages_lazy_load_older_turns(client, db_session):
+    session = ChatSession(title="Long", user_id="alice")
+    db_session.add(session)
+    db_session.flush()
+    start = datetime(2026, 1, 1, 9, 0, 0)
+    for i in range(7):
+        db_session.add(ChatMessage(session_id=session.session_id, role="user" if i % 2 == 0 else "assistant",
+                                   content=f"m{i}", created_at=start + timedelta(seconds=i)))
+    db_session.commit()
+    url = f"/api/v1/chat/sessions/{session.session_id}/messages"
+
+    newest = client.get(url, params={"limit": 3}, headers=_auth("alice"))
+    assert [m["content"] for m in newest.json()] == ["m4", "m5", "m6"]
+    older = client.get(url, params={"limit": 3, "cursor": newest.headers["X-Next-Cursor"]}, headers=_auth("alice"))
+    assert [m["content"] for m in older.json()] == ["m1", "m2", "m3"]
+    oldest = client.get(url, params={"limit": 3, "cursor": older.headers["X-Next-Cursor"]}, headers=_auth("alice"))
+    assert [m["content"] for m in oldest.json()] == ["m0"]
+    assert "X-Next-Cursor" not in oldest.headers
+
+    assert client.get(url, headers=_auth("bob")).status_code == 404
+
+
+def test_unpaged_requests_get_the_full_history(client, db_session, monkeypatch):
+    """Clients that send neither limit nor cursor keep the pre-pagination behaviour."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "CHAT_PAGE_SIZE", 2)
+    session = ChatSession(title="Legacy", user_id="carol")
+    db_session.add(session)
+    db_session.flush()
+    start = datetime(2026, 1, 1, 9, 0, 0)
+    for i in range(5):
+        db_session.add(ChatMessage(session_id=session.session_id, role="user",
+                                   content=f"m{i}", created_at=start + timedelta(seconds=i)))
+    db_session.commit()
+
+    res = client.get(f"/api/v1/chat/sessions/{session.session_id}/messages", headers=_auth("carol"))
+    assert [m["content"] for m in res.json()] == [f"m{i}" for i in range(5)]
+    assert "X-Next-Cursor" not in res.headers
+
+
+def test_legacy_chat_history_is_unpaged_by_default(client, db_session, monkeypatch):
+    """/meridian/chat/history returns every message, oldest first, unless a page is asked for."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "CHAT_PAGE_SIZE", 2)
+    session = ChatSession(title="Legacy history", user_id="dave")
+    db_session.add(session)
+    db_session.flush()
+    start = datetime(2026, 2, 1, 9, 0, 0)
+    for i in range(5):
+        db_session.add(ChatMessage(session_id=session.session_id, role="user",
+                                   content=f"h{i}", created_at=start + timedelta(seconds=i)))
+    db_session.commit()
+
+    everything = db_session.query(ChatMessage).order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc()).all()
+    res = client.get("/api/v1/meridian/chat/history")
+    assert [m["id"] for m in res.json()] == [str(m.id) for m in everything]
+    assert "X-Next-Cursor" not in res.headers
+
+    paged = client.get("/api/v1/meridian/chat/history", params={"limit": 2})
+    assert [m["id"] for m in paged.json()] == [str(m.id) for m in everything[-2:]]
+    assert "X-Next-Cursor" in paged.headers
+
+
+def test_invalid_bearer_token_is_rejected(client):
+    """A bad token is an error, not a silent fall back to the shared demo user."""
+    res = client.get("/api/v1/chat/sessions", headers={"Authorization": "Bearer not-a-jwt"})
+    assert res.status_code == 401
+    assert client.get("/api/v1/chat/sessions").status_code == 200
+
+
+def test_delta_sync_and_etags(client, db_session):
+    headers = _auth("dana")
+    created = client.post("/api/v1/chat/sessions", json={"title": "Sync me"}, headers=headers).json()
+
+    full = client.get("/api/v1/chat/sync", headers=headers)
+    body = full.json()
+    assert [s["title"] for s in body["sessions"]] == ["Sync me"]
+    assert body["session_ids"] == [created["session_id"]]
+
+    # Nothing changed: the same cursor + ETag is answered 304 with no body
+    cursor, etag = body["cursor"], None
+    delta = client.get("/api/v1/chat/sync", params={"cursor": cursor}, headers=headers)
+    assert delta.json()["sessions"] == []
+    etag = delta.headers["ETag"]
+    unchanged = client.get("/api/v1/chat/sync", params={"cursor": cursor}, headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.content == b""
+
+    probe_etag = client.get("/api/v1/chat/sync/probe", headers=headers).headers["ETag"]
+    assert client.get("/api/v1/chat/sync/probe", headers={**headers, "If-None-Match": probe_etag}).status_code == 304
+
+    # A background title rewrite does not move updated_at but is still synced
+    from app.services.title_worker import TitleWorker
+    from sqlalchemy.orm import sessionmaker
+    import uuid
+    client.patch(f"/api/v1/chat/sessions/{created['session_id']}", json={"title": "New Chat"}, headers=headers)
+    cursor = client.get("/api/v1/chat/sync", headers=headers).json()["cursor"]
+    TitleWorker(sessionmaker(bind=db_session.get_bind()))._write({uuid.UUID(created["session_id"]): "Margin Review"})
+
+    changed = client.get("/api/v1/chat/sync", params={"cursor": cursor}, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert [s["title"] for s in changed.json()["sessions"]] == ["Margin Review"]
+    assert client.get("/api/v1/chat/sync/probe", headers={**headers, "If-None-Match": probe_etag}).status_code == 200
+
+    cursor = changed.json()["cursor"]
+    db_session.add(ChatMessage(session_id=uuid.UUID(created["session_id"]), role="user", content="what changed?"))
+    db_session.commit()
+    new_messages = client.get("/api/v1/chat/sync", params={"cursor": cursor}, headers=headers).json()["messages"]
+    assert [m["content"] for m in new_messages] == ["what changed?"]
+
+
+def test_sync_responses_are_bounded(client, db_session, monkeypatch):
+    from app.core.config import settings
+    from app.services.chat_archive import ChatArchiver
+    monkeypatch.setattr(settings, "CHAT_SYNC_MAX_SESSIONS", 2)
+    monkeypatch.setattr(settings, "CHAT_PAGE_SIZE", 2)
+    headers = _auth("erin")
+    since = datetime(2026, 3, 1)
+    sessions = []
+    for i in range(3):
+        s = ChatSession(title=f"Erin {i}", user_id="erin", changed_at=since + timedelta(minutes=i + 1))
+        db_session.add(s)
+        db_session.flush()
+        sessions.append(s)
+        for j in range(3):
+            db_session.add(ChatMessage(session_id=s.session_id, role="user", content=f"s{i}m{j}",
+                                       created_at=since + timedelta(minutes=i, seconds=j)))
+    db_session.commit()
+
+    # First sync: sessions only, in pages
+    first = client.get("/api/v1/chat/sync", headers=headers).json()
+    assert first["messages"] == [] and first["has_more"]
+    rest = client.get("/api/v1/chat/sync", params={"cursor": first["cursor"]}, headers=headers).json()
+    assert [s["title"] for s in first["sessions"] + rest["sessions"]] == ["Erin 0", "Erin 1", "Erin 2"]
+    assert not rest["has_more"]
+
+    # Deltas carry the newest page of each session's messages, and a cursor for the rest
+    delta = client.get("/api/v1/chat/sync", params={"cursor": since.isoformat()}, headers=headers).json()
+    assert [m["content"] for m in delta["messages"]] == ["s0m1", "s0m2", "s1m1", "s1m2"]
+    older = delta["sessions"][0]["messages_cursor"]
+    page = client.get(f"/api/v1/chat/sessions/{sessions[0].session_id}/messages",
+                      params={"cursor": older}, headers=headers).json()
+    assert [m["content"] for m in page] == ["s0m0"]
+
+    # Archived sessions' messages come out of cold storage
+    monkeypatch.setattr(settings, "CHAT_SYNC_MAX_SESSIONS", 100)
+    cold = sessions[2]
+    cold.last_message_at = datetime(2026, 3, 1)
+    db_session.commit()
+    assert ChatArchiver(db_session, idle_days=1).archive_session(cold.session_id)
+    delta = client.get("/api/v1/chat/sync", params={"cursor": since.isoformat()}, headers=headers).json()
+    assert [m["content"] for m in delta["messages"] if m["session_id"] == str(cold.session_id)] == ["s2m1", "s2m2"]
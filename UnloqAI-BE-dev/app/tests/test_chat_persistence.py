@@ -0,0 +1,185 @@
+import time
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.meridian import ChatSession, ChatMessage
+from app.services.chat_writer import ChatWriteBehind, chat_writer
+from app.services.oakfield.copilot import CopilotService
+from app.services.title_worker import title_worker
+
+
+@pytest.fixture(scope="module")
+def test_session_factory(db_session):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+
+@pytest.fixture
+def chat_session(db_session):
+    s = ChatSession(title="Persistence Test", user_id="demo_user")
+    db_session.add(s)
+    db_session.commit()
+    return s
+
+
+def test_write_behind_flushes_on_batch_size(test_session_factory, chat_session, db_session):
+    """A full batch is written without waiting for the flush interval."""
+    writer = ChatWriteBehind(test_session_factory, batch_size=2, flush_interval_ms=10_000)
+    writer.enqueue(chat_session.session_id, "assistant", "first")
+    writer.enqueue(chat_session.session_id, "assistant", "second")
+
+    deadline = time.time() + 3
+    count = 0
+    while time.time() < deadline:
+        db_session.expire_all()
+        count = db_session.query(ChatMessage).filter(
+            ChatMessage.session_id == chat_session.session_id
+        ).count()
+        if count == 2:
+            break
+        time.sleep(0.02)
+    assert count == 2
+    writer.drain()
+
+
+def test_drain_persists_everything_queued(test_session_factory, chat_session, db_session):
+    writer = ChatWriteBehind(test_session_factory, batch_size=50, flush_interval_ms=60_000)
+    for i in range(5):
+        writer.enqueue(chat_session.session_id, "assistant", f"reply {i}")
+    writer.drain()
+
+    db_session.expire_all()
+    contents = [m.content for m in db_session.query(ChatMessage).filter(
+        ChatMessage.session_id == chat_session.session_id
+    ).order_by(ChatMessage.created_at.asc())]
+    assert contents == [f"reply {i}" for i in range(5)]
+    assert writer.pending() == 0
+
+
+def test_message_counters_track_orm_and_bulk_inserts(test_session_factory, chat_session, db_session):
+    db_session.add(ChatMessage(session_id=chat_session.session_id, role="user", content="question"))
+    db_session.commit()
+    assert chat_session.message_count == 1
+
+    writer = ChatWriteBehind(test_session_factory, batch_size=50, flush_interval_ms=60_000)
+    for i in range(3):
+        writer.enqueue(chat_session.session_id, "assistant", f"reply {i}")
+    writer.drain()
+
+    db_session.expire_all()
+    latest = db_session.query(ChatMessage).filter(
+        ChatMessage.session_id == chat_session.session_id
+    ).order_by(ChatMessage.created_at.desc()).first()
+    assert chat_session.message_count == 4
+    assert chat_session.last_message_at == latest.created_at
+
+
+def test_flush_drops_only_rows_of_deleted_sessions(test_session_factory, chat_session, db_session):
+    """A session deleted while its reply was queued does not cost the rest of the batch."""
+    doomed = ChatSession(title="Deleted", user_id="demo_user")
+    db_session.add(doomed)
+    db_session.commit()
+    doomed_id = doomed.session_id
+
+    writer = ChatWriteBehind(test_session_factory, batch_size=50, flush_interval_ms=60_000)
+    writer.enqueue(doomed_id, "assistant", "orphan")
+    writer.enqueue(chat_session.session_id, "assistant", "kept")
+    db_session.delete(doomed)
+    db_session.commit()
+    writer.drain()
+
+    db_session.expire_all()
+    contents = [m.content for m in db_session.query(ChatMessage).filter(
+        ChatMessage.session_id.in_([doomed_id, chat_session.session_id])
+    )]
+    assert contents == ["kept"]
+
+
+def test_failed_flush_is_requeued(test_session_factory, chat_session, db_session):
+    """A transient failure puts the batch back on the queue instead of losing it."""
+    calls = {"n": 0}
+
+    def flaky_factory():
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("connection reset")
+        return test_session_factory()
+
+    writer = ChatWriteBehind(flaky_factory, batch_size=50, flush_interval_ms=60_000)
+    writer.enqueue(chat_session.session_id, "assistant", "survives")
+    assert writer.drain() == 1
+
+    db_session.expire_all()
+    contents = [m.content for m in db_session.query(ChatMessage).filter(
+        ChatMessage.session_id == chat_session.session_id
+    )]
+    assert contents == ["survives"]
+
+
+def test_send_message_persists_streamed_reply(client, chat_session, test_session_factory, monkeypatch):
+    """The assistant reply streamed by send_message ends up in the session history."""
+    def fake_completion(self, user_query, history=None):
+        yield '{"type": "analysis_response", '
+        yield '"title": "Margins"}'
+
+    monkeypatch.setattr(CopilotService, "chat_completion", fake_completion)
+    monkeypatch.setattr(title_worker, "submit", lambda *a: None)
+    monkeypatch.setattr(chat_writer, "session_factory", test_session_factory)
+
+    sid = str(chat_session.session_id)
+    res = client.post(f"/api/v1/chat/sessions/{sid}/message", json={"content": "How are margins?"})
+    assert res.status_code == 200
+    chat_writer.drain()
+
+    history = client.get(f"/api/v1/chat/sessions/{sid}/messages").json()
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert history[1]["content"] == '{"type": "analysis_response", "title": "Margins"}'
+
+
+def test_rejected_admission_persists_nothing(client, chat_session, db_session, monkeypatch):
+    """A 429 must not leave an orphan user turn behind for the retry to duplicate."""
+    from fastapi import HTTPException
+    from app.api.v1.endpoints import chat
+
+    async def saturated(request):
+        raise HTTPException(status_code=429, detail="LLM capacity exhausted", headers={"Retry-After": "1"})
+
+    monkeypatch.setattr(chat, "admit_llm_request", saturated)
+    monkeypatch.setattr(title_worker, "submit", lambda *a: pytest.fail("title job queued for a rejected turn"))
+
+    res = client.post(f"/api/v1/chat/sessions/{chat_session.session_id}/message", json={"content": "Busy?"})
+    assert res.status_code == 429
+    db_session.expire_all()
+    assert db_session.query(ChatMessage).filter(ChatMessage.session_id == chat_session.session_id).count() == 0
+    assert chat_session.message_count == 0
+
+
+def test_without_background_workers_enqueue_writes_inline(test_session_factory, chat_session, db_session, monkeypatch):
+    """Under Lambda there is no worker thread to outlive the invocation."""
+    monkeypatch.setattr(settings, "BACKGROUND_WORKERS", False)
+    writer = ChatWriteBehind(test_session_factory, batch_size=50, flush_interval_ms=60_000)
+    writer.enqueue(chat_session.session_id, "assistant", "inline reply")
+
+    assert writer._thread is None
+    assert writer.pending() == 0
+    db_session.expire_all()
+    assert [m.content for m in db_session.query(ChatMessage).filter(
+        ChatMessage.session_id == chat_session.session_id
+    )] == ["inline reply"]
+
+
+def test_follow_up_history_includes_the_queued_reply(test_session_factory, chat_session, db_session, monkeypatch):
+    """A reply still in the write-behind queue is flushed before the next turn's history is read."""
+    from app.api.v1.endpoints import chat
+
+    writer = ChatWriteBehind(test_session_factory, batch_size=50, flush_interval_ms=60_000)
+    monkeypatch.setattr(chat, "chat_writer", writer)
+    monkeypatch.setattr(title_worker, "submit", lambda *a: None)
+    db_session.add(ChatMessage(session_id=chat_session.session_id, role="user", content="How are margins?"))
+    db_session.commit()
+    writer.enqueue(chat_session.session_id, "assistant", "Margins are 31%.")
+
+    history = chat._prepare_turn(db_session, chat_session.session_id, "demo_user", "And last year?")
+    assert [t["role"] for t in history] == ["user", "assistant"]
+    assert history[-1]["content"] == "Margins are 31%."
+    assert writer.drain() == 0
@@ -0,0 +1,44 @@
+from sqlalchemy import event
+
+from app.models.meridian import ChatSession, ChatMessage
+from app.services.chat_store import append_user_message
+
+
+def test_append_is_one_short_transaction(db_session):
+    session = ChatSession(title="New Chat", user_id="carol")
+    db_session.add(session)
+    db_session.commit()
+    db_session.add(ChatMessage(session_id=session.session_id, role="user", content="earlier question"))
+    db_session.add(ChatMessage(session_id=session.session_id, role="assistant", content="earlier answer"))
+    db_session.commit()
+    sid = session.session_id
+
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, stmt, params, context, many: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = append_user_message(db_session, sid, "carol", "new question", window=8)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 3  # UPDATE ... RETURNING, recent turns, INSERT
+    assert result.message_count == 3
+    assert [t.content for t in result.recent] == ["earlier answer", "earlier question"]
+    assert result.session.title == "New Chat"
+
+    db_session.expire_all()
+    stored = db_session.get(ChatMessage, result.message_id)
+    assert stored.content == "new question" and stored.role == "user"
+    assert session.message_count == 3 and session.last_message_at == stored.created_at
+
+
+def test_append_to_someone_elses_session_writes_nothing(db_session):
+    session = ChatSession(title="Private", user_id="carol")
+    db_session.add(session)
+    db_session.commit()
+
+    assert append_user_message(db_session, session.session_id, "mallory", "hi", window=8) is None
+    db_session.expire_all()
+    assert session.message_count == 0
+    assert db_session.query(ChatMessage).filter(ChatMessage.session_id == session.session_id).count() == 0
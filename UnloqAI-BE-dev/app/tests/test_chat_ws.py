@@ -0,0 +1,103 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.security import create_access_token
+from app.models.meridian import ChatSession
+from app.services.chat_writer import chat_writer
+from app.services.oakfield.copilot import CopilotService
+from app.services.title_worker import title_worker
+
+
+def _frames_until(ws, kind):
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        frames.append(frame)
+        if frame["type"] == kind:
+            return frames
+
+
+def test_turns_history_and_events_share_one_socket(client, db_session, monkeypatch):
+    session = ChatSession(title="Socket chat", user_id="frank")
+    db_session.add(session)
+    db_session.commit()
+    sid = str(session.session_id)
+
+    def fake_completion(self, user_query, history=None):
+        yield "Margins "
+        yield "are up."
+
+    monkeypatch.setattr(CopilotService, "chat_completion", fake_completion)
+    monkeypatch.setattr(title_worker, "submit", lambda *a: None)
+    monkeypatch.setattr(chat_writer, "enqueue", lambda *a, **k: None)
+
+    token = create_access_token("frank")
+    with client.websocket_connect(f"/api/v1/chat/ws?token={token}") as ws:
+        ws.send_json({"type": "ping", "id": 1})
+        assert ws.receive_json() == {"type": "pong", "id": 1}
+
+        ws.send_json({"type": "sessions", "id": 2})
+        listing = ws.receive_json()
+        assert [s["session_id"] for s in listing["sessions"]] == [sid]
+
+        ws.send_json({"type": "send", "id": 3, "session_id": sid, "content": "How are margins?"})
+        frames = _frames_until(ws, "done")
+        started = next(f for f in frames if f["type"] == "started")
+        chunks = [f for f in frames if f["type"] == "chunk"]
+        assert started["id"] == 3
+        assert "".join(c["data"] for c in chunks) == "Margins are up."
+        assert [c["offset"] for c in chunks] == [0, 8]
+        assert frames[-1]["length"] == 15 and frames[-1]["error"] is None
+
+        ws.send_json({"type": "resume", "id": 4, "session_id": sid, "offset": 8})
+        resumed = _frames_until(ws, "done")
+        assert [f["data"] for f in resumed if f["type"] == "chunk"] == ["are up."]
+
+        ws.send_json({"type": "messages", "id": 5, "session_id": sid})
+        history = _frames_until(ws, "messages")[-1]
+        assert [m["content"] for m in history["messages"]] == ["How are margins?"]
+
+        # A rename over REST is pushed to the open socket
+        client.patch(f"/api/v1/chat/sessions/{sid}", json={"title": "Margins"},
+                     headers={"Authorization": f"Bearer {token}"})
+        renamed = _frames_until(ws, "session")
+        while renamed[-1]["event"] != "renamed":
+            renamed = _frames_until(ws, "session")
+        assert renamed[-1]["title"] == "Margins"
+
+        ws.send_json({"type": "messages", "id": 6, "session_id": "not-a-uuid"})
+        assert ws.receive_json() == {"type": "error", "id": 6, "status": 400, "detail": "Invalid session ID"}
+        ws.send_text("not json")
+        assert ws.receive_json()["status"] == 400
+        ws.send_json({"type": "sessions", "id": 7, "limit": 0})
+        assert ws.receive_json() == {"type": "error", "id": 7, "status": 400, "detail": "limit must be at least 1"}
+
+
+def test_socket_rejects_an_invalid_token(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/v1/chat/ws?token=expired-or-forged") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
+
+
+def test_failed_turn_answers_with_an_error_frame(client, db_session, monkeypatch):
+    """An unexpected failure in a spawned turn reaches the client instead of leaving it waiting."""
+    from app.api.v1.endpoints import chat
+
+    session = ChatSession(title="Broken chat", user_id="grace")
+    db_session.add(session)
+    db_session.commit()
+
+    def broken_prepare(*args):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(chat, "_prepare_turn", broken_prepare)
+    token = create_access_token("grace")
+    with client.websocket_connect(f"/api/v1/chat/ws?token={token}") as ws:
+        ws.send_json({"type": "send", "id": 8, "session_id": str(session.session_id), "content": "Hello?"})
+        assert _frames_until(ws, "error")[-1] == {
+            "type": "error", "id": 8, "status": 500, "detail": "Internal server error",
+        }
+        # The socket stays usable
+        ws.send_json({"type": "ping", "id": 9})
+        assert _frames_until(ws, "pong")[-1] == {"type": "pong", "id": 9}
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.meridian import ChatSession, ChatMessage
+from app.services import conversation_memory
+from app.services.conversation_memory import ConversationMemory, SummaryRefresher
+
+
+@pytest.fixture
+def long_session(db_session):
+    """A 30-message conversation (15 turns)."""
+    s = ChatSession(title="Long Chat", user_id="demo_user")
+    db_session.add(s)
+    db_session.flush()
+    start = datetime.utcnow() - timedelta(hours=1)
+    for i in range(30):
+        db_session.add(ChatMessage(
+            session_id=s.session_id,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"message {i}",
+            created_at=start + timedelta(seconds=i),
+        ))
+    db_session.commit()
+    return s
+
+
+def test_history_is_bounded_and_alternating(db_session, long_session):
+    long_session.summary = "Earlier we covered Product B margins."
+    db_session.commit()
+
+    history = ConversationMemory(db_session).history_for(long_session)
+    window = settings.CHAT_MEMORY_TURNS * 2
+
+    assert history[0]["role"] == "system"
+    assert "Product B margins" in history[0]["content"]
+    turns = history[1:]
+    assert len(turns) <= window
+    assert turns[0]["role"] == "user"
+    assert turns[-1]["content"] == "message 29"
+    assert all(a["role"] != b["role"] for a, b in zip(turns, turns[1:]))
+
+
+def test_refresh_caches_summary_of_aged_out_turns(db_session, long_session, monkeypatch):
+    prompts = []
+
+    class FakeLLM:
+        def stream_chat(self, messages, model_name=None):
+            prompts.append(messages[-1]["content"])
+            yield "Discussed messages 0-21."
+
+    monkeypatch.setattr(conversation_memory, "get_llm_service", lambda: FakeLLM())
+    refresher = SummaryRefresher(sessionmaker(bind=db_session.get_bind()))
+
+    memory = ConversationMemory(db_session)
+    assert memory.needs_refresh(long_session, 30)
+
+    summary = refresher.refresh(long_session.session_id)
+    assert summary == "Discussed messages 0-21."
+    assert "message 0" in prompts[0]
+    assert "message 29" not in prompts[0]
+
+    db_session.expire_all()
+    refreshed = db_session.query(ChatSession).get(long_session.session_id)
+    assert refreshed.summary == summary
+    assert refreshed.summary_message_count == 30 - settings.CHAT_MEMORY_TURNS * 2
+    assert not memory.needs_refresh(refreshed, 30)
+
+
+def test_refresh_is_deferred_while_llm_capacity_is_taken(db_session, long_session, monkeypatch):
+    """Summaries only use spare admission slots; interactive requests come first."""
+    def no_llm():
+        raise AssertionError("summary must wait for spare capacity")
+
+    monkeypatch.setattr(conversation_memory, "get_llm_service", no_llm)
+    monkeypatch.setattr(conversation_memory.llm_admission, "try_acquire", lambda user: None)
+    refresher = SummaryRefresher(sessionmaker(bind=db_session.get_bind()))
+
+    assert refresher.refresh(long_session.session_id) is None
+    db_session.expire_all()
+    assert db_session.get(ChatSession, long_session.session_id).summary_message_count in (None, 0)
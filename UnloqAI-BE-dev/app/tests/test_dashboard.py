@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.models.meridian import (
+    ExternalSignal, ImpactLedgerStrategy, InternalSignal, StrategyKPI,
+    StrategyObjective, StrategyRecommendation,
+)
+from app.services.oakfield.dashboard import DashboardService
+
+
+def _count_statements(db_session, fn):
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, stmt, params, context, many: statements.append(stmt)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, len(statements)
+
+
+def _seed(db_session, extra_kpis, start):
+    for i in range(extra_kpis):
+        kpi = StrategyKPI(name=f"Regional KPI {start + i}", target_value=100, current_value=50, unit="score")
+        db_session.add(kpi)
+        db_session.flush()
+        for week in range(15):
+            db_session.add(InternalSignal(kpi_id=kpi.kpi_id, value=week, timestamp=datetime(2026, 1, 1) + timedelta(weeks=week)))
+        rec = StrategyRecommendation(title=f"Action {start + i}", status="approved")
+        db_session.add(rec)
+        db_session.flush()
+        db_session.add(ImpactLedgerStrategy(recommendation_id=rec.recommendation_id, expected_roi="£1.5m", actual_roi="£200k"))
+    db_session.commit()
+
+
+def test_cockpit_query_count_is_constant(db_session):
+    for status in ("off_track", "at_risk", "at_risk", "on_track"):
+        db_session.add(StrategyObjective(text=status, status=status))
+    sales = StrategyKPI(name="Product B Monthly Sales", target_value=2.0, current_value=1.4, unit="GBP_m")
+    db_session.add(sales)
+    db_session.flush()
+    for week in range(20):
+        db_session.add(InternalSignal(kpi_id=sales.kpi_id, value=float(week), timestamp=datetime(2026, 1, 1) + timedelta(weeks=week)))
+    db_session.add(ExternalSignal(type="competitor_launch", description="Older news", timestamp=datetime(2026, 1, 1)))
+    db_session.add(ExternalSignal(type="competitor_launch", description="Competitor X launch", timestamp=datetime(2026, 3, 1)))
+    db_session.commit()
+
+    _seed(db_session, 2, start=0)
+    small, small_queries = _count_statements(db_session, DashboardService(db_session).get_cockpit_data)
+    _seed(db_session, 20, start=2)
+    large, large_queries = _count_statements(db_session, DashboardService(db_session).get_cockpit_data)
+
+    assert small_queries == large_queries <= 6
+    objectives = large["headline_cards"][0]
+    assert objectives["primary_value"]["text"] == "1 Off-track"
+    assert objectives["secondary_text"] == "2 At risk • 1 On track"
+
+    sales_card = next(c for c in large["headline_cards"] if c["title"] == "Product B Monthly Sales")
+    assert sales_card["sparkline"]["points"] == [float(w) for w in range(8, 20)]
+    assert sales_card["primary_value"]["text"] == "£1.4m"
+
+    assert len(large["top_issues"]) == 23
+    assert {i["driver_text"] for i in large["top_issues"]} == {"Competitor X launch"}
+    assert len(large["ledger_summary"]["rows"]) == 22
+    assert large["ledger_summary"]["rows"][0]["title"].startswith("Action")
+
+
+def test_cockpit_snapshot_reflects_writes_and_refreshes_when_aged(client, db_session, monkeypatch):
+    import time
+    from sqlalchemy.orm import sessionmaker
+    from app.services.oakfield.dashboard import cockpit_cache
+
+    monkeypatch.setattr(cockpit_cache, "session_factory", sessionmaker(bind=db_session.get_bind()))
+    cockpit_cache.invalidate()
+
+    first = client.get("/api/v1/meridian/dashboard")
+    etag = first.headers["ETag"]
+    assert first.json()["headline_cards"][0]["title"] == "Objectives"
+
+    # Repeat reads are served from the snapshot without touching the database
+    _, queries = _count_statements(db_session, lambda: cockpit_cache.get(db_session))
+    assert queries == 0
+    assert client.get("/api/v1/meridian/dashboard", headers={"If-None-Match": etag}).status_code == 304
+
+    # A committed write in this process is visible on the very next read
+    db_session.add(StrategyObjective(text="new", status="off_track"))
+    db_session.commit()
+    fresh = client.get("/api/v1/meridian/dashboard")
+    assert fresh.headers["ETag"] != etag
+    assert fresh.json()["headline_cards"][0]["primary_value"]["text"] == "2 Off-track"
+
+    # Merely old (other workers may have written): served stale while it refreshes
+    etag = fresh.headers["ETag"]
+    monkeypatch.setattr(cockpit_cache, "max_age", 0)
+    built_at = cockpit_cache.get(db_session).built_at
+    assert client.get("/api/v1/meridian/dashboard").headers["ETag"] == etag
+    deadline = time.time() + 3
+    while time.time() < deadline and cockpit_cache._snapshot.built_at == built_at:
+        time.sleep(0.02)
+    assert cockpit_cache._snapshot.built_at > built_at
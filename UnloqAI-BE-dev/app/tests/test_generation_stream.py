@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from app.models.meridian import ChatSession
+from app.services.chat_writer import chat_writer
+from app.services.generation_stream import Generation, OffsetExpired
+from app.services.oakfield.copilot import CopilotService
+from app.services.title_worker import title_worker
+
+
+def test_reader_resumes_mid_chunk_and_follows_live_chunks():
+    generation = Generation(session_id=None, capacity=16)
+    generation.append("Hello, ")
+    generation.append("world")
+
+    reader = generation.read(offset=3)
+    assert next(reader) == "lo, "
+    assert next(reader) == "world"
+
+    threading.Timer(0.05, lambda: (generation.append("!"), generation.finish())).start()
+    assert list(reader) == ["!"]
+    assert list(generation.read(offset=generation.length)) == []
+
+
+def test_evicted_offset_is_reported():
+    generation = Generation(session_id=None, capacity=2)
+    for chunk in ["aa", "bb", "cc"]:
+        generation.append(chunk)
+    generation.finish()
+
+    assert "".join(generation.read(offset=2)) == "bbcc"
+    with pytest.raises(OffsetExpired):
+        generation.read(offset=1)
+
+
+def test_cancelled_reader_stops_waiting():
+    """A reader whose consumer went away frees its thread while the generation runs on."""
+    generation = Generation(session_id=None, capacity=8)
+    generation.append("partial")
+    cancelled = threading.Event()
+    reader = generation.read(cancelled=cancelled, poll_seconds=0.01)
+    assert next(reader) == "partial"
+
+    result = []
+    worker = threading.Thread(target=lambda: result.extend(reader))
+    worker.start()
+    cancelled.set()
+    worker.join(timeout=2)
+    assert not worker.is_alive() and result == []
+    assert not generation.done
+
+
+def test_client_reattaches_after_disconnect(client, db_session, monkeypatch):
+    session = ChatSession(title="Resumable", user_id="demo_user")
+    db_session.add(session)
+    db_session.commit()
+
+    def fake_completion(self, user_query, history=None):
+        yield '{"type": "analysis_response", '
+        yield '"title": "Margins"}'
+
+    monkeypatch.setattr(CopilotService, "chat_completion", fake_completion)
+    monkeypatch.setattr(title_worker, "submit", lambda *a: None)
+    monkeypatch.setattr(chat_writer, "enqueue", lambda *a, **k: None)
+
+    url = f"/api/v1/chat/sessions/{session.session_id}"
+    res = client.post(f"{url}/message", json={"content": "How are margins?"})
+    full = res.text
+    assert full == '{"type": "analysis_response", "title": "Margins"}'
+
+    resumed = client.get(f"{url}/stream", params={"offset": 10})
+    assert resumed.status_code == 200
+    assert resumed.text == full[10:]
+    assert resumed.headers["X-Generation-Id"] == res.headers["X-Generation-Id"]
+    assert resumed.headers["X-Generation-Status"] == "done"
+
+    other = ChatSession(title="Idle", user_id="demo_user")
+    db_session.add(other)
+    db_session.commit()
+    assert client.get(f"/api/v1/chat/sessions/{other.session_id}/stream").status_code == 404
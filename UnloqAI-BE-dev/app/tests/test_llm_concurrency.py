@@ -0,0 +1,162 @@
+import threading
+import time
+
+from sqlalchemy import Column, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import data_version
+from app.services.singleflight import StreamSingleflight
+
+# Isolated mapping so this test doesn't depend on the app's model graph
+_VersionBase = declarative_base()
+
+
+class _VersionedRow(_VersionBase):
+    __tablename__ = "oakfield_version_probe"
+    code = Column(String, primary_key=True)
+
+
+def _slow_stream(calls):
+    calls.append(1)
+    for part in ["{", '"type": ', '"analysis_response"', "}"]:
+        time.sleep(0.02)
+        yield part
+
+
+def test_singleflight_coalesces_concurrent_streams():
+    """Ten identical concurrent questions should cost exactly one generation."""
+    flights = StreamSingleflight("test")
+    calls, results = [], []
+    barrier = threading.Barrier(10)
+
+    def worker(query):
+        barrier.wait()
+        key = flights.make_key(query, "v1")
+        results.append("".join(flights.stream(key, lambda: _slow_stream(calls))))
+
+    queries = ["Margin summary?"] * 5 + ["  margin   SUMMARY? "] * 5
+    threads = [threading.Thread(target=worker, args=(q,)) for q in queries]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert len(calls) == 1
+    assert results == ['{"type": "analysis_response"}'] * 10
+    assert flights.in_flight() == 0
+
+
+def test_singleflight_separates_data_versions():
+    flights = StreamSingleflight("test")
+    assert flights.make_key("q", "v1") != flights.make_key("q", "v2")
+
+
+def test_data_version_bumps_on_commit_only():
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    _VersionBase.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    before = data_version.token("oakfield_")
+    db.add(_VersionedRow(code="OAK-ROLLBACK"))
+    db.flush()
+    db.rollback()
+    assert data_version.token("oakfield_") == before
+
+    db.add(_VersionedRow(code="OAK-COMMIT"))
+    db.commit()
+    assert data_version.token("oakfield_") != before
+    db.close()
+
+
+def test_admission_round_robin_and_queue_limit():
+    """Waiting users are served in turn, and a full queue is rejected with a retry hint."""
+    import asyncio
+    from app.services.admission import AdmissionController, AdmissionRejected
+
+    async def scenario():
+        limiter = AdmissionController("test", max_concurrent=1, max_per_user=1,
+                                      max_queue=3, queue_timeout=2)
+        order = []
+        first = await limiter.acquire("alice")
+
+        async def queued(user):
+            ticket = await limiter.acquire(user)
+            order.append(user)
+            await asyncio.sleep(0)
+            ticket.release()
+
+        tasks = [asyncio.create_task(queued(u)) for u in ["alice", "alice", "bob"]]
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queued"] == 3
+
+        try:
+            await limiter.acquire("carol")
+            assert False, "queue should be full"
+        except AdmissionRejected as e:
+            assert e.reason == "queue_full"
+            assert e.retry_after >= 1
+
+        first.release()
+        await asyncio.gather(*tasks)
+        assert order == ["alice", "bob", "alice"]
+        assert limiter.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_try_acquire_only_takes_spare_capacity():
+    from app.services.admission import AdmissionController
+
+    limiter = AdmissionController("test", max_concurrent=1, max_per_user=1, max_queue=3, queue_timeout=2)
+    ticket = limiter.try_acquire("system:summary")
+    assert ticket is not None
+    assert limiter.try_acquire("system:summary") is None
+    ticket.release()
+    assert limiter.stats()["active"] == 0
+
+
+def test_llm_endpoint_returns_429_with_retry_after(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.admission import llm_admission
+
+    monkeypatch.setattr(llm_admission, "max_concurrent", 0)
+    monkeypatch.setattr(llm_admission, "max_queue", 0)
+    with TestClient(app) as c:
+        res = c.post("/api/v1/oakfield/strategist/chat", json={"content": "Margin summary"})
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+
+
+def test_follower_falls_back_when_leader_stalls():
+    """A hung or abandoned leader must not hang its followers."""
+    import pytest
+
+    flights = StreamSingleflight("test", stall_timeout=0.1)
+    calls = []
+    release = threading.Event()
+
+    def hung_stream():
+        release.wait(5)
+        yield "{}"
+
+    # Leader stuck before its first chunk: the follower generates on its own
+    key = flights.make_key("hung", "v1")
+    leader = threading.Thread(target=lambda: "".join(flights.stream(key, hung_stream)))
+    leader.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert "".join(flights.stream(key, lambda: _slow_stream(calls))) == '{"type": "analysis_response"}'
+    assert time.monotonic() - started < 2 and len(calls) == 1
+    release.set()
+    leader.join(timeout=5)
+
+    # Leader abandoned (never closed) mid-stream: a follower that already
+    # replayed part of it fails fast instead of waiting forever
+    key = flights.make_key("abandoned", "v1")
+    abandoned = flights.stream(key, lambda: _slow_stream(calls))
+    assert next(abandoned) == "{"
+    with pytest.raises(TimeoutError):
+        "".join(flights.stream(key, lambda: _slow_stream(calls)))
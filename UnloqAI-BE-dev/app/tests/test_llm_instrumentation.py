@@ -0,0 +1,152 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.metrics import metrics, Histogram
+from app.services.llm_service import LLMService
+
+
+@pytest.fixture
+def ollama_service(monkeypatch):
+    """LLMService pinned to a fake Ollama stream that reports exact token usage."""
+    service = LLMService(provider="ollama")
+
+    def fake_stream(messages, model_name=None, usage=None):
+        usage["prompt_tokens"] = 42
+        yield '{"type": '
+        yield '"analysis_response"}'
+        usage["output_tokens"] = 7
+
+    monkeypatch.setattr(service, "_stream_ollama", fake_stream)
+    metrics.reset()
+    return service
+
+
+def test_histogram_quantiles():
+    hist = Histogram([10, 100, 1000])
+    for v in [5, 50, 50, 500]:
+        hist.observe(v)
+    snap = hist.snapshot()
+    assert snap["count"] == 4
+    assert snap["min"] == 5 and snap["max"] == 500
+    assert snap["p50"] == 100
+    assert snap["buckets"]["+Inf"] == 0
+
+
+def test_stream_chat_records_call_metrics(ollama_service):
+    """Each call reports provider, model, tokens, TTFT and duration."""
+    captured = []
+    chunks = list(ollama_service.stream_chat(
+        [{"role": "user", "content": "hello"}],
+        model_name="qwen:0.5b",
+        on_metrics=captured.append,
+    ))
+    assert "".join(chunks) == '{"type": "analysis_response"}'
+
+    call = captured[0]
+    assert call.provider == "ollama"
+    assert call.model == "qwen:0.5b"
+    assert call.prompt_tokens == 42
+    assert call.output_tokens == 7
+    assert call.ttft_ms is not None and call.ttft_ms <= call.duration_ms
+    assert call.fallback_hops == 0
+    assert call.status == "ok"
+
+    snap = metrics.snapshot()
+    assert snap["counters"]["llm_calls_total"][0]["value"] == 1
+    assert snap["histograms"]["llm_output_tokens"][0]["sum"] == 7
+
+
+def test_bedrock_failure_counts_fallback_hop(monkeypatch):
+    service = LLMService(provider="bedrock")
+
+    def broken(messages, model_name=None, usage=None):
+        raise ValueError("AWS Configuration Missing")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(service, "_stream_bedrock", broken)
+    captured = []
+    list(service.stream_chat([{"role": "user", "content": "hi"}], on_metrics=captured.append))
+    assert captured[0].fallback_hops == 1
+    assert captured[0].status == "error"
+
+
+def test_metrics_endpoint(ollama_service):
+    list(ollama_service.stream_chat([{"role": "user", "content": "hello"}]))
+    with TestClient(app) as c:
+        res = c.get("/api/v1/metrics")
+    assert res.status_code == 200
+    assert "llm_duration_ms" in res.json()["histograms"]
+
+
+def test_replay_provider_is_deterministic_and_paced(monkeypatch):
+    """The replay provider streams a templated response at the configured latency."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "LLM_REPLAY_TTFT_MS", 30)
+    monkeypatch.setattr(settings, "LLM_REPLAY_TOKENS_PER_SEC", 1000)
+
+    service = LLMService(provider="replay")
+    messages = [{"role": "user", "content": 'USER QUERY:\n"Why is Product B down?"'}]
+    captured = []
+    first = "".join(service.stream_chat(messages, on_metrics=captured.append))
+    second = "".join(service.stream_chat(messages))
+
+    assert first == second
+    assert json.loads(first)["type"] == "analysis_response"
+    assert "Why is Product B down?" in first
+    assert captured[0].provider == "replay"
+    assert captured[0].ttft_ms >= 30
+    assert captured[0].output_tokens > 1
+
+
+def test_replay_recordings_and_error_injection(tmp_path, monkeypatch):
+    from app.core.config import settings
+    recordings = tmp_path / "replay.jsonl"
+    recordings.write_text(
+        json.dumps({"match": "margin", "response": "recorded margin answer"}) + "\n"
+    )
+    monkeypatch.setattr(settings, "LLM_REPLAY_FILE", str(recordings))
+    service = LLMService(provider="replay")
+    out = "".join(service.stream_chat([{"role": "user", "content": "Show MARGIN by site"}]))
+    assert out == "recorded margin answer"
+
+    monkeypatch.setattr(settings, "LLM_REPLAY_ERROR_RATE", 1.0)
+    with pytest.raises(RuntimeError):
+        list(service.stream_chat([{"role": "user", "content": "Show margin by site"}]))
+
+
+def test_replay_error_injection_is_seeded_per_prompt(monkeypatch):
+    """Whether a prompt fails depends only on the prompt, not on request order."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "LLM_REPLAY_ERROR_RATE", 0.5)
+    prompts = [f"question {i}" for i in range(20)]
+
+    def outcomes(order):
+        service = LLMService(provider="replay")
+        failed = {}
+        for prompt in order:
+            try:
+                list(service.stream_chat([{"role": "user", "content": prompt}]))
+                failed[prompt] = False
+            except RuntimeError:
+                failed[prompt] = True
+        return failed
+
+    forward = outcomes(prompts)
+    assert forward == outcomes(list(reversed(prompts)))
+    assert 0 < sum(forward.values()) < len(prompts)
+
+
+def test_replay_injected_error_is_recorded_as_error(monkeypatch):
+    """A stream that raises mid-way must not be recorded as a successful call."""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "LLM_REPLAY_ERROR_RATE", 1.0)
+    service = LLMService(provider="replay")
+    captured = []
+    with pytest.raises(RuntimeError):
+        list(service.stream_chat([{"role": "user", "content": "Show margin by site"}], on_metrics=captured.append))
+
+    assert captured[0].provider == "replay"
+    assert captured[0].status == "error"
+    assert captured[0].error
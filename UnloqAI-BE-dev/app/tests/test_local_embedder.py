@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.core.config import settings
+from app.services.local_embedder import HashingEmbedder
+from app.services.vector_service import VectorService
+
+
+def test_hashing_embedder_is_deterministic_normalised_and_lexical():
+    embedder = HashingEmbedder(256)
+    vectors = embedder.embed_batch([
+        "Competitor X cuts Nova price by 30%",
+        "Competitor X cuts the Nova price 30 percent",
+        "New packaging regulation for food producers",
+        "",
+    ])
+    assert vectors.shape == (4, 256) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert np.array_equal(vectors[0], HashingEmbedder(256).embed_batch(["Competitor X cuts Nova price by 30%"])[0])
+
+
+def test_batches_match_single_embeddings():
+    embedder = HashingEmbedder(1536)
+    texts = [f"Rival {i} launches product line at lower price" for i in range(50)]
+    batch = embedder.embed_batch(texts)
+    assert batch.shape == (50, 1536)
+    assert np.allclose(np.linalg.norm(batch, axis=1), 1.0)
+    assert np.allclose(batch[7], embedder.embed(texts[7]))
+
+
+def test_empty_text_has_no_embedding(db_session, monkeypatch):
+    """A zero vector would be cached and indexed with an undefined cosine."""
+    assert HashingEmbedder(64).embed("  ...  ") == []
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    service = VectorService(db_session)
+    assert service.generate_embedding("") == []
+    assert service.embed_many(["", "steel tariff"])[0] == []
+
+
+def test_vector_service_uses_local_provider_offline(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    service = VectorService(db_session)
+    assert service.embedding_model() == "local:hashing-v1:1536"
+    single = service.generate_embedding("tariff on steel imports")
+    batch = service.embed_many(["tariff on steel imports", "steel import tariff"])
+    assert len(single) == settings.EMBEDDING_DIM
+    assert np.allclose(single, batch[0])
@@ -0,0 +1,89 @@
+from app.models.meridian import ExternalSignal, SignalLSHBand
+from app.services import signal_ingest
+from app.services.signal_ingest import (
+    SignalIngestService, backfill_fingerprints, simhash, hamming, band_keys, to_signed, to_unsigned,
+)
+from app.services.vector_service import VectorService
+
+
+def test_simhash_is_close_for_reworded_news():
+    a = simhash("Competitor X launched the Nova platform at a 30% lower price point in the mid-market segment")
+    b = simhash("Competitor X launched the Nova platform at a 30% lower price point in the mid market segment.")
+    c = simhash("New EU packaging regulation takes effect next quarter for all food producers")
+    assert hamming(a, b) < hamming(a, c)
+    assert to_unsigned(to_signed(a)) == a
+    assert len(band_keys(a)) == 4
+
+
+def test_duplicates_merge_into_canonical_signal(db_session, monkeypatch):
+    embed_calls = []
+    monkeypatch.setattr(VectorService, "generate_embedding", lambda self, t: embed_calls.append(t) or [])
+    service = SignalIngestService(db_session)
+    text = "Competitor X launched the Nova platform at a 30% lower price point."
+
+    first, dup1 = service.ingest("competitor_launch", text, severity="high")
+    second, dup2 = service.ingest("competitor_launch", text)
+    other, dup3 = service.ingest("regulation", text)  # same words, different type: kept apart
+
+    assert (dup1, dup2, dup3) == (False, True, False)
+    assert second.signal_id == first.signal_id
+    assert second.occurrence_count == 2
+    assert other.signal_id != first.signal_id
+    assert db_session.query(SignalLSHBand).filter(SignalLSHBand.signal_id == first.signal_id).count() == 4
+    assert embed_calls == []  # exact repeats never reach the embedding provider
+
+
+def test_borderline_match_is_confirmed_by_embedding(db_session, monkeypatch):
+    service = SignalIngestService(db_session)
+    original = "Rival Y cuts subscription prices across Europe by fifteen percent starting Monday"
+    canonical, _ = service.ingest("competitor_pricing", original)
+    canonical.embedding = [1.0] + [0.0] * 1535
+    db_session.commit()
+
+    reworded = "Rival Y cuts subscription prices across Europe by fifteen percent starting Monday morning"
+    assert set(band_keys(simhash(original))) & set(band_keys(simhash(reworded)))
+    distance = hamming(simhash(original), simhash(reworded))
+    monkeypatch.setattr(signal_ingest.settings, "SIGNAL_DEDUP_MAX_HAMMING", distance - 1)
+    monkeypatch.setattr(signal_ingest.settings, "SIGNAL_DEDUP_GREY_HAMMING", 64)
+    monkeypatch.setattr(VectorService, "generate_embedding", lambda self, t: [0.99, 0.05] + [0.0] * 1534)
+
+    merged, duplicate = service.ingest("competitor_pricing", reworded)
+    assert duplicate and merged.signal_id == canonical.signal_id
+
+
+def test_backfill_fingerprints_existing_signals(db_session, monkeypatch):
+    monkeypatch.setattr(VectorService, "generate_embedding", lambda self, t: [])
+    text = "Supplier Z halts shipments of resin to UK plants after a warehouse fire"
+    legacy = ExternalSignal(type="supplier_outage", description=text)
+    db_session.add(legacy)
+    db_session.commit()
+
+    assert backfill_fingerprints(db_session, batch_size=1) >= 1
+    db_session.refresh(legacy)
+    assert to_unsigned(legacy.fingerprint) == simhash(text)
+    merged, duplicate = SignalIngestService(db_session).ingest("supplier_outage", text)
+    assert duplicate and merged.signal_id == legacy.signal_id
+
+
+def test_featureless_descriptions_are_never_duplicates(db_session, monkeypatch):
+    monkeypatch.setattr(VectorService, "generate_embedding", lambda self, t: [])
+    assert simhash("") is None and simhash("!!! ...") is None
+
+    service = SignalIngestService(db_session)
+    first, duplicate = service.ingest("feed_noise", "!!!")
+    assert not duplicate and first.fingerprint is None
+    second, duplicate = service.ingest("feed_noise", "...")
+    assert not duplicate and second.signal_id != first.signal_id
+    # The backfill passes over them instead of selecting them again forever
+    backfill_fingerprints(db_session, batch_size=1)
+    db_session.refresh(first)
+    assert first.fingerprint is None
+
+
+def test_simulation_trigger_creates_a_recommendation_each_time(client, db_session):
+    first = client.post("/api/v1/meridian/simulation/trigger", json={"event_type": "supply_shock"}).json()
+    second = client.post("/api/v1/meridian/simulation/trigger", json={"event_type": "supply_shock"}).json()
+    assert first["status"] == second["status"] == "triggered"
+    assert second["signal_id"] != first["signal_id"]
+    assert second["recommendation_id"] != first["recommendation_id"]
+    assert db_session.query(ExternalSignal).filter(ExternalSignal.type == "supply_shock").count() == 2
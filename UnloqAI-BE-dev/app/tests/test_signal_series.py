@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from app.models.meridian import (
+    InternalSignal, InternalSignalDaily, InternalSignalHourly, InternalSignalWeekly, StrategyKPI,
+)
+from app.services.signal_series import choose_rollup, rebuild_rollups
+
+
+def _rollup_rows(db_session, rollup, kpi_id):
+    return [
+        (r.bucket_start, r.value_count, r.value_sum, r.value_min, r.value_max, r.value_last, r.last_at)
+        for r in db_session.query(rollup).filter(rollup.kpi_id == kpi_id).order_by(rollup.bucket_start)
+    ]
+
+
+def _kpi_with_points(db_session, name):
+    """A KPI with a point every 20 minutes for 6 hours, inserted out of order. Returns (kpi, stamps)."""
+    kpi = StrategyKPI(name=name, target_value=10, current_value=8, unit="score")
+    db_session.add(kpi)
+    db_session.flush()
+    start = datetime(2026, 3, 1, 22, 0)  # a Sunday, so the points span two ISO weeks
+    stamps = [start + timedelta(minutes=20 * i) for i in range(18)]
+    for ts in reversed(stamps):
+        db_session.add(InternalSignal(kpi_id=kpi.kpi_id, timestamp=ts, value=float(ts.hour)))
+    db_session.commit()
+    return kpi, stamps
+
+
+def test_rollups_are_maintained_on_insert(db_session):
+    kpi, stamps = _kpi_with_points(db_session, "Throughput")
+
+    hourly = _rollup_rows(db_session, InternalSignalHourly, kpi.kpi_id)
+    assert len(hourly) == 6
+    assert hourly[0][:2] == (datetime(2026, 3, 1, 22, 0), 3)
+    daily = _rollup_rows(db_session, InternalSignalDaily, kpi.kpi_id)
+    assert [(d[0], d[1], d[3], d[4]) for d in daily] == [
+        (datetime(2026, 3, 1), 6, 22.0, 23.0),
+        (datetime(2026, 3, 2), 12, 0.0, 3.0),
+    ]
+    weekly = _rollup_rows(db_session, InternalSignalWeekly, kpi.kpi_id)
+    assert [w[0] for w in weekly] == [datetime(2026, 2, 23), datetime(2026, 3, 2)]
+    assert daily[-1][5] == 3.0 and daily[-1][6] == stamps[-1]  # last = latest point, not latest insert
+
+    # A rebuild from the raw table agrees with the incremental rollups
+    before = {r: _rollup_rows(db_session, r, kpi.kpi_id) for r in (InternalSignalHourly, InternalSignalDaily, InternalSignalWeekly)}
+    assert rebuild_rollups(db_session, kpi.kpi_id) == 18
+    db_session.expire_all()
+    assert {r: _rollup_rows(db_session, r, kpi.kpi_id) for r in before} == before
+
+
+def test_series_picks_coarsest_sufficient_resolution(client, db_session):
+    year = timedelta(days=365)
+    assert choose_rollup(datetime(2026, 1, 1), datetime(2026, 1, 1) + year, 50) is InternalSignalWeekly
+    assert choose_rollup(datetime(2026, 1, 1), datetime(2026, 1, 1) + year, 60) is InternalSignalDaily
+    assert choose_rollup(datetime(2026, 1, 1), datetime(2026, 1, 3), 30) is InternalSignalHourly
+    assert choose_rollup(datetime(2026, 1, 1), datetime(2026, 1, 1, 6), 30) is None
+    # Too long for raw rows even when the finest rollup has fewer buckets than asked for
+    assert choose_rollup(datetime(2026, 1, 1), datetime(2026, 3, 22), 2000) is InternalSignalHourly
+
+    kpi, _ = _kpi_with_points(db_session, "Yield")
+    url = f"/api/v1/meridian/kpis/{kpi.kpi_id}/series"
+    hourly = client.get(url, params={"start": "2026-03-01T22:00:00", "end": "2026-03-02T04:00:00", "points": 6}).json()
+    assert hourly["resolution"] == "hour"
+    assert [p["count"] for p in hourly["points"]] == [3] * 6
+    assert hourly["points"][0]["avg"] == 22.0
+
+    raw = client.get(url, params={"start": "2026-03-01T22:00:00", "end": "2026-03-02T04:00:00", "points": 10}).json()
+    assert raw["resolution"] == "raw" and len(raw["points"]) == 18
+
+    # Offsets are converted to naive UTC (how timestamps are stored)
+    aware = client.get(url, params={"start": "2026-03-01T23:00:00+01:00", "end": "2026-03-02T04:00:00Z", "points": 10})
+    assert aware.status_code == 200 and len(aware.json()["points"]) == 18
+    assert client.get(url, params={"start": "2026-09-01T00:00:00Z"}).status_code == 200  # end defaults to utcnow()
+
+    assert client.get(url, params={"start": "2026-03-02T00:00:00", "end": "2026-03-01T00:00:00"}).status_code == 400
+    assert client.get("/api/v1/meridian/kpis/not-a-uuid/series").status_code == 400
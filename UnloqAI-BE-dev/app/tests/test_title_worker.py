@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.meridian import ChatSession
+from app.services import title_worker as title_module
+from app.services.admission import llm_admission
+from app.services.title_worker import TitleWorker, heuristic_title
+
+
+@pytest.fixture
+def worker(db_session):
+    return TitleWorker(sessionmaker(bind=db_session.get_bind()), window_ms=10, max_batch=8)
+
+
+@pytest.fixture
+def new_sessions(db_session):
+    sessions = [ChatSession(title="New Chat", user_id="demo_user") for _ in range(3)]
+    db_session.add_all(sessions)
+    db_session.commit()
+    return sessions
+
+
+def test_heuristic_title_extracts_key_words():
+    assert heuristic_title("Why is Product B sales down?") == "Product B Sales Down"
+    assert heuristic_title("hello") == "New Chat"
+
+
+def test_batch_titled_with_one_llm_call(worker, new_sessions, db_session, monkeypatch):
+    calls = []
+
+    class FakeLLM:
+        def stream_chat(self, messages, model_name=None):
+            calls.append(messages)
+            yield '{"1": "Margin Review", "2": "Bundle Uptake", "3": "Regional Sales"}'
+
+    monkeypatch.setattr(title_module, "get_llm_service", lambda: FakeLLM())
+    batch = [{"session_id": s.session_id, "text": f"question {i}"} for i, s in enumerate(new_sessions)]
+    worker.title_batch(batch)
+
+    assert len(calls) == 1
+    db_session.expire_all()
+    assert [s.title for s in new_sessions] == ["Margin Review", "Bundle Uptake", "Regional Sales"]
+
+
+def test_saturated_capacity_uses_heuristic_and_keeps_renames(worker, new_sessions, db_session, monkeypatch):
+    def no_llm():
+        raise AssertionError("LLM must not be called while saturated")
+
+    monkeypatch.setattr(title_module, "get_llm_service", no_llm)
+    monkeypatch.setattr(llm_admission, "saturated", lambda: True)
+
+    new_sessions[0].title = "Renamed By User"
+    db_session.commit()
+
+    worker.title_batch([
+        {"session_id": new_sessions[0].session_id, "text": "Show bundle uptake by region"},
+        {"session_id": new_sessions[1].session_id, "text": "Show bundle uptake by region"},
+    ])
+    db_session.expire_all()
+    assert new_sessions[0].title == "Renamed By User"
+    assert new_sessions[1].title == "Bundle Uptake By Region"
+
+
+def test_without_background_workers_titles_inline_without_llm(worker, new_sessions, db_session, monkeypatch):
+    def no_llm():
+        raise AssertionError("LLM must not be called on the request path")
+
+    monkeypatch.setattr(title_module, "get_llm_service", no_llm)
+    monkeypatch.setattr(title_module.settings, "BACKGROUND_WORKERS", False)
+    worker.submit(new_sessions[2].session_id, "Why is Product B sales down?")
+
+    assert worker._thread is None
+    db_session.expire_all()
+    assert new_sessions[2].title == "Product B Sales Down"
@@ -0,0 +1,172 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.models.meridian import ExternalSignal
+from app.services import vector_service
+from app.services.vector_index import NumpyVectorIndex
+from app.services.vector_service import VectorService, query_embedding_cache
+
+
+def test_topk_matches_brute_force_and_persists(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    ids = [str(uuid.uuid4()) for _ in range(300)]
+    index = NumpyVectorIndex(str(tmp_path / "signals"), distance="l2")
+    index.add(zip(ids[:200], vectors[:200]))
+    index.add(zip(ids[200:], vectors[200:]))  # incremental append
+
+    q = rng.normal(size=16)
+    expected = np.argsort(np.linalg.norm(vectors - q, axis=1))[:5]
+    hits = index.search(q, 5)
+    assert [sid for sid, _ in hits] == [ids[i] for i in expected]
+    assert hits[0][1] <= hits[-1][1]
+
+    index.remove([ids[expected[0]]])
+    assert ids[expected[0]] not in [sid for sid, _ in index.search(q, 5)]
+
+    expected_hits = index.search(q, 4)
+    index.close()
+    reopened = NumpyVectorIndex(str(tmp_path / "signals"), distance="l2")
+    assert reopened.load() and len(reopened) == 299
+    assert reopened.search(q, 4) == expected_hits
+
+
+def test_second_instance_keeps_a_private_copy(tmp_path):
+    """Only the lock holder writes the files; another instance never clobbers them."""
+    path = str(tmp_path / "signals")
+    owner = NumpyVectorIndex(path, distance="l2")
+    owner.add([("a", [1.0, 0.0]), ("b", [0.0, 1.0])])
+
+    other = NumpyVectorIndex(path, distance="l2")
+    assert not other.load()
+    other.add([("c", [1.0, 1.0])])
+    assert [sid for sid, _ in other.search([1.0, 1.0], 1)] == ["c"]
+
+    owner.close()
+    reopened = NumpyVectorIndex(path, distance="l2")
+    assert reopened.load()
+    assert sorted(reopened._ids) == ["a", "b"]
+
+
+def test_sqlite_search_ranks_by_embedding(db_session, tmp_path, monkeypatch):
+    index = NumpyVectorIndex(str(tmp_path / "signals"), distance="cosine")
+    monkeypatch.setattr(vector_service, "signal_index", index)
+    monkeypatch.setattr("app.services.vector_index.signal_index", index)
+    query_embedding_cache.clear()
+
+    def axis(i):
+        vec = [0.0] * 1536
+        vec[i] = 1.0
+        return vec
+
+    monkeypatch.setattr(VectorService, "_embed", lambda self, t: axis(1) if "tariff" in t else axis(0))
+
+    tariff = ExternalSignal(type="regulation", description="EU tariff change", embedding=axis(1))
+    launch = ExternalSignal(type="competitor_launch", description="Rival launch", embedding=axis(0))
+    db_session.add_all([tariff, launch])
+    db_session.commit()
+
+    results = VectorService(db_session).search_signals("tariff exposure", limit=1)
+    assert [s.signal_id for s in results] == [tariff.signal_id]
+
+    # Committed inserts reach the loaded index without a rebuild
+    late = ExternalSignal(type="regulation", description="New tariff ruling", embedding=axis(1))
+    db_session.add(late)
+    db_session.commit()
+    assert str(late.signal_id) in index._rows
+
+
+def test_workers_see_each_others_committed_embeddings(db_session, tmp_path, monkeypatch):
+    """One instance owns the files, another keeps a private copy; both follow the other's writes."""
+    path = str(tmp_path / "shared")
+    writer, reader = NumpyVectorIndex(path), NumpyVectorIndex(path)
+    unit = lambda i: [1.0 if j == i else 0.0 for j in range(1536)]
+
+    # Commits in this test run in the writer's process
+    monkeypatch.setattr("app.services.vector_index.signal_index", writer)
+    first = ExternalSignal(type="regulation", description="Levy on QX-12", embedding=unit(20))
+    db_session.add(first)
+    db_session.commit()
+    writer.sync(db_session)
+    reader.sync(db_session)
+    assert writer._persistent and not reader._persistent
+    assert reader.search(unit(20), 1)[0][0] == str(first.signal_id)
+
+    second = ExternalSignal(type="regulation", description="Levy on QX-14", embedding=unit(21))
+    db_session.add(second)
+    db_session.delete(first)
+    db_session.commit()
+    assert str(second.signal_id) in writer._rows  # applied in its own process at commit
+
+    reader.sync(db_session)
+    assert reader.search(unit(21), 1)[0][0] == str(second.signal_id)
+    assert str(first.signal_id) not in reader._rows
+
+    # And the other way round: the writer's files pick up the reader's process's commits
+    monkeypatch.setattr("app.services.vector_index.signal_index", reader)
+    third = ExternalSignal(type="regulation", description="Levy on QX-16", embedding=unit(22))
+    db_session.add(third)
+    db_session.commit()
+    writer.sync(db_session)
+    assert writer.search(unit(22), 1)[0][0] == str(third.signal_id)
+    writer.close()
+
+
+def test_hybrid_search_fuses_keyword_and_vector_with_filters(db_session, tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    index = NumpyVectorIndex(str(tmp_path / "hybrid"), distance="cosine")
+    monkeypatch.setattr(vector_service, "signal_index", index)
+    monkeypatch.setattr("app.services.vector_index.signal_index", index)
+    query_embedding_cache.clear()
+    unit = lambda i: [1.0 if j == i else 0.0 for j in range(1536)]
+    monkeypatch.setattr(VectorService, "_embed", lambda self, t: unit(5))
+
+    now = datetime.utcnow()
+    code = ExternalSignal(type="competitor_launch", severity="high", timestamp=now,
+                          description="Rival ships ZX-900 at lower price", embedding=unit(9))
+    semantic = ExternalSignal(type="competitor_launch", severity="high", timestamp=now,
+                              description="Competitor undercuts our flagship", embedding=unit(5))
+    stale = ExternalSignal(type="competitor_launch", severity="high", timestamp=now - timedelta(days=90),
+                           description="ZX-900 rumoured", embedding=unit(5))
+    low = ExternalSignal(type="regulation", severity="low", timestamp=now,
+                         description="ZX-900 labelling rule", embedding=unit(5))
+    db_session.add_all([code, semantic, stale, low])
+    db_session.commit()
+
+    results = VectorService(db_session).hybrid_search(
+        "ZX-900 pricing", limit=5, types=["competitor_launch"], severities=["high"],
+        since=now - timedelta(days=7),
+    )
+    ids = [s.signal_id for s in results]
+    assert set(ids) == {code.signal_id, semantic.signal_id}
+
+
+def test_hybrid_statement_is_a_single_postgres_query(db_session):
+    from sqlalchemy.dialects import postgresql
+    from app.services.vector_service import signal_filters
+
+    stmt = VectorService(db_session).hybrid_statement(
+        "ZX-900", [0.1] * 3, signal_filters(types=["regulation"]), limit=5, candidates=50, rrf_k=60,
+    )
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "websearch_to_tsquery" in sql and "UNION ALL" in sql
+    assert "keyword_hits" in sql and "vector_hits" in sql
+    assert sql.count("external_signals.type IN") == 2
+
+
+def test_signal_search_endpoint(client, db_session):
+    db_session.add(ExternalSignal(type="regulation", severity="high", description="Packaging levy on QX-12"))
+    db_session.commit()
+    res = client.get("/api/v1/meridian/signals/search", params={"q": "QX-12 levy", "severity": "high"})
+    assert res.status_code == 200
+    assert res.json()[0]["description"] == "Packaging levy on QX-12"
+
+
+def test_signal_search_bounds_recall_knobs(client):
+    url = "/api/v1/meridian/signals/search"
+    assert client.get(url, params={"q": "levy", "ef_search": 80}).status_code == 200
+    assert client.get(url, params={"q": "levy", "ef_search": 0}).status_code == 422
+    assert client.get(url, params={"q": "levy", "ef_search": 100_000}).status_code == 422
@@ -0,0 +1,146 @@
+import pytest
+
+from app.models.meridian import EmbeddingCache
+from app.services import vector_service
+from app.services.vector_service import VectorService, query_embedding_cache
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    """Counts provider embedding calls; each returns a tiny deterministic vector."""
+    calls = []
+
+    def fake_embed(self, text_content):
+        calls.append(text_content)
+        return [float(len(text_content)), 1.0, 0.5]
+
+    monkeypatch.setattr(VectorService, "_embed", fake_embed)
+    query_embedding_cache.clear()
+    return calls
+
+
+def test_repeated_embeddings_hit_the_lru(db_session, provider_calls):
+    service = VectorService(db_session)
+    first = service.generate_embedding("competitor price cut")
+    second = service.generate_embedding("competitor price cut")
+    assert first == second == [20.0, 1.0, 0.5]
+    assert provider_calls == ["competitor price cut"]
+
+
+def test_persistent_cache_survives_process_restart(db_session, provider_calls):
+    service = VectorService(db_session)
+    service.generate_embedding("new tariff regulation")
+    assert db_session.query(EmbeddingCache).count() >= 1
+
+    query_embedding_cache.clear()  # as after a restart
+    assert VectorService(db_session).generate_embedding("new tariff regulation") == [21.0, 1.0, 0.5]
+    assert provider_calls == ["new tariff regulation"]
+
+
+def test_cache_writes_leave_the_callers_transaction_alone(db_session, provider_calls):
+    """Caching an embedding never commits (or rolls back) what the caller has pending."""
+    pending = EmbeddingCache(model="caller", content_hash="pending", embedding=[1.0])
+    db_session.add(pending)
+    service = VectorService(db_session)
+    service.generate_embedding("supplier recall")
+    service.embed_many(["port strike", "currency swing"])
+    assert pending in db_session.new
+    db_session.expunge(pending)
+
+
+def test_failed_embeddings_are_not_cached(db_session, monkeypatch):
+    query_embedding_cache.clear()
+    monkeypatch.setattr(VectorService, "_embed", lambda self, t: [])
+    service = VectorService(db_session)
+    assert service.generate_embedding("provider down") == []
+    key = (service.embedding_model(), vector_service.content_hash("provider down"))
+    assert query_embedding_cache.get(key) is None
+    assert db_session.get(EmbeddingCache, key) is None
+
+
+def test_backfill_is_chunked_batched_and_resumable(db_session, monkeypatch):
+    from app.core.config import settings
+    from app.models.meridian import ExternalSignal, JobCheckpoint
+    from app.services.embedding_backfill import EmbeddingBackfill, JOB_NAME
+
+    query_embedding_cache.clear()
+    batches = []
+
+    def fake_batch(self, texts):
+        batches.append(list(texts))
+        return [[] if t == "unembeddable" else [float(len(t))] + [0.0] * 1535 for t in texts]
+
+    monkeypatch.setattr(VectorService, "_embed_batch", fake_batch)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 2)
+    descriptions = [f"signal {i}" for i in range(6)] + ["signal 0", "unembeddable"]
+    db_session.add_all(ExternalSignal(type="regulation", description=d) for d in descriptions)
+    db_session.commit()
+
+    # Interrupted run: one page of 4 rows is committed together with its checkpoint
+    first = EmbeddingBackfill(db_session, chunk_size=4, concurrency=2).run(max_chunks=1)
+    assert first["chunks"] == 1
+    checkpoint = db_session.get(JobCheckpoint, JOB_NAME)
+    assert checkpoint.cursor is not None and checkpoint.processed + checkpoint.failed == 4
+
+    second = EmbeddingBackfill(db_session, chunk_size=4, concurrency=2).run()
+    assert first["embedded"] + second["embedded"] == 7
+    assert first["failed"] + second["failed"] == 1
+    assert db_session.get(JobCheckpoint, JOB_NAME).cursor is None
+
+    # Provider batches never exceed EMBEDDING_BATCH_SIZE and duplicates are embedded once
+    sent = [t for batch in batches for t in batch]
+    assert all(len(b) <= 2 for b in batches)
+    assert sent.count("signal 0") == 1
+
+    missing = db_session.query(ExternalSignal).filter(ExternalSignal.embedding == None).all()  # noqa: E711
+    assert [s.description for s in missing] == ["unembeddable"]
+
+
+def test_search_distance_and_recall_knob_match_the_index(db_session, monkeypatch):
+    from sqlalchemy.dialects import postgresql
+    from app.core.config import settings
+    from app.services.vector_service import signal_distance
+
+    # The migrations build HNSW over vector_l2_ops: L2 is the only distance it can serve
+    compiled = lambda expr: str(expr.compile(dialect=postgresql.dialect()))
+    assert "<->" in compiled(signal_distance([0.0] * 3))
+
+    statements = []
+    service = VectorService(db_session)
+    monkeypatch.setattr(service.db, "execute", lambda stmt, *a, **k: statements.append(str(stmt)))
+    service._tune_ann(ef_search=200)
+    service._tune_ann()
+    assert statements == ["SET LOCAL hnsw.ef_search = 200", f"SET LOCAL hnsw.ef_search = {settings.HNSW_EF_SEARCH}"]
+
+
+def test_half_precision_search_reranks_at_full_precision(db_session, monkeypatch):
+    from sqlalchemy.dialects import postgresql
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "VECTOR_STORAGE", "half")
+    monkeypatch.setattr(settings, "VECTOR_RERANK_FACTOR", 4)
+    service = VectorService(db_session)
+    captured = []
+
+    class FakeQuery:
+        def __init__(self, *entities):
+            self.parts = []
+        def join(self, target, onclause):
+            self.parts.append(target)
+            return self
+        def order_by(self, *clauses):
+            self.parts.extend(clauses)
+            return self
+        def limit(self, n):
+            self.limit_n = n
+            return self
+        def all(self):
+            captured.extend(self.parts)
+            return []
+
+    monkeypatch.setattr(service.db, "query", FakeQuery)
+    service._search_half([0.5] * 3, limit=5)
+    candidates, full_order = captured
+    inner = str(candidates.element.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": False}))
+    assert "embedding_half <->" in inner
+    assert "external_signals.embedding <->" in str(full_order.compile(dialect=postgresql.dialect()))
@@ -0,0 +1,34 @@
+"""
+Move idle chat sessions' messages into compressed cold storage.
+
+    python archive_chats.py                    # sessions idle > CHAT_ARCHIVE_IDLE_DAYS
+    python archive_chats.py --idle-days 30 --max-sessions 1000
+
+Safe to run repeatedly (e.g. nightly); archived sessions are restored
+automatically when someone writes to them again. On Postgres, let autovacuum
+(or a manual VACUUM chat_messages) reclaim the freed pages afterwards.
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.chat_archive import ChatArchiver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle-days", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--max-sessions", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = ChatArchiver(db, idle_days=args.idle_days, batch_size=args.batch_size).run(max_sessions=args.max_sessions)
+        print(f"✅ Archived {stats['sessions']} sessions: {stats['raw_bytes']} → {stats['compressed_bytes']} bytes "
+              f"(ratio {stats['ratio']}) in {stats['elapsed_s']}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
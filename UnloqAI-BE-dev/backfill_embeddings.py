@@ -0,0 +1,31 @@
+"""
+Backfill ExternalSignal embeddings.
+
+    python backfill_embeddings.py                 # resume from the last checkpoint
+    python backfill_embeddings.py --restart       # start over (retries failed rows)
+    python backfill_embeddings.py --chunk-size 1000 --concurrency 8
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.embedding_backfill import EmbeddingBackfill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--restart", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = EmbeddingBackfill(db, chunk_size=args.chunk_size, concurrency=args.concurrency).run(restart=args.restart)
+        print(f"✅ Embedded {stats['embedded']} signals ({stats['failed']} failed) "
+              f"in {stats['elapsed_s']}s — {stats['rows_per_sec']} rows/s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Fingerprint ExternalSignals for near-duplicate detection.
+
+    python backfill_fingerprints.py                   # every signal without a fingerprint
+    python backfill_fingerprints.py --batch-size 500
+
+Run after `alembic upgrade head`; safe to stop and rerun.
+"""
+import argparse
+import time
+
+from app.db.session import SessionLocal
+from app.services.signal_ingest import backfill_fingerprints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        count = backfill_fingerprints(db, batch_size=args.batch_size)
+        print(f"✅ Fingerprinted {count} signals in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Recall-vs-latency benchmark for the pgvector ANN index on a synthetic corpus.
+
+Builds a scratch table of clustered random vectors, computes exact top-k with a
+sequential scan, then measures recall@k and latency for each ef_search (HNSW)
+or probes (IVFFlat) setting. Requires PostgreSQL with the vector extension.
+
+    python bench_vector_search.py --rows 20000 --dim 1536 --index hnsw --knobs 10,20,40,80,160
+    python bench_vector_search.py --index ivfflat --lists 100 --knobs 1,5,10,20 --distance cosine
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+TABLE = "bench_signal_vectors"
+OPS = {"l2": ("vector_l2_ops", "<->"), "cosine": ("vector_cosine_ops", "<=>")}
+
+
+def _literal(vec):
+    return "[" + ",".join(f"{x:.5f}" for x in vec) + "]"
+
+
+def synthetic_corpus(rows, dim, clusters, rng):
+    """Gaussian blobs around random centroids: closer to real embeddings than uniform noise."""
+    centroids = [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(clusters)]
+    for _ in range(rows):
+        c = rng.choice(centroids)
+        yield [x + rng.gauss(0, 0.35) for x in c]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    # Defaults match the index the migrations build; the others are for comparison runs
+    parser.add_argument("--index", choices=["hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--distance", choices=list(OPS), default="l2")
+    parser.add_argument("--lists", type=int, default=100, help="ivfflat: ~rows/1000 up to 1M rows, sqrt(rows) beyond")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--knobs", default=None, help="ef_search (hnsw) or probes (ivfflat) values")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch table")
+    args = parser.parse_args()
+
+    knobs = [int(x) for x in (args.knobs or ("10,20,40,80,160" if args.index == "hnsw" else "1,5,10,20,50")).split(",")]
+    opclass, op = OPS[args.distance]
+    knob_name = "hnsw.ef_search" if args.index == "hnsw" else "ivfflat.probes"
+    rng = random.Random(7)
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.begin() as conn:
+        print(f"Loading {args.rows} x {args.dim}d vectors...")
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, embedding vector({args.dim}))"))
+        batch = []
+        for vec in synthetic_corpus(args.rows, args.dim, args.clusters, rng):
+            batch.append({"v": _literal(vec)})
+            if len(batch) == 1000:
+                conn.execute(text(f"INSERT INTO {TABLE} (embedding) VALUES (CAST(:v AS vector))"), batch)
+                batch = []
+        if batch:
+            conn.execute(text(f"INSERT INTO {TABLE} (embedding) VALUES (CAST(:v AS vector))"), batch)
+
+    queries = [_literal(v) for v in synthetic_corpus(args.queries, args.dim, args.clusters, rng)]
+    search = text(f"SELECT id FROM {TABLE} ORDER BY embedding {op} CAST(:q AS vector) LIMIT :k")
+
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_indexscan = off"))
+        started = time.perf_counter()
+        truth = [{r[0] for r in conn.execute(search, {"q": q, "k": args.k})} for q in queries]
+        exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"exact (seq scan): {exact_ms:.2f} ms/query")
+
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        if args.index == "hnsw":
+            conn.execute(text(
+                f"CREATE INDEX ON {TABLE} USING hnsw (embedding {opclass}) "
+                f"WITH (m = {args.m}, ef_construction = {args.ef_construction})"
+            ))
+        else:
+            conn.execute(text(f"CREATE INDEX ON {TABLE} USING ivfflat (embedding {opclass}) WITH (lists = {args.lists})"))
+        conn.execute(text(f"ANALYZE {TABLE}"))
+        print(f"{args.index} build: {time.perf_counter() - started:.1f}s")
+
+    print(f"\n{knob_name:>16} | recall@{args.k} | p50 ms | p95 ms")
+    for knob in knobs:
+        latencies, hits = [], 0
+        with engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL {knob_name} = {int(knob)}"))
+            for q, expected in zip(queries, truth):
+                started = time.perf_counter()
+                found = {r[0] for r in conn.execute(search, {"q": q, "k": args.k})}
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(found & expected)
+        latencies.sort()
+        recall = hits / (len(queries) * args.k)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"{knob:>16} | {recall:>9.3f} | {statistics.median(latencies):>6.2f} | {p95:>6.2f}")
+
+    if not args.keep:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Offline load test for the chat streaming stack.
+
+Start the API against the replay provider, then point this script at it:
+
+    LLM_PROVIDER=replay LLM_REPLAY_TTFT_MS=600 LLM_REPLAY_TOKENS_PER_SEC=60 \
+        uvicorn app.main:app --port 8000
+    python loadtest_chat.py --base-url http://localhost:8000/api/v1 --users 20 --turns 3
+
+Reports time-to-first-byte and total stream duration percentiles, plus 429s.
+Every user asks a distinct question (identical prompts would be coalesced by
+the LLM singleflight and measure one stream, not N).
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import requests
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+def run_user(base_url, user, turns, question, results, lock):
+    session = requests.post(f"{base_url}/chat/sessions", json={"title": "New Chat"}, timeout=30).json()
+    sid = session["session_id"]
+    for turn in range(turns):
+        started = time.perf_counter()
+        ttfb = None
+        with requests.post(
+            f"{base_url}/chat/sessions/{sid}/message",
+            json={"content": f"{question} (user {user + 1}, turn {turn + 1})"},
+            stream=True,
+            timeout=120,
+        ) as res:
+            status = res.status_code
+            for chunk in res.iter_content(chunk_size=None):
+                if chunk and ttfb is None:
+                    ttfb = (time.perf_counter() - started) * 1000
+        total = (time.perf_counter() - started) * 1000
+        with lock:
+            results.append({"status": status, "ttfb_ms": ttfb, "total_ms": total})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--question", default="How are option margins trending?")
+    args = parser.parse_args()
+
+    results, lock = [], threading.Lock()
+    threads = [
+        threading.Thread(target=run_user, args=(args.base_url, user, args.turns, args.question, results, lock))
+        for user in range(args.users)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == 200]
+    ttfb = [r["ttfb_ms"] for r in ok if r["ttfb_ms"] is not None]
+    total = [r["total_ms"] for r in ok]
+    print(f"requests: {len(results)}  ok: {len(ok)}  "
+          f"429: {sum(1 for r in results if r['status'] == 429)}  elapsed: {elapsed:.1f}s")
+    if ok:
+        print(f"ttfb ms   p50={_percentile(ttfb, 0.5)} p90={_percentile(ttfb, 0.9)} p99={_percentile(ttfb, 0.99)}")
+        print(f"total ms  p50={_percentile(total, 0.5)} p90={_percentile(total, 0.9)} "
+              f"p99={_percentile(total, 0.99)} mean={statistics.mean(total):.1f}")
+        print(f"throughput: {len(ok) / elapsed:.2f} streams/s")
+
+
+if __name__ == "__main__":
+    main()